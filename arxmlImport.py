@@ -0,0 +1,194 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+from lxml import etree
+import sys
+import time
+
+import dbcIndex
+
+class ArxmlImporter:
+
+    # Only these elements are materialized, each one is reduced to a small tuple and cleared right away.
+    # Everything else is dropped as soon as a following sibling has been read, so the memory needed
+    # does not depend on the size of the file.
+    # A finished AR-PACKAGE is cleared as well, its content is never referenced by path again.
+    tags = ['COMPU-METHOD','SW-BASE-TYPE','SYSTEM-SIGNAL','I-SIGNAL','I-SIGNAL-I-PDU','CAN-FRAME','CAN-FRAME-TRIGGERING',
+            'AR-PACKAGE']
+
+    def path(self,elem):                        # AUTOSAR reference of an identifiable, e.g. /Signals/Speed
+        parent = elem.getparent()
+        prefix = self.prefixes.get(parent)
+        if prefix is None:                      # first element of this container, e.g. ELEMENTS of a package
+            names = []
+            ancestor = parent
+            while ancestor is not None:
+                name = ancestor.findtext(self.ns + 'SHORT-NAME')
+                if name is not None:
+                    names.append(name)
+                ancestor = ancestor.getparent()
+            names.reverse()
+            prefix = self.prefixes[parent] = ''.join('/' + name for name in names)
+        return prefix + '/' + elem.findtext(self.ns + 'SHORT-NAME')
+
+    def number(self,text,default=0):
+        if text is None:
+            return default
+        text = text.strip()
+        if text[:2] in ('0x','0X'):
+            return int(text,16)
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+
+    def compu_method(self,elem):                # (factor, offset, raw minimum, raw maximum, unit) of a linear method
+        coeffs = elem.find('.//%sCOMPU-RATIONAL-COEFFS' % self.ns)
+        if coeffs is None:
+            factor,offset,lower,upper = 1,0,None,None          # IDENTICAL, TEXTTABLE, ...
+        else:
+            numerator = [self.number(v.text) for v in coeffs.iterfind('%sCOMPU-NUMERATOR/%sV' % (self.ns,self.ns))]
+            denominator = [self.number(v.text) for v in coeffs.iterfind('%sCOMPU-DENOMINATOR/%sV' % (self.ns,self.ns))]
+            numerator += [0,1][len(numerator):]
+            divisor = denominator[0] if denominator else 1
+            offset = numerator[0]/divisor if divisor != 1 else numerator[0]
+            factor = numerator[1]/divisor if divisor != 1 else numerator[1]
+            scale = coeffs.getparent()
+            lower = self.number(scale.findtext(self.ns + 'LOWER-LIMIT'),None)
+            upper = self.number(scale.findtext(self.ns + 'UPPER-LIMIT'),None)
+        unit = elem.findtext(self.ns + 'UNIT-REF')
+        unit = unit.rsplit('/',1)[-1] if unit else ''
+        return (factor,offset,lower,upper,unit)
+
+    def cycle_time(self,elem):                  # ms, cyclic timing of the PDU
+        timing = elem.find('.//%sCYCLIC-TIMING' % self.ns)
+        if timing is None:
+            return 0
+        value = timing.findtext('.//%sVALUE' % self.ns)
+        if value is None:
+            return 0
+        return int(round(float(value)*1000))
+
+    def fields(self,elem):                      # text of every descendant by tag, the first occurrence wins
+        texts = {}
+        for child in elem.iter():
+            texts.setdefault(child.tag,child.text)
+        return texts
+
+    def handle(self,tag,elem):
+        ns = self.ns
+        if tag == 'COMPU-METHOD':
+            self.compu_methods[self.path(elem)] = self.compu_method(elem)
+        elif tag == 'SW-BASE-TYPE':
+            self.base_types[self.path(elem)] = self.fields(elem).get(ns + 'BASE-TYPE-ENCODING') == '2C'
+        elif tag == 'SYSTEM-SIGNAL':
+            self.system_signals[self.path(elem)] = self.fields(elem).get(ns + 'COMPU-METHOD-REF')
+        elif tag == 'I-SIGNAL':
+            texts = self.fields(elem)
+            name = texts[ns + 'SHORT-NAME']
+            self.signals[self.path(elem)] = (name,self.number(texts.get(ns + 'LENGTH')),texts.get(ns + 'SYSTEM-SIGNAL-REF'),
+                                             texts.get(ns + 'COMPU-METHOD-REF'),texts.get(ns + 'BASE-TYPE-REF'))
+        elif tag == 'I-SIGNAL-I-PDU':
+            mappings = []
+            for mapping in elem.iter(ns + 'I-SIGNAL-TO-I-PDU-MAPPING'):
+                texts = self.fields(mapping)
+                signal_ref = texts.get(ns + 'I-SIGNAL-REF')
+                if signal_ref is None:
+                    continue                    # signal groups carry no bits of their own
+                mappings.append((signal_ref,texts.get(ns + 'PACKING-BYTE-ORDER') != 'MOST-SIGNIFICANT-BYTE-FIRST',
+                                 self.number(texts.get(ns + 'START-POSITION'))))
+            self.pdus[self.path(elem)] = (mappings,self.cycle_time(elem))
+        elif tag == 'CAN-FRAME':
+            texts = self.fields(elem)
+            pdus = []
+            for mapping in elem.iter(ns + 'PDU-TO-FRAME-MAPPING'):
+                mapping_texts = self.fields(mapping)
+                pdus.append((mapping_texts.get(ns + 'PDU-REF'),self.number(mapping_texts.get(ns + 'START-POSITION'))))
+            self.frames[self.path(elem)] = (texts[ns + 'SHORT-NAME'],self.number(texts.get(ns + 'FRAME-LENGTH')),pdus)
+        elif tag == 'CAN-FRAME-TRIGGERING':
+            texts = self.fields(elem)
+            frame_ref = texts.get(ns + 'FRAME-REF')
+            if frame_ref not in self.triggerings:               # first channel wins
+                self.triggerings[frame_ref] = (self.number(texts.get(ns + 'IDENTIFIER')),
+                                               texts.get(ns + 'CAN-ADDRESSING-MODE') == 'EXTENDED')
+
+    def signal_tuple(self,signal_ref,little_endian,start):     # in the order of dbcIndex.Signal
+        name,length,system_ref,compu_ref,base_ref = self.signals[signal_ref]
+        if compu_ref is None:
+            compu_ref = self.system_signals.get(system_ref)
+        factor,offset,lower,upper,unit = self.compu_methods.get(compu_ref,(1,0,None,None,''))
+        signed = self.base_types.get(base_ref,False)
+        if lower is None or upper is None:
+            lower,upper = (-(1 << (length-1)),(1 << (length-1))-1) if signed else (0,(1 << length)-1)
+        return (name,start,length,little_endian,signed,factor,offset,
+                lower*factor + offset,upper*factor + offset,unit,(),None)
+
+    def parse(self,arxmlFile):                  # one pass over the file, returns dbcIndex entries
+        for event,elem in etree.iterparse(arxmlFile,events=('end',),tag=['{*}' + tag for tag in self.tags],huge_tree=True):
+            namespace,tag = elem.tag[1:].split('}',1) if elem.tag[0] == '{' else ('',elem.tag)
+            self.ns = '{%s}' % namespace if namespace else ''
+            self.handle(tag,elem)
+            if tag == 'AR-PACKAGE':
+                self.prefixes.clear()           # containers of the package are gone
+            elem.clear()
+            parent = elem.getparent()
+            while elem.getprevious() is not None:
+                del parent[0]                   # processed and skipped siblings
+
+        entries = {}
+        for frame_ref,(can_id,extended) in self.triggerings.items():
+            if frame_ref not in self.frames:
+                continue
+            name,dlc,pdu_mappings = self.frames[frame_ref]
+            signals = []
+            cycle_time = 0
+            for pdu_ref,pdu_start in pdu_mappings:
+                if pdu_ref not in self.pdus:
+                    continue                    # e.g. NM or container PDUs
+                mappings,pdu_cycle_time = self.pdus[pdu_ref]
+                cycle_time = cycle_time or pdu_cycle_time
+                for signal_ref,little_endian,start in mappings:
+                    if signal_ref in self.signals:
+                        signals.append(self.signal_tuple(signal_ref,little_endian,pdu_start + start))
+            entries[name] = dbcIndex.message_entry(name,can_id,extended,dlc,'',cycle_time,signals)
+        return entries
+
+    def __init__(self):
+        self.ns = ''
+        self.prefixes = {}                      # container element -> path of its parent identifiable
+        self.compu_methods = {}                 # path -> (factor, offset, raw min, raw max, unit)
+        self.base_types = {}                    # path -> signed
+        self.system_signals = {}                # path -> compu method reference
+        self.signals = {}                       # path -> (name, length, system signal ref, compu method ref, base type ref)
+        self.pdus = {}                          # path -> ([(signal ref, little endian, start)], cycle time)
+        self.frames = {}                        # path -> (name, length, [(pdu ref, start)])
+        self.triggerings = {}                   # frame ref -> (identifier, extended)
+
+if __name__ == '__main__':
+    for arxmlFile in sys.argv[1:]:
+        start = time.perf_counter()
+        index = dbcIndex.load_database(arxmlFile)
+        if index is not None:
+            print("%s: %d messages, %d signals (%.1f ms)" % (arxmlFile,len(index.entries),index.signal_count(),
+                                                             (time.perf_counter()-start)*1000))
@@ -0,0 +1,144 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+REPLAY_REALTIME = 0             # same values as in eventsHandler/ascReplay.h
+REPLAY_SCALED = 1
+REPLAY_AFAP = 2
+
+RECORD_TX = 0x01                # flags, see eventsHandler/canRecord.h
+RECORD_EXT = 0x02
+
+class AscReplay:
+
+    index_magic = b'RBSIDX1\x00'
+    index_header = struct.Struct('<8sQdQ')          # magic, size and mtime of the .asc file, number of frames
+    frame_record = struct.Struct('<dIBBBx8s')       # timestamp, ID, DLC, flags, channel, data -- struct can_record
+
+    # e.g.   0.015320 1  1F3             Rx   d 8 00 00 00 00 00 00 00 00  Length = 0 BitCount = 0
+    frame_line = re.compile(rb'^[ \t]*(\d+\.\d+)[ \t]+(\d+)[ \t]+([0-9A-Fa-f]+)(x?)[ \t]+(Rx|Tx)[ \t]+[dD][ \t]+(\d+)((?:[ \t]+[0-9A-Fa-f]{2})*)', re.M)
+    base_line = re.compile(rb'^[ \t]*base[ \t]+(hex|dec)[ \t]+timestamps[ \t]+(absolute|relative)', re.M)
+
+    def index_path(self):
+        return self.ascFile + '.idx'
+
+    def index_valid(self):
+        try:
+            with open(self.index_path(),'rb') as f:
+                header = f.read(self.index_header.size)
+        except OSError:
+            return False
+        if len(header) < self.index_header.size:
+            return False
+        magic,source_size,source_mtime,count = self.index_header.unpack(header)
+        st = os.stat(self.ascFile)
+        return magic == self.index_magic and source_size == st.st_size and source_mtime == st.st_mtime
+
+    def build_index(self):
+        st = os.stat(self.ascFile)
+        records = bytearray()
+        count = 0
+        pack = self.frame_record.pack
+        with open(self.ascFile,'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                base = self.base_line.search(data, 0, 4096)          # header is at the beginning of the file
+                id_base = 10 if (base and base.group(1) == b'dec') else 16
+                relative = bool(base and base.group(2) == b'relative')
+                timestamp = 0.0
+                for m in self.frame_line.finditer(data):
+                    if relative:
+                        timestamp += float(m.group(1))
+                    else:
+                        timestamp = float(m.group(1))
+                    flags = 0
+                    if m.group(5) == b'Tx':
+                        flags |= RECORD_TX
+                    if m.group(4):
+                        flags |= RECORD_EXT
+                    dlc = int(m.group(6))
+                    payload = bytes.fromhex(m.group(7).decode('ascii'))[:8]
+                    records += pack(timestamp,int(m.group(3),id_base),dlc,flags,int(m.group(2)),payload)
+                    count += 1
+            finally:
+                data.close()
+
+        temp_path = self.index_path() + '.tmp'
+        with open(temp_path,'wb') as f:
+            f.write(self.index_header.pack(self.index_magic,st.st_size,st.st_mtime,count))
+            f.write(records)
+        os.replace(temp_path,self.index_path())         # readers never see a half-written index
+        print("Replay index built: %d frames." % count)
+
+    def open(self):
+        if not self.index_valid():
+            self.build_index()
+        self.close()
+        self.f_index = open(self.index_path(),'rb')
+        self.index = mmap.mmap(self.f_index.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = self.index_header.unpack_from(self.index)[3]
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+            self.f_index.close()
+            self.index = None
+
+    def frames(self):           # (timestamp, id, dlc, flags, channel, data) tuples straight from the mapped index
+        if self.index is None:
+            self.open()
+        start = self.index_header.size
+        end = start + self.count*self.frame_record.size
+        return self.frame_record.iter_unpack(memoryview(self.index)[start:end])
+
+    def replay(self,callback,mode=REPLAY_AFAP,scale=1.0):
+        if mode == REPLAY_REALTIME or scale <= 0:
+            scale = 1.0
+        start = time.monotonic()
+        first = None
+        for frame in self.frames():
+            if frame[3] & RECORD_TX:
+                continue                # only received frames are fed to the handlers
+            if mode != REPLAY_AFAP:
+                if first is None:
+                    first = frame[0]
+                wait = start + (frame[0]-first)/scale - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            callback(frame)
+
+    def __init__(self,ascFile):
+        self.ascFile = ascFile
+        self.index = None
+        self.count = 0
+
+if __name__ == '__main__':
+    for ascFile in sys.argv[1:]:
+        AscReplay(ascFile).open()
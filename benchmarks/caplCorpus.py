@@ -0,0 +1,127 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Synthetic CAPL files for the benchmarks. Only constructs of working_example.txt are generated, so every
+# file can be converted by both backends; the same shape and seed always give the same file.
+
+from collections import namedtuple
+import argparse
+import random
+import sys
+
+BLOCK_STATEMENTS = 3                            # statements of a nested block, keeps the size linear in the shape
+CorpusShape = namedtuple('CorpusShape', 'variables functions messages depth array_size statements')
+
+PRESETS = {                                     # roughly a small node, a typical one and the largest seen
+    'small': CorpusShape(variables=20,functions=5,messages=5,depth=2,array_size=8,statements=6),
+    'medium': CorpusShape(variables=100,functions=30,messages=30,depth=3,array_size=32,statements=10),
+    'large': CorpusShape(variables=400,functions=150,messages=150,depth=4,array_size=64,statements=12),
+}
+
+class CorpusGenerator:
+
+    def variable_declaration(self,i):
+        kind = i % 5
+        if kind == 0:
+            return "int var%d = %d;" % (i,self.random.randint(-1000,1000))
+        if kind == 1:
+            return "float speed%d = %.2f;" % (i,self.random.uniform(0,300))
+        if kind == 2:
+            values = ",".join(str(self.random.randint(0,255)) for _ in range(self.shape.array_size))
+            return "int table%d[%d] = {%s};" % (i,self.shape.array_size,values)
+        if kind == 3:
+            return "dword counter%d;" % i
+        return "char name%d[16] = \"node%d\";" % (i,i)
+
+    def expression(self):
+        a,b = self.random.sample(self.locals,2)
+        operator = self.random.choice(('+','-','*','&','|','^'))
+        return "%s %s %s" % (a,operator,b) if self.random.random() < 0.7 else "%s %s %d" % (a,operator,self.random.randint(1,99))
+
+    def condition(self):
+        a = self.random.choice(self.locals)
+        return "%s %s %d" % (a,self.random.choice(('==','!=','<','>','<=','>=')),self.random.randint(0,100))
+
+    def statements(self,depth,indent,count):
+        lines = []
+        pad = "\t" * indent
+        for _ in range(count):
+            choice = self.random.random()
+            if depth > 0 and choice < 0.15:
+                lines.append("%sif (%s) {" % (pad,self.condition()))
+                lines.extend(self.statements(depth - 1,indent + 1,BLOCK_STATEMENTS))
+                lines.append("%s}" % pad)
+                lines.append("%selse {" % pad)
+                lines.extend(self.statements(depth - 1,indent + 1,BLOCK_STATEMENTS))
+                lines.append("%s}" % pad)
+            elif depth > 0 and choice < 0.25:
+                lines.append("%swhile (%s) {" % (pad,self.condition()))
+                lines.extend(self.statements(depth - 1,indent + 1,BLOCK_STATEMENTS))
+                lines.append("%s}" % pad)
+            elif depth > 0 and choice < 0.3:
+                lines.append("%sfor (int i%d = 0; i%d < %d; i%d++) {" % (pad,depth,depth,self.random.randint(2,50),depth))
+                lines.extend(self.statements(depth - 1,indent + 1,BLOCK_STATEMENTS))
+                lines.append("%s}" % pad)
+            elif choice < 0.4:
+                lines.append("%swrite(\"%s = %%d\",%s);" % (pad,self.locals[0],self.locals[0]))
+            elif choice < 0.5:
+                lines.append("%s%s += %d;" % (pad,self.random.choice(self.locals),self.random.randint(1,9)))
+            else:
+                lines.append("%s%s = %s;" % (pad,self.random.choice(self.locals),self.expression()))
+        return lines
+
+    def body(self,header):
+        lines = ["{","\tint x = 1;","\tint y = 2;","\tint z = 3;"] + self.statements(self.shape.depth,1,self.shape.statements) + ["}"]
+        return header + "\n".join(lines) + "\n/*@@end */\n\n"
+
+    def generate(self):
+        parts = []
+        variables = [self.variable_declaration(i) for i in range(self.shape.variables)]
+        variables += ["message 0x%X Msg_%d;" % (0x100 + i,i) for i in range(self.shape.messages)]
+        parts.append("/*@@var:*/\nvariables\n{\n\t" + "\n\t".join(variables) + "\n}\n/*@@end */\n\n")
+        for i in range(self.shape.functions):
+            parts.append(self.body("/*@@caplFunc:function%d(int a, int b): */\nint function%d(int a, int b)\n" % (i,i)))
+        for i in range(self.shape.messages):
+            parts.append(self.body("/*@@msg:Msg_%d:*/\non message Msg_%d\n" % (i,i)))
+        return "".join(parts)
+
+    def __init__(self,shape,seed=0):
+        self.shape = shape
+        self.random = random.Random(seed)
+        self.locals = ['x','y','z']
+
+def generate_capl(shape,seed=0):
+    return CorpusGenerator(shape,seed).generate()
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Write a synthetic CAPL file to stdout.")
+    arg_parser.add_argument('--preset',choices=sorted(PRESETS),default='small')
+    for field in CorpusShape._fields:
+        arg_parser.add_argument('--' + field.replace('_','-'),type=int,help="overrides the preset")
+    arg_parser.add_argument('--seed',type=int,default=0)
+    args = arg_parser.parse_args()
+    shape = PRESETS[args.preset]._replace(**dict((field,getattr(args,field)) for field in CorpusShape._fields
+                                                 if getattr(args,field) is not None))
+    sys.stdout.write(generate_capl(shape,args.seed))
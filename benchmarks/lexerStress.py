@@ -0,0 +1,138 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Lexing time of adversarial inputs, from the repository directory:
+#   python -m benchmarks.lexerStress                          # exit 1 if a case is not linear
+#   python -m benchmarks.lexerStress --cases fuzz --size 400000 --seed 7
+# Every case is lexed at 1/8, 1/4, 1/2 and all of --size bytes. From half the size to the full size the time
+# per byte may grow by --slope at most; a quadratic rule doubles it, the smaller inputs are only reported.
+# A case runs in its own process, one still running after --timeout seconds (exponential backtracking) fails.
+
+import argparse
+import contextlib
+import gc
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from benchmarks.caplCorpus import PRESETS,generate_capl
+from lexer import Lexer
+
+SLOPE = 1.5
+STEPS = (8,4,2,1)                               # fractions of --size
+
+def repeat(text,size):
+    return (text * (size // len(text) + 1))[:size]
+
+def fuzz(size,seed):                            # pieces of markers, comments and strings in random order
+    pieces = ('/*','*/','/*@@','caplFunc:','var:','@@end','(',')','[8]','[]',',',' ','\n','a','abc_1','x-y',
+              '::',':',"'k'",'"','\\','*','**','/','on ','message','{','}',';','0x1F','1.5')
+    rnd = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        parts.append(rnd.choice(pieces))
+        length += len(parts[-1])
+    return ''.join(parts)[:size]
+
+CASES = {                                       # name: input of the given size and seed
+    'corpus': lambda size,seed: repeat(generate_capl(PRESETS['small'],seed),size),       # reference
+    'marker_name': lambda size,seed: '/*@@' + 'a' * size,                   # no ':' and no */
+    'marker_blanks': lambda size,seed: '/*@@var:' + ' ' * size,
+    'func_name': lambda size,seed: '/*@@caplFunc:' + 'a' * size,
+    'func_params': lambda size,seed: '/*@@caplFunc:f(' + repeat('int x,',size),
+    'func_arrays': lambda size,seed: '/*@@caplFunc:f(' + repeat('[8]',size),
+    'broken_markers': lambda size,seed: repeat('/*@@caplFunc:f(int abc[8][8], byte def) */\n',size),
+    'unclosed_comments': lambda size,seed: repeat('/* x\n',size),
+    'star_comments': lambda size,seed: repeat('/***** x *****/\n',size),
+    'unclosed_strings': lambda size,seed: repeat('a\\"',size),
+    'events': lambda size,seed: repeat('on ',size),
+    'fuzz': fuzz,
+}
+
+def lex(source):                                # seconds, tokens are counted, not printed
+    lexer_init = Lexer()
+    lexer_init.build()
+    lexer_init.lexer.input(source)
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        while lexer_init.lexer.token():
+            pass
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+def measure_case(name,size,seed,repeat_count,results):     # worker process: [(bytes, seconds)] to results
+    with open(os.devnull,'w') as devnull, contextlib.redirect_stdout(devnull):     # "Illegal character ..."
+        runs = []
+        for step in STEPS:
+            source = CASES[name](size // step,seed)
+            runs.append((len(source),min(lex(source) for _ in range(repeat_count))))
+    results.put(runs)
+
+def run_case(name,size,seed,repeat_count,timeout):         # [(bytes, seconds)], None after the timeout
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure_case,args=(name,size,seed,repeat_count,results))
+    process.start()
+    try:
+        return results.get(timeout=timeout)
+    except Exception:                           # queue.Empty, or the worker died
+        return None
+    finally:
+        process.terminate()
+        process.join()
+
+def slope(runs):                                # time per byte of the largest input / of the one half its size
+    (small_bytes,small_seconds),(large_bytes,large_seconds) = runs[-2],runs[-1]
+    return (large_seconds / large_bytes) / max(small_seconds / small_bytes,1e-12)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Check that lexing time is linear in the input length.")
+    arg_parser.add_argument('--cases',nargs='+',choices=sorted(CASES),default=list(CASES))
+    arg_parser.add_argument('--size',type=int,default=200000,help="bytes of the largest input of a case")
+    arg_parser.add_argument('--seed',type=int,default=0)
+    arg_parser.add_argument('--repeat',type=int,default=3)
+    arg_parser.add_argument('--slope',type=float,default=SLOPE,help="allowed growth of the time per byte")
+    arg_parser.add_argument('--timeout',type=float,default=60,help="seconds per case")
+    args = arg_parser.parse_args()
+
+    failed = []
+    for name in args.cases:
+        runs = run_case(name,args.size,args.seed,args.repeat,args.timeout)
+        if runs is None:
+            print("%-18s no result in %d s  FAIL" % (name,args.timeout))
+            failed.append(name)
+            continue
+        line = "%-18s %s  x%.2f" % (name,"  ".join("%7d B %8.1f ms" % (size,seconds * 1000) for size,seconds in runs),
+                                    slope(runs))
+        if slope(runs) > args.slope:
+            line += "  FAIL"
+            failed.append(name)
+        print(line)
+    print("%d of %d cases linear" % (len(args.cases) - len(failed),len(args.cases)))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,161 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Times the stages of a CAPL conversion on a synthetic file, from the repository directory:
+#   python -m benchmarks.runBenchmarks --preset medium --output results.json
+#   python -m benchmarks.runBenchmarks --preset medium --baseline baseline.json    # exit 1 on a regression
+# Every stage runs --repeat times with the garbage collector off, the median is compared with the
+# baseline. The memory peak comes from one more run under tracemalloc, which is slower and not timed.
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.caplCorpus import CorpusShape,PRESETS,generate_capl
+from lexer import Lexer
+from parserPy import Parser
+import ply.yacc as yacc
+
+STAGES = ('lex','parse','wwb','c')
+THRESHOLD = 0.25                                # slower by more than this is a regression
+
+class Benchmark:
+
+    def lex(self):                              # tokens of the whole file, as Lexer.test() without printing
+        lexer_init = Lexer()
+        lexer_init.build()
+        lexer_init.lexer.input(self.source)
+        count = 0
+        while lexer_init.lexer.token():
+            count += 1
+        return count
+
+    def parse(self):
+        lexer_init = Lexer()
+        lexer_init.build()
+        return yacc.yacc(module = Parser()).parse(self.source,lexer = lexer_init.lexer)
+
+    def wwb(self):
+        Parser().generate_code(self.tree)
+
+    def c(self):
+        Parser().generate_code_c(self.tree)
+
+    def measure(self,stage,repeat):
+        function = getattr(self,stage)
+        runs = []
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                with contextlib.redirect_stdout(self.devnull):   # the parser prints tokens and trees
+                    start = time.perf_counter()
+                    function()
+                    runs.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(self.devnull):
+                function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {'min': min(runs), 'median': statistics.median(runs), 'peak_kb': peak // 1024, 'runs': runs}
+
+    def run(self,repeat,stages=STAGES):
+        with contextlib.redirect_stdout(self.devnull):
+            yacc.yacc(module = Parser())        # tables built or loaded before any timing
+            self.tree = self.parse()
+            self.tokens = self.lex()
+        return dict((stage,self.measure(stage,repeat)) for stage in stages)
+
+    def close(self):
+        self.devnull.close()
+
+    def __init__(self,source):
+        self.source = source
+        self.tree = None
+        self.devnull = open(os.devnull,'w')
+
+def compare(results,baseline):                  # {stage: ratio of the medians}, stages of both only
+    return dict((stage,results['stages'][stage]['median'] / baseline['stages'][stage]['median'])
+                for stage in results['stages'] if stage in baseline.get('stages',{}))
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Benchmark the CAPL conversion stages.")
+    arg_parser.add_argument('--preset',choices=sorted(PRESETS),default='medium')
+    for field in CorpusShape._fields:
+        arg_parser.add_argument('--' + field.replace('_','-'),type=int,help="overrides the preset")
+    arg_parser.add_argument('--seed',type=int,default=0)
+    arg_parser.add_argument('--repeat',type=int,default=5)
+    arg_parser.add_argument('--stages',nargs='+',choices=STAGES,default=list(STAGES))
+    arg_parser.add_argument('--output',help="results as JSON, e.g. to be used as a baseline later")
+    arg_parser.add_argument('--baseline',help="JSON of an earlier run")
+    arg_parser.add_argument('--threshold',type=float,default=THRESHOLD,help="allowed slowdown, 0.25 = 25 %%")
+    args = arg_parser.parse_args()
+
+    shape = PRESETS[args.preset]._replace(**dict((field,getattr(args,field)) for field in CorpusShape._fields
+                                                 if getattr(args,field) is not None))
+    source = generate_capl(shape,args.seed)
+    benchmark = Benchmark(source)
+    try:
+        stages = benchmark.run(args.repeat,args.stages)
+    finally:
+        benchmark.close()
+    results = {'preset': args.preset, 'shape': shape._asdict(), 'seed': args.seed, 'bytes': len(source),
+               'tokens': benchmark.tokens, 'repeat': args.repeat, 'python': platform.python_version(),
+               'machine': platform.machine(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'stages': stages}
+
+    ratios = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            ratios = compare(results,json.load(f))
+    print("%s corpus: %d kB, %d tokens" % (args.preset,len(source) // 1024,benchmark.tokens))
+    regressions = []
+    for stage,result in stages.items():
+        line = "%-6s %10.1f ms median %10.1f ms min %8d kB peak" % (stage,result['median']*1000,result['min']*1000,
+                                                                   result['peak_kb'])
+        if stage in ratios:
+            line += "  %+6.1f %%" % ((ratios[stage] - 1) * 100)
+            if ratios[stage] > 1 + args.threshold:
+                line += "  REGRESSION"
+                regressions.append(stage)
+        print(line)
+
+    if args.output:
+        temp_path = args.output + '.%d.tmp' % os.getpid()
+        with open(temp_path,'w') as f:
+            json.dump(results,f,indent=2)
+        os.replace(temp_path,args.output)
+    sys.exit(1 if regressions else 0)
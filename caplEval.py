@@ -0,0 +1,925 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+import ast
+import heapq
+import operator
+import random
+import re
+
+from parserPy import Node
+
+# Every statement is compiled into a closure taking the frame of local variables
+# (a list, slot 0 holds the return value); None means "continue with the next statement".
+BREAK = 1
+CONTINUE = 2
+RETURN = 3
+
+class SimulationError(Exception):
+    pass
+
+def wrap_unsigned(bits):
+    mask = (1 << bits) - 1
+    return lambda v: v if isinstance(v,(str,bytearray)) else int(v) & mask
+
+def wrap_signed(bits):
+    mask = (1 << bits) - 1
+    half = 1 << (bits - 1)
+    return lambda v: ((int(v) + half) & mask) - half
+
+type_conversions = { 'byte' : wrap_unsigned(8),
+                     'char' : wrap_unsigned(8),
+                     'word' : wrap_unsigned(16),
+                     'dword' : wrap_unsigned(32),
+                     'int' : wrap_signed(32),
+                     'long' : wrap_signed(32),
+                     'float' : float,
+                     'double' : float,
+                   }
+
+def c_div(a,b):
+    if isinstance(a,int) and isinstance(b,int):
+        q = abs(a) // abs(b)
+        return q if (a >= 0) == (b >= 0) else -q        # C truncates toward zero
+    return a / b
+
+def c_mod(a,b):
+    if isinstance(a,int) and isinstance(b,int):
+        return a - b*c_div(a,b)
+    return a % b
+
+binary_operators = { '+' : operator.add,
+                     '-' : operator.sub,
+                     '*' : operator.mul,
+                     '/' : c_div,
+                     '%' : c_mod,
+                     '&' : operator.and_,
+                     '|' : operator.or_,
+                     '^' : operator.xor,
+                     '<<' : operator.lshift,
+                     '>>' : operator.rshift,
+                     '==' : lambda a,b: int(a == b),          # relations give 0/1 as in C
+                     '!=' : lambda a,b: int(a != b),
+                     '>' : lambda a,b: int(a > b),
+                     '>=' : lambda a,b: int(a >= b),
+                     '<' : lambda a,b: int(a < b),
+                     '<=' : lambda a,b: int(a <= b),
+                   }
+
+assign_operators = { '+=' : '+', '-=' : '-', '*=' : '*', '/=' : '/', '%=' : '%',
+                     '<<=' : '<<', '>>=' : '>>', '&=' : '&', '|=' : '|', '^=' : '^' }
+
+def as_list(children):          # parser gives a single node, a tuple of nodes or nothing
+    if children is None or children == []:
+        return []
+    if isinstance(children,tuple):
+        return list(children)
+    return [children]
+
+def constant(value):
+    run = lambda f: value
+    run.value = value           # marks the closure for constant folding
+    return run
+
+def c_string(value):
+    if isinstance(value,bytearray):
+        return value.split(b'\0',1)[0].decode('latin-1')
+    return value
+
+
+class SimMessage:
+
+    def byte(self,i):
+        return self.data[i]
+
+    def word(self,i):
+        return self.data[i] | (self.data[i+1] << 8)
+
+    def dword(self,i):
+        return self.word(i) | (self.word(i+2) << 16)
+
+    def __repr__(self):
+        return "SimMessage(%s, %s, %s)" % (self.name,self.id,bytes(self.data[:self.dlc]).hex())
+
+    def __init__(self,name,msg_id,data=b'',dlc=None,channel=1):
+        self.name = name
+        self.id = msg_id
+        self.data = bytearray(data) + bytearray(8 - len(data))
+        self.dlc = len(data) if dlc is None else dlc
+        self.channel = channel
+        self.signals = {}
+
+
+class SimTimer:
+
+    def __init__(self,name,unit):
+        self.name = name
+        self.unit = unit            # ms per tick: 1000 for timer, 1 for msTimer
+        self.due = None
+
+
+class SimBus:
+
+    def __init__(self):
+        self.sent = []              # (time in ms, id, dlc, data) of every output()
+        self.signals = {}           # (message, signal) -> value, ILSetSignal/getSignal
+        self.env = {}               # environment variables, putValue/getValue
+        self.log = []               # write() output
+        self.calls = []             # calls of functions the simulation does not implement
+
+
+class CaplSimulation:
+
+    # ---- compilation of expressions ----
+
+    def locate(self,node):
+        if node.lineno:
+            self.line = node.lineno
+
+    def error(self,what,name):                  # at the line of the last identifier compiled
+        line = " at line %d" % self.line if self.line else ""
+        return SimulationError("%s: %s%s" % (what,name,line))
+
+    def compile_load(self,name):
+        if self.locals is not None and name in self.locals:
+            slot = self.locals[name][0]
+            return lambda f: f[slot]
+        if name not in self.global_names:
+            raise self.error("undeclared",name)
+        g = self.globals
+        return lambda f: g[name]
+
+    def compile_store(self,name):
+        if self.locals is None or name not in self.locals:
+            if name not in self.global_names:
+                raise self.error("undeclared",name)
+        if self.locals is not None and name in self.locals:
+            slot,conv = self.locals[name]
+            if conv is None:
+                def store(f,v):
+                    f[slot] = v
+            else:
+                def store(f,v):
+                    f[slot] = conv(v)
+            return store
+        g = self.globals
+        conv = self.global_types.get(name)
+        if conv is None:
+            def store(f,v):
+                g[name] = v
+        else:
+            def store(f,v):
+                g[name] = conv(v)
+        return store
+
+    def compile_indices(self,array_brackets):
+        indices = []
+        for index in re.findall(r'\[([a-zA-Z0-9_]*)\]',array_brackets):
+            if index.isdigit():
+                indices.append(constant(int(index)))
+            else:
+                indices.append(self.compile_load(index))
+        return indices
+
+    def compile_array_load(self,name,array_brackets):
+        load = self.compile_load(name)
+        indices = self.compile_indices(array_brackets)
+        if len(indices) == 1:
+            i = indices[0]
+            return lambda f: load(f)[i(f)]
+        def run(f):
+            value = load(f)
+            for i in indices:
+                value = value[i(f)]
+            return value
+        return run
+
+    def compile_array_store(self,name,array_brackets):
+        load = self.compile_load(name)
+        indices = self.compile_indices(array_brackets)
+        last = indices.pop()
+        def store(f,v):
+            array = load(f)
+            for i in indices:
+                array = array[i(f)]
+            array[last(f)] = v
+        return store
+
+    def compile_this(self,path):            # e.g. this.byte(0), this.id, this.dlc
+        m = re.match(r'this\.(\w+)(?:\((\d+)\))?$',path)
+        attr,index = m.group(1),m.group(2)
+        sim = self
+        if index is not None:
+            index = int(index)
+            access = attr.lower()
+            return lambda f: getattr(sim.this,access)(index)
+        if attr in ('id','ID'):
+            return lambda f: sim.this.id
+        if attr in ('dlc','DLC'):
+            return lambda f: sim.this.dlc
+        if attr == 'CAN':
+            return lambda f: sim.this.channel
+        return lambda f: sim.this.signals.get(attr,0)
+
+    def compile_signal(self,path):          # message.signal
+        message,signal = path.split('.',1)
+        load = self.compile_load(message)
+        if signal in ('id','ID'):
+            return lambda f: load(f).id
+        if signal in ('dlc','DLC'):
+            return lambda f: load(f).dlc
+        return lambda f: getattr(load(f),'signals',{}).get(signal,0)
+
+    def compile_unary(self,node):
+        operator = node.leaf
+        target = node.children
+        value = self.compile_expression(target)
+        if operator == '!':
+            return lambda f: 0 if value(f) else 1
+        if operator == '~':
+            return lambda f: ~value(f)
+        step = 1 if operator == '++' else -1
+        if target.type == 'Array':
+            store = self.compile_array_store(target.leaf[0].leaf,target.leaf[1])
+        else:
+            store = self.compile_store(target.leaf)
+        def run(f):                         # both x++ and ++x are generated as x++ by the C backend
+            old = value(f)
+            store(f,old + step)
+            return old
+        return run
+
+    def compile_expression(self,node):
+        if isinstance(node,tuple):          # initializer list
+            items = [self.compile_expression(item) for item in node]
+            return lambda f: [item(f) for item in items]
+        self.locate(node)
+        node_type = node.type
+        if node_type == 'INT':
+            return constant(int(node.leaf))
+        if node_type == 'HEX':
+            return constant(int(node.leaf,16))
+        if node_type == 'FLOAT':
+            return constant(float(node.leaf))
+        if node_type == 'CHAR' or node_type == 'Key':
+            return constant(ord(node.leaf[1]))
+        if node_type == 'STRING':
+            try:
+                return constant(ast.literal_eval(node.leaf))
+            except (ValueError,SyntaxError):
+                return constant(node.leaf[1:-1])
+        if node_type == 'ID':
+            return self.compile_load(node.leaf)
+        if node_type == 'This':
+            sim = self
+            return lambda f: sim.this
+        if node_type == 'ThisDot':
+            return self.compile_this(node.leaf)
+        if node_type == 'Signal':
+            return self.compile_signal(node.leaf)
+        if node_type == 'Array':
+            return self.compile_array_load(node.leaf[0].leaf,node.leaf[1])
+        if node_type == 'msg_sig':
+            bus = self.bus
+            key = (node.leaf[0].leaf,node.leaf[1].leaf)
+            return lambda f: bus.signals.get(key,0)
+        if node_type == 'CAPL_fcn':
+            return self.compile_call(node)
+        if node_type == 'Cond_EXPR':
+            condition = self.compile_expression(node.leaf)
+            true_value = self.compile_expression(node.children[0])
+            false_value = self.compile_expression(node.children[1])
+            return lambda f: true_value(f) if condition(f) else false_value(f)
+        if node_type == 'Logic_EXPR':
+            left = self.compile_expression(node.children[0])
+            right = self.compile_expression(node.children[1])
+            if node.leaf == '&&':
+                return lambda f: 1 if (left(f) and right(f)) else 0
+            return lambda f: 1 if (left(f) or right(f)) else 0
+        if node_type == 'Expression':
+            if not isinstance(node.children,tuple):
+                return self.compile_unary(node)
+            op = binary_operators[node.leaf]
+            left = self.compile_expression(node.children[0])
+            right = self.compile_expression(node.children[1])
+            if hasattr(left,'value') and hasattr(right,'value'):
+                return constant(op(left.value,right.value))     # folded at compile time
+            if hasattr(right,'value'):
+                value = right.value
+                return lambda f: op(left(f),value)
+            return lambda f: op(left(f),right(f))
+        raise self.error("unsupported",node_type)
+
+    def compile_call(self,node):
+        name = node.leaf.leaf
+        args = [param.leaf for param in as_list(node.children)]
+        if name in self.function_nodes:
+            compiled = [self.compile_expression(arg) for arg in args]
+            functions = self.functions
+            if not compiled:
+                return lambda f: functions[name]()
+            return lambda f: functions[name](*[arg(f) for arg in compiled])
+        builtin = self.builtins.get(name)
+        if builtin is not None:
+            return builtin(self,args)
+        if name not in self.unsupported:
+            self.unsupported.add(name)
+            print("Function '%s' not supported by the simulation, calls are recorded." % name)
+        compiled = [self.compile_expression(arg) for arg in args if isinstance(arg,Node)]
+        calls = self.bus.calls
+        def run(f):
+            calls.append((name,[arg(f) for arg in compiled]))
+            return 0
+        return run
+
+    # ---- CAPL functions ----
+
+    def builtin_write(self,args):
+        if not args:
+            return constant(0)
+        log = self.bus.log
+        sim = self
+        if args[0].type == 'STRING':
+            fmt = self.compile_expression(args[0]).value
+            values = [self.compile_expression(arg) for arg in args[1:]]
+            def run(f):
+                text = fmt % tuple(c_string(value(f)) for value in values)
+                log.append(text)
+                if sim.echo:
+                    print(text)
+                return 0
+        else:
+            value = self.compile_expression(args[0])
+            def run(f):
+                text = str(c_string(value(f)))
+                log.append(text)
+                if sim.echo:
+                    print(text)
+                return 0
+        return run
+
+    def builtin_output(self,args):
+        message = self.compile_expression(args[0])
+        sim = self
+        sent = self.bus.sent
+        def run(f):
+            msg = message(f)
+            sent.append((sim.now,msg.id,msg.dlc,bytes(msg.data[:msg.dlc])))
+            return 0
+        return run
+
+    def builtin_setTimer(self,args):
+        timer = self.compile_expression(args[0])
+        period = self.compile_expression(args[1])
+        sim = self
+        def run(f):
+            sim.set_timer(timer(f),period(f))
+            return 0
+        return run
+
+    def builtin_cancelTimer(self,args):
+        timer = self.compile_expression(args[0])
+        def run(f):
+            timer(f).due = None
+            return 0
+        return run
+
+    def builtin_isTimerActive(self,args):
+        timer = self.compile_expression(args[0])
+        return lambda f: 0 if timer(f).due is None else 1
+
+    def builtin_ILSetSignal(self,args):
+        key = (args[0].leaf[0].leaf,args[0].leaf[1].leaf)
+        value = self.compile_expression(args[1])
+        signals = self.bus.signals
+        def run(f):
+            signals[key] = value(f)
+            return 0
+        return run
+
+    def builtin_getSignal(self,args):
+        return self.compile_expression(args[0])
+
+    def builtin_putValue(self,args):
+        value = self.compile_expression(args[1])
+        sim = self
+        if args[0].type == 'This':
+            return lambda f: sim.put_value(sim.this_env,value(f))
+        name = args[0].leaf
+        return lambda f: sim.put_value(name,value(f))
+
+    def builtin_getValue(self,args):
+        env = self.bus.env
+        sim = self
+        if args[0].type == 'This':
+            return lambda f: env.get(sim.this_env,0)
+        name = args[0].leaf
+        return lambda f: env.get(name,0)
+
+    def builtin_elcount(self,args):
+        array = self.compile_expression(args[0])
+        return lambda f: len(array(f))
+
+    def builtin_strncpy(self,args):
+        dest = self.compile_expression(args[0])
+        src = self.compile_expression(args[1])
+        count = self.compile_expression(args[2])
+        def run(f):
+            d = dest(f)
+            s = src(f)
+            if isinstance(s,str):
+                s = s.encode('latin-1')
+            n = min(count(f),len(d),len(s))
+            d[:n] = s[:n]
+            if n < len(d):
+                d[n] = 0
+            return 0
+        return run
+
+    def builtin_abs(self,args):
+        value = self.compile_expression(args[0])
+        return lambda f: abs(value(f))
+
+    def builtin_random(self,args):
+        limit = self.compile_expression(args[0])
+        rng = self.random
+        return lambda f: rng.randrange(limit(f))
+
+    def builtin_timeNow(self,args):
+        sim = self
+        return lambda f: int(sim.now * 100)        # CAPL counts in units of 10 us
+
+    builtins = { 'write' : builtin_write,
+                 'output' : builtin_output,
+                 'setTimer' : builtin_setTimer,
+                 'cancelTimer' : builtin_cancelTimer,
+                 'isTimerActive' : builtin_isTimerActive,
+                 'ILSetSignal' : builtin_ILSetSignal,
+                 'getSignal' : builtin_getSignal,
+                 'putValue' : builtin_putValue,
+                 'getValue' : builtin_getValue,
+                 'getvalue' : builtin_getValue,
+                 'elcount' : builtin_elcount,
+                 'strncpy' : builtin_strncpy,
+                 'abs' : builtin_abs,
+                 'random' : builtin_random,
+                 'timeNow' : builtin_timeNow,
+               }
+
+    # ---- compilation of statements ----
+
+    def declare(self,name,var_type):
+        conv = type_conversions.get(var_type)
+        if self.locals is None:
+            self.global_names.add(name)
+            if conv is not None:
+                self.global_types[name] = conv
+            return
+        self.locals[name] = (self.nslots,conv)
+        self.nslots += 1
+
+    def new_array(self,var_type,dims):
+        if len(dims) == 1:
+            if var_type == 'char':
+                return bytearray(dims[0])            # string
+            return [0.0 if var_type in ('float','double') else 0] * dims[0]
+        return [self.new_array(var_type,dims[1:]) for i in range(dims[0])]
+
+    def fill_array(self,array,values):
+        if isinstance(array,bytearray):
+            data = values.encode('latin-1') if isinstance(values,str) else bytes(values)
+            array[:len(data)] = data[:len(array)]
+            return array
+        if not isinstance(values,list):
+            values = [values]
+        for i,value in enumerate(values[:len(array)]):
+            if isinstance(value,(list,str)) and isinstance(array[i],(list,bytearray)):
+                self.fill_array(array[i],value)
+            else:
+                array[i] = value
+        return array
+
+    def compile_variable(self,var_type,variable):       # one variable of a declaration
+        if variable.type == 'Array' or variable.type == 'Assign_Array':
+            if variable.type == 'Array':
+                name,array_brackets = variable.leaf[0].leaf,variable.leaf[1]
+                init = None
+            else:
+                name,array_brackets = variable.children[0].leaf,variable.children[1]
+                init = variable.leaf
+            dims = self.compile_indices(array_brackets)
+            values = None if init is None else self.compile_expression(init)
+            self.declare(name,None)                     # arrays are not converted as a whole
+            store = self.compile_store(name)
+            sim = self
+            def run(f):
+                array = sim.new_array(var_type,[dim(f) for dim in dims])
+                if values is not None:
+                    sim.fill_array(array,values(f))
+                store(f,array)
+        elif variable.type == 'Assign':
+            name = variable.children.leaf
+            value = self.compile_expression(variable.leaf)
+            self.declare(name,var_type)
+            store = self.compile_store(name)
+            def run(f):
+                store(f,value(f))
+        else:
+            name = variable.leaf
+            self.declare(name,var_type)
+            store = self.compile_store(name)
+            if var_type in ('timer','msTimer'):
+                timer = SimTimer(name,1000 if var_type == 'timer' else 1)
+                def run(f):
+                    store(f,timer)
+            else:
+                initial = 0.0 if var_type in ('float','double') else 0
+                def run(f):
+                    store(f,initial)
+        return run
+
+    def compile_declaration(self,node):
+        var_type = node.leaf.leaf
+        variables = [self.compile_variable(var_type,variable) for variable in as_list(node.children)]
+        if len(variables) == 1:
+            return variables[0]
+        def run(f):
+            for variable in variables:
+                variable(f)
+        return run
+
+    def compile_message(self,node):
+        name = node.children.leaf
+        if node.leaf.type == 'INT':
+            msg_id = int(node.leaf.leaf)
+        elif node.leaf.type == 'HEX':
+            msg_id = int(node.leaf.leaf,16)
+        else:
+            msg_id = node.leaf.leaf                     # name of a database message
+        self.message_ids[name] = msg_id
+        self.declare(name,None)
+        store = self.compile_store(name)
+        def run(f):
+            store(f,SimMessage(name,msg_id))
+        return run
+
+    def compile_assign(self,node):
+        if node.type == 'Assign_OP':
+            target = node.children[0]
+            op = binary_operators[assign_operators[node.leaf]]
+            value = self.compile_expression(node.children[1])
+            load = self.compile_expression(target)
+        else:
+            target = node.children if node.type == 'Assign' else None
+            value = self.compile_expression(node.leaf)
+            load = None
+
+        self.locate(node.children[0] if isinstance(node.children,tuple) else node.children)
+        if node.type == 'Assign_Array':
+            store = self.compile_array_store(node.children[0].leaf,node.children[1])
+        elif target.type == 'Signal':
+            message,signal = target.leaf.split('.',1)
+            message = self.compile_load(message)
+            def store(f,v):
+                message(f).signals[signal] = v
+        elif target.type == 'ThisDot':
+            signal = target.leaf.split('.',1)[1]
+            sim = self
+            def store(f,v):
+                sim.this.signals[signal] = v
+        elif target.type == 'Array':
+            store = self.compile_array_store(target.leaf[0].leaf,target.leaf[1])
+        else:
+            store = self.compile_store(target.leaf)
+
+        if load is None:
+            def run(f):
+                store(f,value(f))
+        else:
+            def run(f):
+                store(f,op(load(f),value(f)))
+        return run
+
+    def compile_block(self,children):
+        statements = [self.compile_statement(child) for child in as_list(children)]
+        statements = [statement for statement in statements if statement is not None]
+        if not statements:
+            return lambda f: None
+        if len(statements) == 1:
+            return statements[0]
+        def run(f):
+            for statement in statements:
+                result = statement(f)
+                if result is not None:
+                    return result
+        return run
+
+    def compile_switch(self,node):
+        value = self.compile_expression(node.leaf)
+        statements = []
+        entries = {}
+        default = None
+        for case in as_list(node.children):
+            if case.type != 'Case':
+                statements.append(self.compile_statement(case))
+                continue
+            if case.leaf == 'Default':
+                default = len(statements)
+            elif isinstance(case.leaf,Node):
+                label = self.compile_expression(case.leaf)
+                if not hasattr(label,'value'):
+                    self.locate(case)
+                    raise self.error("unsupported","case label %s" % case.leaf.leaf)     # not a constant
+                entries[label.value] = len(statements)
+            else:
+                entries[ord(case.leaf[1])] = len(statements)    # key, e.g. 'a'
+            statements.extend(self.compile_statement(child) for child in as_list(case.children))
+        statements = [statement or (lambda f: None) for statement in statements]
+        end = len(statements)
+        def run(f):
+            i = entries.get(value(f),default)
+            if i is None:
+                return None
+            while i < end:                          # fall through until break
+                result = statements[i](f)
+                if result is not None:
+                    if result == BREAK:
+                        return None
+                    return result
+                i += 1
+        return run
+
+    def compile_statement(self,node):
+        node_type = node.type
+        if node_type == 'COMMENT':
+            return None
+        if node_type == 'Declaration':
+            return self.compile_declaration(node)
+        if node_type == 'Decl-MSG':
+            return self.compile_message(node)
+        if node_type in ('Assign','Assign_OP','Assign_Array'):
+            return self.compile_assign(node)
+        if node_type == 'IF':
+            condition = self.compile_expression(node.leaf)
+            body = self.compile_block(node.children)
+            return lambda f: body(f) if condition(f) else None
+        if node_type == 'IF-ELSE':
+            condition = self.compile_expression(node.leaf)
+            body = self.compile_block(node.children[0])
+            orelse = self.compile_block(node.children[1])
+            return lambda f: body(f) if condition(f) else orelse(f)
+        if node_type in ('WHILE','DO-WHILE','FOR'):
+            if node_type == 'FOR':
+                init = node.leaf[0]
+                if init.type == 'Declaration':
+                    init = self.compile_declaration(init)
+                else:
+                    init = self.compile_assign(init)
+                condition = self.compile_expression(node.leaf[1])
+                step = self.compile_expression(node.leaf[2])
+            else:
+                init = None
+                condition = self.compile_expression(node.leaf)
+                step = None
+            body = self.compile_block(node.children)
+            first = node_type == 'DO-WHILE'
+            def run(f):
+                if init is not None:
+                    init(f)
+                if first or condition(f):
+                    while True:
+                        result = body(f)
+                        if result is not None:
+                            if result == BREAK:
+                                return None
+                            if result == RETURN:
+                                return result
+                        if step is not None:
+                            step(f)
+                        if not condition(f):
+                            return None
+            return run
+        if node_type == 'SWITCH':
+            return self.compile_switch(node)
+        if node_type == 'BREAK':
+            return lambda f: BREAK
+        if node_type == 'CONTINUE':
+            return lambda f: CONTINUE
+        if node_type == 'RETURN':
+            value = self.compile_expression(node.leaf)
+            def run(f):
+                f[0] = value(f)
+                return RETURN
+            return run
+        expression = self.compile_expression(node)       # function call
+        def run(f):
+            expression(f)
+        return run
+
+    # ---- functions, events and globals ----
+
+    def function_name(self,node):
+        declaration = node.leaf
+        if isinstance(declaration,Node):            # name()
+            return declaration.leaf,None,[]
+        if len(declaration) == 2:
+            if declaration[0].type == 'ID':         # name(parameters)
+                return declaration[0].leaf,None,as_list(declaration[1])
+            return declaration[1].leaf,declaration[0].leaf,[]        # type name()
+        return declaration[1].leaf,declaration[0].leaf,as_list(declaration[2])
+
+    def compile_function(self,node):
+        name,return_type,parameters = self.function_name(node)
+        self.locals = {}
+        self.nslots = 1
+        for parameter in parameters:
+            if isinstance(parameter.leaf,tuple):    # int x
+                self.declare(parameter.leaf[1].leaf,parameter.leaf[0].leaf)
+            else:
+                self.declare(parameter.leaf.leaf,None)
+        conversions = [conv for slot,conv in sorted(self.locals.values(),key=lambda entry: entry[0])]
+        body = self.compile_checked(node.children,"%s()" % name)
+        nslots = self.nslots
+        self.locals = None
+        def function(*args):
+            if len(args) != len(conversions):
+                raise TypeError("%s() takes %d argument(s), %d given" % (name,len(conversions),len(args)))
+            f = [None]*nslots
+            for i,arg in enumerate(args):
+                conv = conversions[i]
+                f[i+1] = arg if conv is None else conv(arg)
+            body(f)
+            return f[0]
+        function.__name__ = name
+        return name,function
+
+    def compile_event(self,node):
+        if isinstance(node.leaf,tuple):
+            kind = node.leaf[0].split()[-1]          # 'on message' -> 'message'
+            target = node.leaf[1]
+            if target.type == 'INT':
+                target = int(target.leaf)
+            elif target.type == 'HEX':
+                target = int(target.leaf,16)
+            elif target.type == 'Key':
+                target = target.leaf[1]
+            else:
+                target = target.leaf
+        else:
+            kind = node.leaf.split()[-1]
+            target = None
+        self.locals = {}
+        self.nslots = 1
+        body = self.compile_checked(node.children,"on %s%s" % (kind,"" if target is None else " %s" % target))
+        nslots = self.nslots
+        self.locals = None
+        def handler():
+            body([None]*nslots)
+        self.events.setdefault((kind,target),[]).append(handler)
+
+    def compile_checked(self,children,name):    # body of a function or a handler, raising its compile error when run
+        try:
+            return self.compile_block(children)
+        except SimulationError as e:
+            error = SimulationError("%s: %s" % (name,e))
+        self.errors.append(str(error))
+        print("ERROR! %s" % error)
+        def run(f):
+            raise error
+        return run
+
+    def compile_program(self,tree):
+        fragments = as_list(tree)
+        for fragment in fragments:                  # user functions may be called before they are defined
+            if fragment.type == 'Function_UD':
+                self.function_nodes[self.function_name(fragment)[0]] = fragment
+        for fragment in fragments:
+            if fragment.type == 'GlobalVars_decl':
+                self.locals = None
+                for statement in as_list(fragment.children):
+                    try:
+                        run = self.compile_statement(statement)
+                    except SimulationError as e:
+                        self.errors.append("variables: %s" % e)
+                        print("ERROR! variables: %s" % e)
+                        continue
+                    if run is not None:
+                        run(None)                   # globals are initialized once
+        for fragment in fragments:
+            if fragment.type == 'Function_UD':
+                name,function = self.compile_function(fragment)
+                self.functions[name] = function
+            elif fragment.type == 'CAPL_event':
+                self.compile_event(fragment)
+
+    # ---- simulation ----
+
+    def fire(self,kind,target=None):
+        for handler in self.events.get((kind,target),()):
+            handler()
+
+    def start(self):
+        self.fire('preStart')
+        self.fire('start')
+
+    def stop(self):
+        self.fire('preStop')
+        self.fire('stopMeasurement')
+
+    def call(self,name,*args):
+        return self.functions[name](*args)
+
+    def receive(self,message,data=b'',dlc=None,channel=1):     # message name or identifier
+        if isinstance(message,str):
+            msg_id = self.message_ids.get(message)
+            name = message
+        else:
+            msg_id = message
+            name = self.message_names().get(message)
+        self.this = SimMessage(name,msg_id,data,dlc,channel)
+        self.fire('message',msg_id)
+        if name is not None:
+            self.fire('message',name)
+
+    def receive_frame(self,frame):              # frame tuple of AscReplay, e.g. AscReplay(f).replay(sim.receive_frame)
+        timestamp,msg_id,dlc,flags,channel,data = frame
+        self.advance(timestamp*1000 - self.now)
+        self.receive(msg_id,data[:dlc],dlc,channel)
+
+    def message_names(self):
+        if self._message_names is None:
+            self._message_names = dict((msg_id,name) for name,msg_id in self.message_ids.items())
+        return self._message_names
+
+    def press_key(self,key):
+        self.fire('key',key)
+
+    def put_value(self,name,value):
+        self.bus.env[name] = value
+        previous = self.this_env
+        self.this_env = name
+        self.fire('envVar',name)
+        self.this_env = previous
+        return 0
+
+    def set_timer(self,timer,period):
+        self.timer_seq += 1
+        timer.due = self.now + period*timer.unit
+        heapq.heappush(self.timer_queue,(timer.due,self.timer_seq,timer))
+
+    def advance(self,ms):                       # virtual time, timers fire in order of expiry
+        end = self.now + ms
+        queue = self.timer_queue
+        while queue and queue[0][0] <= end:
+            due,seq,timer = heapq.heappop(queue)
+            if timer.due != due:
+                continue                        # cancelled or restarted
+            timer.due = None
+            self.now = due
+            self.fire('timer',timer.name)
+        self.now = end
+
+    def __init__(self,tree,bus=None,echo=False,seed=0):
+        self.bus = bus if bus is not None else SimBus()
+        self.echo = echo                        # print write() output
+        self.random = random.Random(seed)
+        self.globals = {}
+        self.global_names = set()               # declared in variables {}, other names are compile errors
+        self.global_types = {}
+        self.line = None                        # of the code being compiled
+        self.errors = []                        # compile errors, the function or handler raises its error when run
+        self.locals = None
+        self.nslots = 0
+        self.functions = {}
+        self.function_nodes = {}
+        self.events = {}
+        self.message_ids = {}
+        self._message_names = None
+        self.unsupported = set()
+        self.this = SimMessage(None,None)         # 'this' outside of message events
+        self.this_env = None
+        self.now = 0.0                          # ms
+        self.timer_queue = []
+        self.timer_seq = 0
+        self.compile_program(tree)
@@ -0,0 +1,151 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Thin client of conversionDaemon.py, imports nothing but the standard library so that starting it
+# costs a few milliseconds. Options and output as for restbusCli.py, e.g.
+#   python conversionClient.py capl2c -d vehicle.dbc -o build "nodes/*.can"
+#   python conversionClient.py stop
+
+import argparse
+import glob
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+def default_socket():                           # as conversionDaemon.default_socket()
+    return os.path.join(tempfile.gettempdir(),'restbusConverter-%d.sock' % os.getuid())
+
+def expand_inputs(patterns):                    # absolute paths, the daemon has its own working directory
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern,recursive=True)) if any(c in pattern for c in '*?[') else [pattern]
+        if not matches:
+            raise ValueError("no file matches %s" % pattern)
+        files.extend(os.path.abspath(path) for path in matches)
+    return files
+
+def absolute(path):
+    return os.path.abspath(path) if path else path
+
+class ConversionClient:
+
+    def __init__(self,path=None):
+        self.sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        self.sock.connect(path or default_socket())
+        self.file = self.sock.makefile('rwb')
+
+    def request(self,request):                  # answer of the daemon as a dict
+        self.file.write(json.dumps(request).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Convert files by the running conversionDaemon.py.")
+    arg_parser.add_argument('--socket',default=default_socket())
+    commands = arg_parser.add_subparsers(dest='command',required=True)
+    for command in ('capl2c','capl2wwb'):
+        command_parser = commands.add_parser(command)
+        command_parser.add_argument('-d','--database')
+        command_parser.add_argument('-o','--output-dir')
+    command_parser = commands.add_parser('xvp2aof')
+    command_parser.add_argument('-o','--output',default='generatedWorkspace.aof')
+    command_parser = commands.add_parser('pre-config')
+    command_parser.add_argument('--port',default='HU_CAN')
+    command_parser.add_argument('--bit-rate',required=True)
+    command_parser.add_argument('--nw-descriptor',required=True)
+    command_parser.add_argument('--rbs-descriptor',required=True)
+    for command_parser in list(commands.choices.values()):
+        command_parser.add_argument('-v','--verbose',action='store_true')
+        command_parser.add_argument('files',nargs='+')
+    commands.add_parser('ping')
+    commands.add_parser('stop')
+    return arg_parser
+
+def make_request(args):
+    request = {'command': args.command}
+    if args.command in ('ping','stop'):
+        return request
+    request['files'] = expand_inputs(args.files)
+    request['verbose'] = args.verbose
+    if args.command in ('capl2c','capl2wwb'):
+        request['database'] = absolute(args.database)
+        request['output_dir'] = absolute(args.output_dir)
+    elif args.command == 'xvp2aof':
+        request['output'] = absolute(args.output)
+    else:
+        request.update(port=args.port,bit_rate=args.bit_rate,nw_descriptor=args.nw_descriptor,
+                       rbs_descriptor=args.rbs_descriptor)
+    return request
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    start = time.perf_counter()
+    try:
+        request = make_request(args)
+        client = ConversionClient(args.socket)
+    except ValueError as e:
+        print("ERROR! %s" % e)
+        return 2
+    except OSError as e:
+        print("ERROR! No conversion daemon at %s (%s), start conversionDaemon.py" % (args.socket,e))
+        return 2
+    try:
+        answer = client.request(request)
+    except OSError as e:                        # ConnectionError as well, e.g. the daemon stopped meanwhile
+        print("ERROR! No answer of the conversion daemon (%s)" % e)
+        return 2
+    finally:
+        client.close()
+
+    if 'error' in answer:
+        print("ERROR! %s" % answer['error'])
+        return 2
+    if args.command == 'ping':
+        print("Conversion daemon running, pid %d" % answer['pid'])
+    results = answer.get('results',[])
+    for result in results:
+        if args.verbose and result['output']:
+            sys.stdout.write(result['output'])
+        if result['ok']:
+            print("OK    %8.1f ms  %s" % (result['seconds']*1000,result['name']))
+        else:
+            print("FAIL  %8.1f ms  %s: %s" % (result['seconds']*1000,result['name'],result['error']))
+    if results:
+        failed = sum(1 for result in results if not result['ok'])
+        print("%d converted, %d failed (%.1f ms)" % (len(results)-failed,failed,(time.perf_counter()-start)*1000))
+    return 0 if answer['ok'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Conversion server for build systems calling the converter many times. The parser tables, the imports
+# and the database indexes stay loaded, a request only pays for the parsing and the code generation.
+# The requests come from conversionClient.py over a Unix socket, one JSON object per line:
+#   {"command": "capl2c", "files": ["/abs/node.can"], "database": "/abs/db.dbc", "output_dir": null, "verbose": false}
+#   {"command": "xvp2aof", "files": [...], "output": "/abs/workspace.aof"}
+#   {"command": "pre-config", "files": [...], "port": "HU_CAN", "bit_rate": ..., "nw_descriptor": ..., "rbs_descriptor": ...}
+#   {"command": "ping"}, {"command": "stop"}
+# and every answer is one line: {"ok": true, "results": [{"name", "ok", "seconds", "error", "output"}, ...]}.
+# Connections are served on their own threads, the files of one request one after another.
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import time
+
+import conversionJobs
+
+def default_socket():
+    return os.path.join(tempfile.gettempdir(),'restbusConverter-%d.sock' % os.getuid())
+
+def make_jobs(request):                         # [(name, function, args)] as for conversionJobs.run_jobs()
+    command = request.get('command')
+    files = request.get('files') or []
+    if not isinstance(files,list) or not all(isinstance(path,str) for path in files):
+        raise conversionJobs.ConversionError("files must be a list of paths")
+    if command in ('capl2c','capl2wwb'):
+        function,extension = {'capl2c': (conversionJobs.capl_to_c,'.c'),
+                              'capl2wwb': (conversionJobs.capl_to_wwb,'.mac')}[command]
+        if request.get('output_dir'):
+            os.makedirs(request['output_dir'],exist_ok=True)
+        return [(caplFile,function,(caplFile,conversionJobs.output_path(caplFile,extension,request.get('output_dir')),
+                                    request.get('database'))) for caplFile in files]
+    if command == 'xvp2aof':
+        return [(request['output'],conversionJobs.xvp_to_aof,(files,request['output'],1))]
+    if command == 'pre-config':
+        return [(preConf,conversionJobs.pre_config,(preConf,request.get('port','HU_CAN'),request['bit_rate'],
+                                                    request['nw_descriptor'],request['rbs_descriptor']))
+                for preConf in files]
+    raise conversionJobs.ConversionError("unknown command %s" % command)
+
+def serve_request(request):
+    if request.get('command') == 'ping':
+        return {'ok': True, 'pid': os.getpid()}
+    results = []
+    for name,function,args in make_jobs(request):
+        result = conversionJobs.run_job(name,function,args)
+        results.append({'name': result.name, 'ok': result.ok, 'seconds': result.seconds, 'error': result.error,
+                        'output': result.output if request.get('verbose') else ''})
+    return {'ok': all(result['ok'] for result in results), 'results': results}
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):                           # one connection may send any number of requests
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not isinstance(request,dict):        # e.g. [1,2] or "x", valid JSON as well
+                    raise ValueError("not a JSON object")
+                if request.get('command') == 'stop':
+                    answer = {'ok': True}
+                    self.server.stopping = True
+                else:
+                    answer = serve_request(request)
+            except (ValueError,KeyError,TypeError,conversionJobs.ConversionError) as e:
+                answer = {'ok': False, 'error': "bad request: %s" % e}
+            except OSError as e:                # e.g. an output directory that cannot be made
+                answer = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(answer).encode() + b'\n')
+            self.wfile.flush()
+            if self.server.stopping:
+                break
+
+class ConversionServer(socketserver.ThreadingMixIn,socketserver.UnixStreamServer):
+
+    daemon_threads = True                       # every connection on its own thread, idle ones do not delay a stop
+    stopping = False                            # set by a stop request
+    timeout = 0.2                               # handle_request() returns to check it
+
+def remove_stale_socket(path):                  # a socket left by a killed daemon, not one in use
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise conversionJobs.ConversionError("a daemon is already listening at %s" % path)
+
+def serve(path):
+    remove_stale_socket(path)
+    start = time.perf_counter()
+    conversionJobs.prepare()                    # parser tables loaded before the first request
+    server = ConversionServer(path,RequestHandler)
+    os.chmod(path,0o600)
+    print("Conversion daemon listening at %s (ready in %.1f ms)" % (path,(time.perf_counter()-start)*1000))
+    try:
+        while not server.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+    print("Conversion daemon stopped.")
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Serve conversion requests of conversionClient.py.")
+    arg_parser.add_argument('--socket',default=default_socket())
+    args = arg_parser.parse_args()
+    try:
+        serve(args.socket)
+    except conversionJobs.ConversionError as e:
+        print("ERROR! %s" % e)
+        sys.exit(2)
@@ -0,0 +1,259 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+# Conversions without the GUI. Every job runs with its console output captured, so many of them
+# can run in a process pool and report one line each.
+
+from concurrent.futures import ProcessPoolExecutor,ThreadPoolExecutor
+from collections import namedtuple
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from parserPy import Parser
+import conversionMetrics
+import ply.yacc as yacc
+import preConfig
+import xvpConverter
+
+JobResult = namedtuple('JobResult', 'name ok seconds error output metrics')
+
+class ConversionError(Exception):
+    pass
+
+def output_path(inputFile,extension,outputDir=None):       # e.g. node.can -> node.c next to the input
+    name = os.path.splitext(os.path.basename(inputFile))[0] + extension
+    return os.path.join(outputDir or os.path.dirname(os.path.abspath(inputFile)),name)
+
+def expand_inputs(patterns):                    # globs are expanded here as well, e.g. for the Windows shell
+    files = []
+    for pattern in patterns:
+        if any(c in pattern for c in '*?['):
+            matches = sorted(glob.glob(pattern,recursive=True))
+            if not matches:
+                raise ConversionError("no file matches %s" % pattern)
+            files.extend(matches)
+        else:
+            files.append(pattern)
+    return files
+
+def parse_capl(caplFile,databaseFile,progress=None,metrics=None):
+    parser_init = Parser()
+    parser_init.progress = progress
+    if metrics:
+        metrics.source = metrics.source or caplFile
+        metrics.start()
+        parser_init.metrics = metrics
+    parser_init.load_database(databaseFile)
+    ast_tree = parser_init.get_ast_tree(caplFile)
+    if ast_tree is None or parser_init.syntax_errors:
+        raise ConversionError("%d syntax errors" % max(parser_init.syntax_errors,1))
+    return parser_init,ast_tree
+
+def generate(parser_init,generate_code,ast_tree,progress):
+    if not progress and not parser_init.metrics:
+        generate_code(ast_tree)
+        return
+    fragments = ast_tree if isinstance(ast_tree,tuple) else (ast_tree,)
+    parser_init.env_code.scan(ast_tree)         # whole tree, as generate_code_c does on the first call
+    with parser_init.measure('generate') as counters:
+        for done,fragment in enumerate(fragments,1):
+            with parser_init.measure('generate',conversionMetrics.fragment_name(fragment)) as fragment_counters:
+                emitted = len(parser_init.string)
+                generate_code(fragment)
+                if parser_init.metrics:
+                    fragment_counters['bytes'] = len(parser_init.string) - emitted
+                    fragment_counters['nodes'] = conversionMetrics.count_nodes(fragment)
+            if progress:
+                progress('generate',done,len(parser_init.string))      # fragments generated, bytes emitted
+        counters['bytes'] = len(parser_init.string)
+
+def write(parser_init,write_to_file,outputFile):
+    with parser_init.measure('write') as counters:
+        write_to_file(outputFile)
+        counters['bytes'] = os.path.getsize(outputFile)
+
+def capl_to_wwb(caplFile,outputFile,databaseFile=None,progress=None,metrics=None):     # metrics, if given
+    try:
+        parser_init,ast_tree = parse_capl(caplFile,databaseFile,progress,metrics)
+        generate(parser_init,parser_init.generate_code,ast_tree,progress)
+        write(parser_init,parser_init.write_to_file,outputFile)
+    finally:
+        if metrics:
+            metrics.stop()
+    return metrics
+
+def capl_to_c(caplFile,outputFile,databaseFile=None,progress=None,metrics=None):
+    try:
+        parser_init,ast_tree = parse_capl(caplFile,databaseFile,progress,metrics)
+        generate(parser_init,parser_init.generate_code_c,ast_tree,progress)
+        write(parser_init,parser_init.write_to_file_c,outputFile)
+    finally:
+        if metrics:
+            metrics.stop()
+    return metrics
+
+def xvp_to_aof(xvpFiles,aofFile,workers=None,progress=None):
+    xvpConverter.convert_workspace(xvpFiles,aofFile,workers,progress=progress)
+
+def pre_config(preConf,portName,bitRate,nwDescriptor,rbsDescriptor):
+    if preConfig.PreConfigPatcher().patch(preConf,portName,bitRate,nwDescriptor,rbsDescriptor) == preConfig.FAILED:
+        raise ConversionError("not patched")
+
+class ThreadOutput:
+
+    # sys.stdout sending what each thread prints to its own buffer, if it has one. contextlib.redirect_stdout()
+    # replaces sys.stdout for the whole process, so jobs on several threads would get each other's output.
+    def __init__(self,stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self,text):
+        buffer = getattr(self.local,'buffer',None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def __getattr__(self,name):                 # flush(), encoding, ... of the real stream
+        return getattr(self.stream,name)
+
+install_lock = threading.Lock()
+
+@contextlib.contextmanager
+def captured_output():                          # print() of the calling thread goes to the yielded StringIO
+    with install_lock:
+        if not isinstance(sys.stdout,ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        thread_output = sys.stdout
+    previous = getattr(thread_output.local,'buffer',None)
+    thread_output.local.buffer = io.StringIO()
+    try:
+        yield thread_output.local.buffer
+    finally:
+        thread_output.local.buffer = previous
+
+def run_job(name,function,args):                # JobResult, exceptions of the converter are reported, not raised
+    start = time.perf_counter()
+    error = None
+    metrics = None
+    with captured_output() as output:
+        try:
+            metrics = function(*args)
+        except ConversionError as e:
+            error = str(e)
+        except Exception as e:
+            error = "%s: %s" % (type(e).__name__,e)
+    if error is not None:                       # messages printed by the converter first
+        error = "; ".join([line for line in output.getvalue().splitlines() if line.startswith("ERROR!")] + [error])
+    return JobResult(name,error is None,time.perf_counter()-start,error,output.getvalue(),metrics)
+
+def prepare():                                  # parser tables are written once here, not by every worker at once
+    with captured_output():
+        yacc.yacc(module = Parser(),errorlog = yacc.NullLogger())
+
+def run_jobs(jobs,workers=None,threads=False):  # jobs: [(name, function, args)], yields JobResults in the order of jobs
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if len(jobs) < 2 or workers < 2:
+        for name,function,args in jobs:
+            yield run_job(name,function,args)
+        return
+    prepare()
+    if threads:                                 # overlaps file I/O only, e.g. on network drives
+        executor = ThreadPoolExecutor(max_workers=min(workers,len(jobs)))
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(workers,len(jobs)))
+    with executor:
+        futures = [executor.submit(run_job,name,function,args) for name,function,args in jobs]
+        for future in futures:
+            yield future.result()
+
+def run_reporting_job(events,name,function,args):      # BackgroundJob process, progress and the result go to events
+    if hasattr(os,'setpgid'):                   # with its pool workers in one group, cancel() kills them all
+        os.setpgid(0,0)
+    def progress(stage,count,size):
+        events.put(('progress',stage,count,size))
+    events.put(('result',run_job(name,function,args + (progress,))))
+
+def kill_process_tree(process):                 # the process and the processes it started
+    try:
+        if hasattr(os,'killpg'):
+            os.killpg(process.pid,signal.SIGKILL)   # group made by run_reporting_job()
+        else:
+            subprocess.run(['taskkill','/F','/T','/PID',str(process.pid)],
+                           stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+    except OSError:                             # group not made yet, no pool workers either
+        pass
+    process.terminate()
+    process.join()
+
+class BackgroundJob:
+
+    # One conversion in its own process, so the window stays responsive. The caller polls the events,
+    # e.g. from Tk after(): ('progress', stage, count, bytes) while it runs, ('result', JobResult) at the end.
+    # cancel() kills the process and its pool workers, the outputs are replaced only once complete so they
+    # stay as they were; the temporary files of the process are removed, outputs are paths or globs of them.
+    def __init__(self,name,function,args,outputs=()):
+        self.name = name
+        self.outputs = outputs
+        self.result = None
+        self.start = time.perf_counter()
+        self.events = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=run_reporting_job,args=(self.events,name,function,tuple(args)))
+        self.process.start()
+
+    def poll(self):                             # events received since the last call, never blocks for long
+        events = []
+        while self.result is None:
+            try:
+                event = self.events.get(block=not self.process.is_alive(),timeout=1)   # flushed before the exit
+            except queue.Empty:
+                if not self.process.is_alive():
+                    self.finish("worker exited with code %s" % self.process.exitcode)
+                break
+            if event[0] == 'result':
+                self.result = event[1]
+                self.process.join()
+            events.append(event)
+        return events
+
+    def cancel(self):
+        if self.result is None:
+            kill_process_tree(self.process)
+            for output in self.outputs:
+                for temp_path in glob.glob(output + '.%d.*.tmp' % self.process.pid):
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
+            self.finish("cancelled")
+
+    def finish(self,error):
+        self.result = JobResult(self.name,False,time.perf_counter()-self.start,error,"",None)
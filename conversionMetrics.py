@@ -0,0 +1,207 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Where the time of a conversion goes. A Parser with a ConversionMetrics in its metrics attribute records
+# every stage -- lex, tables (LALR tables of yacc), parse, generate and write --
+# and every top-level fragment (variables, functions, event handlers) of parse and generate:
+#   metrics = ConversionMetrics(memory=True,profile_stage='generate')
+#   conversionJobs.capl_to_c('node.can','node.c','db.dbc',metrics=metrics)
+#   metrics.write_report('node_metrics.csv')
+# Wall and CPU times are of the calling thread. Memory peaks come from tracemalloc, which slows the
+# conversion down about twice, so they are recorded only when asked for.
+
+import contextlib
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+STAGES = ('lex','tables','parse','generate','write')
+FIELDS = ('file','stage','fragment','wall_ms','cpu_ms','tokens','nodes','bytes','peak_kb')
+PROFILE_LINES = 40                              # functions in the text of the profile
+
+def fragment_name(fragment):                    # e.g. 'variables', 'myFunc', 'on message Msg_1'
+    node_type = getattr(fragment,'type',None)
+    leaf = getattr(fragment,'leaf',None)
+    if node_type == 'GlobalVars_decl':
+        return 'variables'
+    if node_type == 'COMMENT':
+        return 'comment'
+    if node_type == 'CAPL_event':
+        if isinstance(leaf,tuple):
+            return "%s %s" % (leaf[0],getattr(leaf[1],'leaf',leaf[1]))
+        return str(leaf).strip()
+    if node_type == 'Function_UD':
+        for part in (leaf if isinstance(leaf,tuple) else (leaf,)):
+            if getattr(part,'type',None) == 'ID':
+                return part.leaf
+    return str(node_type)
+
+def count_nodes(tree):                          # AST nodes, iteratively -- expressions nest deeply
+    count = 0
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item,(tuple,list)):
+            stack.extend(item)
+        elif hasattr(item,'children'):
+            count += 1
+            stack.append(item.children)         # a list, a tuple or a single Node
+            stack.append(item.leaf)
+    return count
+
+class ConversionMetrics:
+
+    @contextlib.contextmanager
+    def measure(self,stage,fragment=None):      # yields a dict for tokens, nodes and bytes of the stage
+        counters = {}
+        profiling = stage == self.profile_stage and not self.profiling     # outermost measure of the stage
+        memory = self.memory and tracemalloc.is_tracing()
+        if memory:
+            current,peak = tracemalloc.get_traced_memory()
+            if self.memory_stack:               # the enclosing stage keeps its own peak
+                self.memory_stack[-1][1] = max(self.memory_stack[-1][1],peak)
+            self.memory_stack.append([current,0])
+            tracemalloc.reset_peak()
+        self.splits[stage] = time.perf_counter(),time.thread_time()
+        if profiling:
+            self.profiling = True
+            self.profiler.enable()
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield counters
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            if profiling:
+                self.profiler.disable()
+                self.profiling = False
+            peak_kb = None
+            if memory:
+                start,inner_peak = self.memory_stack.pop()
+                peak = max(tracemalloc.get_traced_memory()[1],inner_peak)
+                peak_kb = (peak - start) // 1024
+                if self.memory_stack:
+                    self.memory_stack[-1][1] = max(self.memory_stack[-1][1],peak)
+            self.add(stage,fragment,wall,cpu,peak_kb=peak_kb,**counters)
+
+    def split(self,stage,fragment,**counters):  # fragment done, e.g. reduced by the parser: time since the last split
+        now_wall,now_cpu = time.perf_counter(),time.thread_time()
+        last_wall,last_cpu = self.splits.get(stage,(now_wall,now_cpu))
+        self.splits[stage] = now_wall,now_cpu
+        self.add(stage,fragment,now_wall - last_wall,now_cpu - last_cpu,**counters)
+
+    def add(self,stage,fragment,wall,cpu,tokens=None,nodes=None,bytes=None,peak_kb=None):
+        self.records.append({'file': self.source, 'stage': stage, 'fragment': fragment, 'wall_ms': wall * 1000,
+                             'cpu_ms': cpu * 1000, 'tokens': tokens, 'nodes': nodes, 'bytes': bytes,
+                             'peak_kb': peak_kb})
+
+    def stages(self):                           # records of whole stages; events, measured per message, summed up
+        stages = [record for record in self.records if record['fragment'] is None]
+        measured = set(record['stage'] for record in stages)
+        for stage in STAGES:
+            fragments = self.fragments(stage)
+            if fragments and stage not in measured:
+                stages.append({'file': self.source, 'stage': stage, 'fragment': None,
+                               'wall_ms': sum(record['wall_ms'] for record in fragments),
+                               'cpu_ms': sum(record['cpu_ms'] for record in fragments), 'tokens': None,
+                               'nodes': None, 'bytes': None, 'peak_kb': None})
+        return sorted(stages,key=lambda record: STAGES.index(record['stage']))
+
+    def fragments(self,stage):
+        return [record for record in self.records if record['stage'] == stage and record['fragment'] is not None]
+
+    def profile(self):                          # text of the cProfile capture, sorted by cumulative time
+        if self.profile_text is None and self.profiler is not None:
+            text = io.StringIO()
+            pstats.Stats(self.profiler,stream=text).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            self.profile_text = text.getvalue()
+            if self.profile_file:
+                self.profiler.dump_stats(self.profile_file)     # for pstats, snakeviz, ...
+        return self.profile_text
+
+    def start(self):                            # before the first stage, tracemalloc if not running already
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        self.profile()
+
+    def as_dict(self):
+        return {'file': self.source, 'stages': self.stages(), 'fragments': [record for record in self.records
+                if record['fragment'] is not None], 'profile_stage': self.profile_stage, 'profile': self.profile()}
+
+    def write_report(self,path):
+        write_report([self],path)
+
+    def __getstate__(self):                     # sent back from worker processes without the profiler
+        self.profile()
+        state = self.__dict__.copy()
+        state['profiler'] = None
+        return state
+
+    def __init__(self,source=None,memory=False,profile_stage=None,profile_file=None):
+        self.source = source                    # CAPL file, set by the conversion if None
+        self.memory = memory
+        self.profile_stage = profile_stage      # one of STAGES captured by cProfile
+        self.profile_file = profile_file
+        self.profiler = cProfile.Profile() if profile_stage else None
+        self.profile_text = None
+        self.profiling = False
+        self.records = []
+        self.splits = {}
+        self.memory_stack = []
+        self.started_tracing = False
+
+def write_report(metrics_list,path):            # JSON, or CSV if the path ends with .csv
+    temp_path = path + '.%d.%d.tmp' % (os.getpid(),threading.get_ident())
+    if path.lower().endswith('.csv'):
+        with open(temp_path,'w',newline='') as f:
+            writer = csv.DictWriter(f,FIELDS)
+            writer.writeheader()
+            for metrics in metrics_list:
+                writer.writerows(metrics.records)
+    else:
+        with open(temp_path,'w') as f:
+            json.dump([metrics.as_dict() for metrics in metrics_list],f,indent=2)
+    os.replace(temp_path,path)
+
+def summary(metrics):                           # lines for the console, one per stage
+    lines = []
+    for record in metrics.stages():
+        counters = ", ".join("%s %d" % (name,record[name]) for name in ('tokens','nodes','bytes','peak_kb')
+                             if record[name] is not None)
+        lines.append("  %-8s %9.1f ms wall %9.1f ms cpu  %s" % (record['stage'],record['wall_ms'],record['cpu_ms'],counters))
+    return lines
@@ -0,0 +1,233 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+from collections import namedtuple
+import hashlib
+import marshal
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+
+INDEX_VERSION = b'3'            # change whenever Message/Signal or the parsing changes, old indexes are then ignored
+
+Message = namedtuple('Message', 'name id extended dlc sender cycle_time signals')      # signals: dict name -> Signal
+Signal = namedtuple('Signal', 'name start_bit length little_endian signed factor offset minimum maximum unit receivers multiplex')
+EnvVar = namedtuple('EnvVar', 'name type minimum maximum unit initial')          # type: 0 integer, 1 float, 2 string
+
+ENV_INTEGER = 0
+ENV_FLOAT = 1
+ENV_STRING = 2
+
+class DatabaseIndex:
+
+    # The index keeps one (name, id, extended, dlc, sender, cycle_time, signal count, signals) entry per message.
+    # Signals are stored marshalled and only decoded when a message is looked up - a CAPL file uses
+    # a handful of messages out of thousands, so loading the index costs a few milliseconds.
+
+    def message(self,name):
+        msg = self.decoded.get(name)
+        if msg is None:
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            signals = dict((sig[0],Signal._make(sig)) for sig in marshal.loads(entry[7]))
+            msg = self.decoded[name] = Message._make(entry[:6] + (signals,))
+        return msg
+
+    def message_by_id(self,id):                 # DBC identifier, i.e. CAN_EFF_FLAG (bit 31) set for extended frames
+        name = self.ids.get(id)
+        if name is None:
+            return None
+        return self.message(name)
+
+    def signal(self,message,signal):            # e.g. signal('Ctrl_C_Stat1_AR','ReturnKey_Psd_UB')
+        msg = self.message(message)
+        if msg is None:
+            return None
+        return msg.signals.get(signal)
+
+    def signal_owner(self,signal):              # message of a signal referenced without Msg::, decodes messages until found
+        for name in self.entries:
+            msg = self.message(name)
+            if signal in msg.signals:
+                return msg
+        return None
+
+    def env_var(self,name):
+        return self.env_vars.get(name)
+
+    def message_names(self):
+        return self.entries.keys()
+
+    def signal_count(self):
+        return sum(entry[6] for entry in self.entries.values())
+
+    def __init__(self,source,entries,env_vars=None):
+        self.source = source                    # path of the database the index was built from
+        self.entries = entries                  # name -> entry, see above
+        self.env_vars = env_vars or {}          # name -> EnvVar, DBC only
+        self.ids = dict(((entry[1] | 0x80000000) if entry[2] else entry[1],name) for name,entry in entries.items())
+        self.decoded = {}                       # name -> Message
+
+def message_entry(name,id,extended,dlc,sender,cycle_time,signals):     # signals: tuples in the order of Signal
+    return (name,id,extended,dlc,sender,cycle_time,len(signals),marshal.dumps(tuple(signals)))
+
+class DbcParser:
+
+    # BO_ 1234 Ctrl_C_Stat1_AR: 8 Ctrl
+    # SG_ ReturnKey_Psd_UB m2 : 7|1@0+ (1,0) [0|1] "" Gateway,Dash
+    # BA_ "GenMsgCycleTime" BO_ 1234 100;
+    # BA_DEF_DEF_ "GenMsgCycleTime" 0;
+    # EV_ Ignition: 0 [0|1] "" 0 1 DUMMY_NODE_VECTOR0 Vector__XXX;
+    line = re.compile(r'''^[ \t]*(?:
+        BO_[ \t]+(?P<bo_id>\d+)[ \t]+(?P<bo_name>\w+)[ \t]*:[ \t]*(?P<bo_dlc>\d+)[ \t]+(?P<bo_sender>\w+)
+      | SG_[ \t]+(?P<sg_name>\w+)[ \t]*(?P<sg_mux>M|m\d+)?[ \t]*:[ \t]*(?P<sg_start>\d+)\|(?P<sg_length>\d+)@(?P<sg_order>[01])(?P<sg_sign>[+-])
+            [ \t]*\((?P<sg_factor>[^,]+),(?P<sg_offset>[^)]+)\)[ \t]*\[(?P<sg_min>[^|]+)\|(?P<sg_max>[^\]]+)\][ \t]*"(?P<sg_unit>[^"]*)"[ \t]*(?P<sg_receivers>[\w, \t]*)
+      | BA_[ \t]+"GenMsgCycleTime"[ \t]+BO_[ \t]+(?P<ba_id>\d+)[ \t]+(?P<ba_value>\d+)
+      | BA_DEF_DEF_[ \t]+"GenMsgCycleTime"[ \t]+(?P<def_value>\d+)
+      | EV_[ \t]+(?P<ev_name>\w+)[ \t]*:[ \t]*(?P<ev_type>[012])[ \t]*\[(?P<ev_min>[^|]+)\|(?P<ev_max>[^\]]+)\][ \t]*"(?P<ev_unit>[^"]*)"[ \t]*(?P<ev_initial>[-+.\deE]+)
+    )''', re.M | re.X)
+
+    def parse(self,text):
+        messages = {}
+        cycle_times = {}
+        default_cycle_time = 0
+        signals = None
+        shared = {}                             # one object for repeated receivers and units, marshal stores it once
+
+        for m in self.line.finditer(text):
+            if m.group('bo_id') is not None:
+                raw_id = int(m.group('bo_id'))
+                signals = []
+                messages[m.group('bo_name')] = (raw_id,int(m.group('bo_dlc')),m.group('bo_sender'),signals)
+            elif m.group('sg_name') is not None:
+                if signals is None:
+                    continue                    # signal outside of a message, e.g. VECTOR__INDEPENDENT_SIG_MSG
+                receivers = tuple(r for r in re.split(r'[\s,]+',m.group('sg_receivers')) if r)
+                signals.append((m.group('sg_name'),int(m.group('sg_start')),int(m.group('sg_length')),
+                                m.group('sg_order') == '1',m.group('sg_sign') == '-',
+                                self.number(m.group('sg_factor')),self.number(m.group('sg_offset')),
+                                self.number(m.group('sg_min')),self.number(m.group('sg_max')),
+                                shared.setdefault(m.group('sg_unit'),m.group('sg_unit')),
+                                shared.setdefault(receivers,receivers),m.group('sg_mux')))
+            elif m.group('ba_id') is not None:
+                cycle_times[int(m.group('ba_id'))] = int(m.group('ba_value'))
+            elif m.group('ev_name') is not None:
+                self.env_vars[m.group('ev_name')] = EnvVar(m.group('ev_name'),int(m.group('ev_type')),
+                                                           self.number(m.group('ev_min')),self.number(m.group('ev_max')),
+                                                           m.group('ev_unit'),self.number(m.group('ev_initial')))
+            else:
+                default_cycle_time = int(m.group('def_value'))
+
+        entries = {}
+        for name,(raw_id,dlc,sender,signals) in messages.items():
+            entries[name] = message_entry(name,raw_id & 0x1FFFFFFF,bool(raw_id & 0x80000000),dlc,sender,
+                                          cycle_times.get(raw_id,default_cycle_time),signals)
+        return entries
+
+    def number(self,value):                     # keep integers exact, e.g. factor 1 and offset 0
+        value = value.strip()
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+
+    def __init__(self):
+        self.env_vars = {}                      # name -> EnvVar, filled by parse()
+
+def cache_path(databaseFile,key,cacheDir=None):
+    if cacheDir is None:
+        cacheDir = os.path.join(os.path.dirname(os.path.abspath(databaseFile)),'.dbc_cache')
+    return os.path.join(cacheDir,key + '.idx')
+
+def file_hash(databaseFile):                 # read in chunks, ARXML files have hundreds of MB
+    sha = hashlib.sha1(INDEX_VERSION + b'\0')
+    with open(databaseFile,'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20),b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def build_index(databaseFile):
+    ext = os.path.splitext(databaseFile)[1].lower()
+    env_vars = {}
+    if ext == '.dbc':
+        parser = DbcParser()
+        with open(databaseFile,'rb') as f:
+            entries = parser.parse(f.read().decode('latin-1'))       # DBC files are usually cp1252
+        env_vars = parser.env_vars
+    elif ext == '.arxml':
+        import arxmlImport                      # imports this module itself
+        entries = arxmlImport.ArxmlImporter().parse(databaseFile)
+    else:
+        print("ERROR! Unsupported database format: %s" % databaseFile)
+        return None
+    return DatabaseIndex(databaseFile,entries,env_vars)
+
+def load_database(databaseFile,cacheDir=None):  # parsed once per file content, later loads come from the cache
+    path = cache_path(databaseFile,file_hash(databaseFile),cacheDir)
+
+    try:
+        with open(path,'rb') as f:
+            entries,env_vars = pickle.load(f)
+        return DatabaseIndex(databaseFile,entries,dict((name,EnvVar._make(env_var)) for name,env_var in env_vars.items()))
+    except (OSError,EOFError,pickle.UnpicklingError):
+        pass                                    # no index yet or an unreadable one -- rebuild
+
+    index = build_index(databaseFile)
+    if index is None:
+        return None
+    try:
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+        temp_path = path + '.%d.%d.tmp' % (os.getpid(),threading.get_ident())
+        with open(temp_path,'wb') as f:
+            env_vars = dict((name,tuple(env_var)) for name,env_var in index.env_vars.items())
+            pickle.dump((index.entries,env_vars),f,pickle.HIGHEST_PROTOCOL)     # builtin types only, no class references
+        os.replace(temp_path,path)              # readers never see a half-written index
+    except OSError as e:
+        print("WARNING! Database index not saved: %s" % e)
+    return index
+
+loaded = {}                                     # path -> (stat, DatabaseIndex), see load_database_warm()
+
+def load_database_warm(databaseFile):           # long-lived processes: no hashing while the file stays unchanged
+    path = os.path.abspath(databaseFile)
+    st = os.stat(path)
+    key = st.st_mtime_ns,st.st_size,st.st_ino
+    if path in loaded and loaded[path][0] == key:
+        return loaded[path][1]
+    index = load_database(databaseFile)
+    if index is not None:
+        loaded[path] = key,index
+    return index
+
+if __name__ == '__main__':
+    for databaseFile in sys.argv[1:]:
+        start = time.perf_counter()
+        index = load_database(databaseFile)
+        if index is not None:
+            print("%s: %d messages, %d signals (%.1f ms)" % (databaseFile,len(index.entries),index.signal_count(),
+                                                             (time.perf_counter()-start)*1000))
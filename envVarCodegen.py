@@ -0,0 +1,119 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+# Every environment variable used by the CAPL code gets a slot, i.e. an index into the generated
+# env_vars[] table of eventsHandler/envVars.h. putValue/getValue become typed accesses of the slot,
+# on envVar events are listed in the table entry of their variable and only they run on a write.
+
+import dbcIndex
+
+type_names = {dbcIndex.ENV_INTEGER: ('int','ENV_INTEGER','.i'),
+              dbcIndex.ENV_FLOAT: ('float','ENV_FLOAT','.f'),
+              dbcIndex.ENV_STRING: ('string','ENV_STRING','.s')}
+
+literal_types = {'FLOAT': dbcIndex.ENV_FLOAT, 'STRING': dbcIndex.ENV_STRING}     # other constants are integers
+
+class EnvVarCodegen:
+
+    def slot(self,name):                # assigned in the order of first use
+        if name not in self.types:
+            env_var = self.database.env_var(name) if self.database else None
+            self.types[name] = env_var.type if env_var else self.inferred.get(name,dbcIndex.ENV_INTEGER)
+        return "EV_%s" % name
+
+    def scan(self,tree):                # types of variables missing in the database, from constants written by putValue
+        if self.scanned:
+            return
+        self.scanned = True
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node,(tuple,list)):
+                stack.extend(reversed(node))
+                continue
+            if not hasattr(node,'type'):
+                continue
+            if node.type == 'CAPL_fcn' and node.leaf.leaf == 'putValue' and isinstance(node.children,tuple):
+                name = node.children[0].leaf.leaf
+                value = node.children[1].leaf
+                if value.type in literal_types:
+                    self.inferred.setdefault(name,literal_types[value.type])
+            stack.append(node.children)
+            if hasattr(node.leaf,'type') or isinstance(node.leaf,tuple):
+                stack.append(node.leaf)
+
+    def subscribe(self,name):           # on envVar handler, run by every write of the variable
+        self.slot(name)
+        handler = "envVar_%s_event" % name
+        handlers = self.handlers.setdefault(name,[])
+        if handler not in handlers:
+            handlers.append(handler)
+        return handler
+
+    def put_call(self,name,value):
+        slot = self.slot(name)
+        return "env_put_%s(%s,%s)" % (type_names[self.types[name]][0],slot,value)
+
+    def get_call(self,name,buffer=None):    # getValue(envVar, buffer) copies a string value
+        slot = self.slot(name)
+        if buffer is not None:
+            return "env_get_string(%s,%s,sizeof(%s))" % (slot,buffer,buffer)
+        if self.types[name] == dbcIndex.ENV_STRING:
+            return "env_get_string_value(%s)" % slot
+        return "env_get_%s(%s)" % (type_names[self.types[name]][0],slot)
+
+    def initial_value(self,name):
+        env_var = self.database.env_var(name) if self.database else None
+        if env_var is None or env_var.initial == 0 or self.types[name] == dbcIndex.ENV_STRING:
+            return None
+        return repr(env_var.initial)
+
+    def generate(self):                 # slot enum, on envVar prototypes and the value table
+        if not self.types:
+            return ""
+        code = '#include "envVars.h"\n\nenum {\n'
+        code += "".join("  %s,\n" % self.slot(name) for name in self.types)
+        code += "  EV_COUNT\n};\n\n"
+        for handlers in self.handlers.values():
+            code += "".join("void %s(void);\n" % handler for handler in handlers)
+        code += "\nstruct env_var env_vars[EV_COUNT] = {\n"
+        for name,env_type in self.types.items():
+            type_name,type_constant,member = type_names[env_type]
+            code += '  [%s] = { .name = "%s", .type = %s' % (self.slot(name),name,type_constant)
+            initial = self.initial_value(name)
+            if initial is not None:
+                code += ", .value%s = %s" % (member,initial)
+            handlers = self.handlers.get(name)
+            if handlers:
+                code += ", .handlers = { %s }, .handler_count = %d" % (", ".join(handlers),len(handlers))
+            code += " },\n"
+        code += "};\nint env_var_count = EV_COUNT;\n\n"
+        return code
+
+    def __init__(self,database):
+        self.database = database        # dbcIndex.DatabaseIndex, EV_ definitions
+        self.types = {}                 # name -> dbcIndex.ENV_*, in order of the slots
+        self.handlers = {}              # name -> on envVar handlers
+        self.inferred = {}              # name -> dbcIndex.ENV_*, see scan()
+        self.scanned = False
@@ -0,0 +1,92 @@
+#include <stdio.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <time.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include "ascReplay.h"
+
+int replay_open(struct replay *r, const char *indexPath)
+{
+  struct stat st;
+  const struct replay_header *header;
+  int fd;
+
+  fd = open(indexPath, O_RDONLY);
+  if (fd < 0) {
+    perror(indexPath);
+    return -1;
+  }
+  if (fstat(fd, &st) < 0 || st.st_size < (off_t)sizeof(struct replay_header)) {
+    fprintf(stderr, "Error: %s is not a replay index\n", indexPath);
+    close(fd);
+    return -1;
+  }
+
+  r->map_size = st.st_size;
+  r->map = mmap(NULL, r->map_size, PROT_READ, MAP_PRIVATE, fd, 0);
+  close(fd);                            // mapping stays valid after close
+  if (r->map == MAP_FAILED) {
+    perror("Error when mapping the replay index");
+    return -1;
+  }
+  madvise(r->map, r->map_size, MADV_SEQUENTIAL);
+
+  header = (const struct replay_header *)r->map;
+  if (memcmp(header->magic, "RBSIDX1", 8) != 0 ||
+      sizeof(struct replay_header) + header->count * sizeof(struct can_record) > r->map_size) {
+    fprintf(stderr, "Error: %s is not a replay index\n", indexPath);
+    munmap(r->map, r->map_size);
+    return -1;
+  }
+  r->records = (const struct can_record *)(header + 1);
+  r->count = header->count;
+  return 0;
+}
+
+static void replay_wait(const struct timespec *start, double offset)
+{
+  struct timespec due;
+  double sec;
+
+  sec = start->tv_sec + start->tv_nsec / 1e9 + offset;
+  due.tv_sec = (time_t)sec;
+  due.tv_nsec = (long)((sec - due.tv_sec) * 1e9);
+  while (clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, &due, NULL) != 0)
+    ;                                   // interrupted by a signal, sleep again
+}
+
+void replay_run(struct replay *r, int mode, double scale, void (*dispatch)(const struct can_frame *frame))
+{
+  struct can_frame frame;
+  struct timespec start;
+  double first;
+  uint64_t i;
+
+  if (r->count == 0)
+    return;
+  if (mode == REPLAY_REALTIME || scale <= 0)
+    scale = 1.0;
+
+  first = r->records[0].timestamp;
+  clock_gettime(CLOCK_MONOTONIC, &start);
+
+  for (i = 0; i < r->count; i++) {
+    const struct can_record *rec = &r->records[i];
+    if (rec->flags & CAN_RECORD_TX)
+      continue;                         // only received frames are fed to the handlers
+    if (mode != REPLAY_AFAP)
+      replay_wait(&start, (rec->timestamp - first) / scale);
+    can_record_to_frame(rec, &frame);
+    dispatch(&frame);
+  }
+}
+
+void replay_close(struct replay *r)
+{
+  if (r->map && r->map != MAP_FAILED)
+    munmap(r->map, r->map_size);
+  r->map = NULL;
+  r->records = NULL;
+  r->count = 0;
+}
@@ -0,0 +1,35 @@
+/*
+ * File:   ascReplay.h
+ *
+ * Replay of CAN frames from a binary index built by ascReplay.py
+ */
+#ifndef ASC_REPLAY_H
+#define ASC_REPLAY_H
+
+#include <stdint.h>
+#include <stddef.h>
+#include "canRecord.h"
+
+#define REPLAY_REALTIME 0               // keep the original timing of the trace
+#define REPLAY_SCALED   1               // original timing divided by a scale factor
+#define REPLAY_AFAP     2               // as fast as possible
+
+struct replay_header {
+  char magic[8];                        // "RBSIDX1"
+  uint64_t source_size;                 // size of the .asc file the index was built from
+  double source_mtime;
+  uint64_t count;                       // number of records following the header
+};
+
+struct replay {
+  void *map;
+  size_t map_size;
+  const struct can_record *records;
+  uint64_t count;
+};
+
+extern int replay_open(struct replay *r, const char *indexPath);
+extern void replay_run(struct replay *r, int mode, double scale, void (*dispatch)(const struct can_frame *frame));
+extern void replay_close(struct replay *r);
+
+#endif
@@ -0,0 +1,36 @@
+/*
+ * File:   canRecord.h
+ *
+ * Fixed binary layout of a single CAN frame used by the ASC replay index.
+ * The layout must stay in sync with AscReplay.frame_record in ascReplay.py.
+ */
+#ifndef CAN_RECORD_H
+#define CAN_RECORD_H
+
+#include <stdint.h>
+#include <string.h>
+#include <linux/can.h>
+
+#define CAN_RECORD_TX   0x01            // frame was transmitted (otherwise received)
+#define CAN_RECORD_EXT  0x02            // 29-bit identifier
+
+struct can_record {
+  double timestamp;                     // seconds since start of the trace
+  uint32_t id;                          // identifier without CAN_EFF_FLAG
+  uint8_t dlc;
+  uint8_t flags;                        // CAN_RECORD_TX | CAN_RECORD_EXT
+  uint8_t channel;
+  uint8_t reserved;
+  uint8_t data[8];
+};                                      // 24 bytes, no padding
+
+static inline void can_record_to_frame(const struct can_record *rec, struct can_frame *frame)
+{
+  frame->can_id = rec->id;
+  if (rec->flags & CAN_RECORD_EXT)
+    frame->can_id |= CAN_EFF_FLAG;
+  frame->can_dlc = rec->dlc;
+  memcpy(frame->data, rec->data, 8);
+}
+
+#endif
@@ -0,0 +1,141 @@
+#include <stdio.h>
+#include <string.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include "caplFile.h"
+
+static struct capl_file capl_files[CAPL_FILE_MAX];     // handle n is capl_files[n - 1]
+
+static struct capl_file *capl_file_get(uint32_t handle)
+{
+  if (handle == 0 || handle > CAPL_FILE_MAX || !capl_files[handle - 1].used)
+    return NULL;
+  return &capl_files[handle - 1];
+}
+
+uint32_t openFileRead(const char *filename, uint32_t mode)     // mode 0 text, 1 binary - same mapping
+{
+  struct capl_file *f = NULL;
+  struct stat st;
+  void *map = NULL;
+  uint32_t handle;
+  int fd;
+
+  (void)mode;
+  for (handle = 1; handle <= CAPL_FILE_MAX; handle++) {
+    if (!capl_files[handle - 1].used) {
+      f = &capl_files[handle - 1];
+      break;
+    }
+  }
+  if (f == NULL) {
+    fprintf(stderr, "Error: too many open files, %s not opened\n", filename);
+    return 0;
+  }
+
+  fd = open(filename, O_RDONLY);
+  if (fd < 0) {
+    perror(filename);
+    return 0;
+  }
+  if (fstat(fd, &st) < 0) {
+    perror(filename);
+    close(fd);
+    return 0;
+  }
+  if (st.st_size > 0) {
+    map = mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE | MAP_POPULATE, fd, 0);    // paged in now, not in a handler
+    if (map == MAP_FAILED) {
+      perror("Error when mapping the file");
+      close(fd);
+      return 0;
+    }
+    madvise(map, st.st_size, MADV_SEQUENTIAL);
+  }
+  close(fd);                            // mapping stays valid after close
+
+  f->data = map;
+  f->size = st.st_size;
+  f->pos = 0;
+  f->used = 1;
+  return handle;
+}
+
+static long capl_file_line(char *buffer, long size, uint32_t handle, int keepNewline)
+{
+  struct capl_file *f = capl_file_get(handle);
+  const char *start, *end;
+  size_t length, available;
+
+  if (f == NULL || size <= 0 || f->pos >= f->size)
+    return 0;
+
+  start = f->data + f->pos;
+  available = f->size - f->pos;
+  end = memchr(start, '\n', available);
+  length = end ? (size_t)(end - start) + 1 : available;      // up to and including '\n'
+
+  if (length > (size_t)size - 1) {      // longer line: the rest is returned by the next call
+    length = size - 1;
+    f->pos += length;
+  } else {
+    f->pos += length;
+    if (!keepNewline && end) {
+      length--;
+      if (length && start[length - 1] == '\r')
+        length--;
+    }
+  }
+  memcpy(buffer, start, length);
+  buffer[length] = '\0';
+  return 1;
+}
+
+long fileGetString(char *buffer, long size, uint32_t handle)
+{
+  return capl_file_line(buffer, size, handle, 1);
+}
+
+long fileGetStringSZ(char *buffer, long size, uint32_t handle)
+{
+  return capl_file_line(buffer, size, handle, 0);
+}
+
+long fileGetBinaryBlock(void *buffer, long size, uint32_t handle)
+{
+  struct capl_file *f = capl_file_get(handle);
+  size_t length;
+
+  if (f == NULL || size <= 0)
+    return 0;
+  length = f->size - f->pos;
+  if (length > (size_t)size)
+    length = size;
+  memcpy(buffer, f->data + f->pos, length);
+  f->pos += length;
+  return length;
+}
+
+long fileRewind(uint32_t handle)
+{
+  struct capl_file *f = capl_file_get(handle);
+
+  if (f == NULL)
+    return 0;
+  f->pos = 0;
+  return 1;
+}
+
+long fileClose(uint32_t handle)
+{
+  struct capl_file *f = capl_file_get(handle);
+
+  if (f == NULL)
+    return 0;
+  if (f->data != NULL)
+    munmap((void *)f->data, f->size);
+  memset(f, 0, sizeof(*f));
+  return 1;
+}
@@ -0,0 +1,31 @@
+/*
+ * File:   caplFile.h
+ *
+ * CAPL file functions for the generated code. A file is memory-mapped by openFileRead,
+ * fileGetString and fileGetBinaryBlock copy from the mapping without a system call.
+ */
+#ifndef CAPL_FILE_H
+#define CAPL_FILE_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+#define CAPL_FILE_MAX 32                // files open at the same time
+
+#define elcount(a) ((long)(sizeof(a) / sizeof((a)[0])))
+
+struct capl_file {
+  const char *data;                     // mapping of the whole file, NULL for an empty file
+  size_t size;
+  size_t pos;                           // next byte to read
+  int used;
+};
+
+extern uint32_t openFileRead(const char *filename, uint32_t mode);       // handle, 0 on error
+extern long fileGetString(char *buffer, long size, uint32_t handle);    // next line including '\n', 0 at the end
+extern long fileGetStringSZ(char *buffer, long size, uint32_t handle);  // next line without '\n'
+extern long fileGetBinaryBlock(void *buffer, long size, uint32_t handle);   // bytes copied
+extern long fileRewind(uint32_t handle);
+extern long fileClose(uint32_t handle);
+
+#endif
@@ -0,0 +1,166 @@
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+#include <pthread.h>
+#include <stdatomic.h>
+#include "caplLog.h"
+
+static struct capl_log_record capl_log_ring[CAPL_LOG_CAPACITY];
+static _Atomic uint64_t capl_log_head;          // written by the handlers (event loop thread)
+static _Atomic uint64_t capl_log_tail;          // written by the output thread
+static _Atomic uint64_t capl_log_dropped;       // records lost because the ring was full
+static _Atomic int capl_log_stop;
+static pthread_t capl_log_thread;
+static int capl_log_running;
+
+void capl_log_write(const char *format, int count, const struct capl_log_arg *args)
+{
+  uint64_t head = atomic_load_explicit(&capl_log_head, memory_order_relaxed);
+  struct capl_log_record *rec;
+
+  if (head - atomic_load_explicit(&capl_log_tail, memory_order_acquire) == CAPL_LOG_CAPACITY) {
+    atomic_fetch_add_explicit(&capl_log_dropped, 1, memory_order_relaxed);    // never wait in a handler
+    return;
+  }
+  if (count > CAPL_LOG_MAX_ARGS)
+    count = CAPL_LOG_MAX_ARGS;
+  rec = &capl_log_ring[head & (CAPL_LOG_CAPACITY - 1)];
+  rec->format = format;
+  rec->count = count;
+  memcpy(rec->args, args, count * sizeof(struct capl_log_arg));
+  atomic_store_explicit(&capl_log_head, head + 1, memory_order_release);
+}
+
+static long long capl_log_int_value(const struct capl_log_arg *arg)
+{
+  if (arg == NULL || arg->kind == CAPL_LOG_STRING)
+    return 0;
+  return arg->kind == CAPL_LOG_FLOAT ? (long long)arg->value.f : arg->value.i;
+}
+
+static double capl_log_float_value(const struct capl_log_arg *arg)
+{
+  if (arg == NULL || arg->kind == CAPL_LOG_STRING)
+    return 0;
+  return arg->kind == CAPL_LOG_FLOAT ? arg->value.f : (double)arg->value.i;
+}
+
+static void capl_log_print(FILE *out, const struct capl_log_record *rec)   // CAPL format, '\n' appended as by write()
+{
+  const char *p = rec->format;
+  const struct capl_log_arg *arg;
+  char spec[32];
+  size_t length;
+  int n = 0;
+
+  while (*p) {
+    if (*p != '%') {
+      putc(*p++, out);
+      continue;
+    }
+    if (p[1] == '%') {
+      putc('%', out);
+      p += 2;
+      continue;
+    }
+    length = 1 + strspn(p + 1, "-+ #0123456789.");  // '%', flags, width, precision
+    if (length > sizeof(spec) - 4)
+      length = sizeof(spec) - 4;
+    memcpy(spec, p, length);
+    p += length;
+    while (*p && strchr("hlLqjzt", *p))           // the stored value decides the length
+      p++;
+    if (p[0] == 'I' && p[1] == '6' && p[2] == '4')  // CAPL %I64d
+      p += 3;
+    if (*p == '\0')
+      break;
+    if (strchr("diouxXceEfFgGaAs", *p) == NULL) {    // unknown conversion, printed as written, takes no argument
+      fwrite(spec, 1, length, out);
+      putc(*p++, out);
+      continue;
+    }
+    arg = n < rec->count ? &rec->args[n++] : NULL;
+
+    switch (*p) {
+    case 'd': case 'i': case 'u': case 'o': case 'x': case 'X':
+      spec[length] = 'l';
+      spec[length + 1] = 'l';
+      spec[length + 2] = *p;
+      spec[length + 3] = '\0';
+      fprintf(out, spec, capl_log_int_value(arg));
+      break;
+    case 'c':
+      spec[length] = 'c';
+      spec[length + 1] = '\0';
+      fprintf(out, spec, (int)capl_log_int_value(arg));
+      break;
+    case 'e': case 'E': case 'f': case 'F': case 'g': case 'G': case 'a': case 'A':
+      spec[length] = *p;
+      spec[length + 1] = '\0';
+      fprintf(out, spec, capl_log_float_value(arg));
+      break;
+    case 's':
+      spec[length] = 's';
+      spec[length + 1] = '\0';
+      fprintf(out, spec, arg && arg->kind == CAPL_LOG_STRING ? arg->value.s : "");
+      break;
+    }
+    p++;
+  }
+  putc('\n', out);
+}
+
+int capl_log_flush(void)
+{
+  uint64_t tail = atomic_load_explicit(&capl_log_tail, memory_order_relaxed);
+  uint64_t head = atomic_load_explicit(&capl_log_head, memory_order_acquire);
+  int count = 0;
+
+  for (; tail != head; tail++, count++) {
+    capl_log_print(stdout, &capl_log_ring[tail & (CAPL_LOG_CAPACITY - 1)]);
+    atomic_store_explicit(&capl_log_tail, tail + 1, memory_order_release);
+  }
+  if (count)
+    fflush(stdout);
+  return count;
+}
+
+static void *capl_log_main(void *unused)
+{
+  struct timespec idle = { 0, 2000000 };        // 2 ms
+
+  (void)unused;
+  while (!atomic_load_explicit(&capl_log_stop, memory_order_acquire)) {
+    if (capl_log_flush() == 0)
+      nanosleep(&idle, NULL);
+  }
+  return NULL;
+}
+
+int capl_log_open(void)
+{
+  if (capl_log_running)
+    return 0;
+  atomic_store(&capl_log_stop, 0);
+  if (pthread_create(&capl_log_thread, NULL, capl_log_main, NULL) != 0) {
+    fprintf(stderr, "Error: log thread not started, write() is printed at shutdown\n");
+    return -1;
+  }
+  capl_log_running = 1;
+  return 0;
+}
+
+void capl_log_close(void)
+{
+  uint64_t dropped;
+
+  if (capl_log_running) {
+    atomic_store_explicit(&capl_log_stop, 1, memory_order_release);
+    pthread_join(capl_log_thread, NULL);
+    capl_log_running = 0;
+  }
+  capl_log_flush();
+  dropped = atomic_exchange(&capl_log_dropped, 0);
+  if (dropped)
+    fprintf(stderr, "Warning: %llu write() records lost, the log ring was full\n", (unsigned long long)dropped);
+}
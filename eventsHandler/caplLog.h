@@ -0,0 +1,62 @@
+/*
+ * File:   caplLog.h
+ *
+ * CAPL write() for the generated code. The handler only stores the format string and the raw
+ * arguments in a lock-free single-producer ring, a background thread formats and prints them.
+ */
+#ifndef CAPL_LOG_H
+#define CAPL_LOG_H
+
+#include <stdint.h>
+#include <string.h>
+
+#define CAPL_LOG_CAPACITY 1024          // records, power of two
+#define CAPL_LOG_MAX_ARGS 8
+#define CAPL_LOG_STRING_SIZE 32         // %s arguments are copied, longer strings are cut
+
+enum capl_log_kind { CAPL_LOG_INT, CAPL_LOG_FLOAT, CAPL_LOG_STRING };
+
+struct capl_log_arg {
+  enum capl_log_kind kind;
+  union {
+    int64_t i;
+    double f;
+    char s[CAPL_LOG_STRING_SIZE];
+  } value;
+};
+
+struct capl_log_record {
+  const char *format;                   // string literal of the write() call, never copied
+  int count;
+  struct capl_log_arg args[CAPL_LOG_MAX_ARGS];
+};
+
+static inline struct capl_log_arg capl_log_int(int64_t value)
+{
+  struct capl_log_arg arg = { .kind = CAPL_LOG_INT, .value.i = value };
+  return arg;
+}
+
+static inline struct capl_log_arg capl_log_float(double value)
+{
+  struct capl_log_arg arg = { .kind = CAPL_LOG_FLOAT, .value.f = value };
+  return arg;
+}
+
+static inline struct capl_log_arg capl_log_string(const char *value)
+{
+  struct capl_log_arg arg = { .kind = CAPL_LOG_STRING };
+  strncpy(arg.value.s, value, CAPL_LOG_STRING_SIZE - 1);
+  return arg;
+}
+
+#define CAPL_LOG_ARG(x) _Generic((x), float: capl_log_float, double: capl_log_float, \
+                                 char *: capl_log_string, const char *: capl_log_string, \
+                                 default: capl_log_int)(x)
+
+extern void capl_log_write(const char *format, int count, const struct capl_log_arg *args);
+extern int capl_log_open(void);         // starts the output thread
+extern int capl_log_flush(void);        // prints the pending records in the calling thread
+extern void capl_log_close(void);       // prints the rest and stops the output thread
+
+#endif
@@ -0,0 +1,196 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+#include <time.h>
+#include "caplTimer.h"
+
+void capl_timer_bind(struct capl_timer *t, void (*handler)(void))
+{
+  t->handler = handler;
+}
+
+void __attribute__((weak)) capl_bind_timers(void)       // CAPL program without on timer events
+{
+}
+
+#ifdef VIRTUAL_TIME
+
+static double vt_now;                   // virtual clock, seconds
+static struct capl_timer **vt_heap;     // running timers ordered by expiry (binary min-heap)
+static int vt_heap_size;
+static int vt_heap_capacity;
+
+static void vt_heap_swap(int i, int j)
+{
+  struct capl_timer *t = vt_heap[i];
+  vt_heap[i] = vt_heap[j];
+  vt_heap[j] = t;
+  vt_heap[i]->heap_pos = i + 1;
+  vt_heap[j]->heap_pos = j + 1;
+}
+
+static void vt_heap_up(int i)
+{
+  while (i > 0 && vt_heap[(i - 1) / 2]->due > vt_heap[i]->due) {
+    vt_heap_swap(i, (i - 1) / 2);
+    i = (i - 1) / 2;
+  }
+}
+
+static void vt_heap_down(int i)
+{
+  for (;;) {
+    int smallest = i, left = 2 * i + 1, right = 2 * i + 2;
+    if (left < vt_heap_size && vt_heap[left]->due < vt_heap[smallest]->due)
+      smallest = left;
+    if (right < vt_heap_size && vt_heap[right]->due < vt_heap[smallest]->due)
+      smallest = right;
+    if (smallest == i)
+      return;
+    vt_heap_swap(i, smallest);
+    i = smallest;
+  }
+}
+
+static void vt_heap_remove(struct capl_timer *t)
+{
+  int i = t->heap_pos - 1;
+
+  t->heap_pos = 0;
+  vt_heap_size--;
+  if (i == vt_heap_size)
+    return;
+  vt_heap[i] = vt_heap[vt_heap_size];
+  vt_heap[i]->heap_pos = i + 1;
+  vt_heap_up(i);
+  vt_heap_down(i);
+}
+
+void capl_set_timer(struct capl_timer *t, double seconds)
+{
+  if (t->heap_pos)
+    vt_heap_remove(t);
+  if (vt_heap_size == vt_heap_capacity) {
+    vt_heap_capacity = vt_heap_capacity ? 2 * vt_heap_capacity : 64;
+    vt_heap = realloc(vt_heap, vt_heap_capacity * sizeof(*vt_heap));
+    if (vt_heap == NULL) {
+      perror("Error when growing the timer scheduler");
+      exit(1);
+    }
+  }
+  t->due = vt_now + seconds;
+  vt_heap[vt_heap_size++] = t;
+  t->heap_pos = vt_heap_size;
+  vt_heap_up(vt_heap_size - 1);
+}
+
+void capl_cancel_timer(struct capl_timer *t)
+{
+  if (t->heap_pos)
+    vt_heap_remove(t);
+}
+
+int capl_timer_active(const struct capl_timer *t)
+{
+  return t->heap_pos != 0;
+}
+
+double capl_now(void)
+{
+  return vt_now;
+}
+
+void delay(int milliseconds)            // busy wait in the wall-clock build, nothing else runs meanwhile
+{
+  vt_now += milliseconds / 1000.0;
+}
+
+// Executes timers and replayed frames in order of time until endTime or until nothing is left to do.
+void vt_run(const struct replay *r, double endTime, void (*dispatch)(const struct can_frame *frame))
+{
+  struct can_frame frame;
+  double first, frame_time, timer_time, now;
+  uint64_t next = 0;
+
+  first = r->count ? r->records[0].timestamp : 0;
+  for (;;) {
+    while (next < r->count && (r->records[next].flags & CAN_RECORD_TX))
+      next++;                           // only received frames are fed to the handlers
+    frame_time = next < r->count ? r->records[next].timestamp - first : INFINITY;
+    timer_time = vt_heap_size ? vt_heap[0]->due : INFINITY;
+    now = timer_time <= frame_time ? timer_time : frame_time;     // timers first at the same instant
+    if (now == INFINITY || now > endTime)
+      break;
+    if (now > vt_now)
+      vt_now = now;                     // delay() may have moved the clock beyond the event
+
+    if (timer_time <= frame_time) {
+      struct capl_timer *t = vt_heap[0];
+      vt_heap_remove(t);
+      if (t->handler)
+        t->handler();
+    } else {
+      can_record_to_frame(&r->records[next++], &frame);
+      dispatch(&frame);
+    }
+  }
+  if (endTime != INFINITY && vt_now < endTime)
+    vt_now = endTime;
+}
+
+#else
+
+static struct timespec capl_start;
+
+static void capl_timer_cb(EV_P_ ev_timer *w, int revents)
+{
+  struct capl_timer *t = w->data;
+  if (t->handler)
+    t->handler();
+}
+
+void capl_set_timer(struct capl_timer *t, double seconds)
+{
+  if (t->watcher.data == NULL) {
+    ev_timer_init(&t->watcher, capl_timer_cb, seconds, 0.);
+    t->watcher.data = t;
+  } else {
+    ev_timer_stop(EV_DEFAULT, &t->watcher);
+    ev_timer_set(&t->watcher, seconds, 0.);
+  }
+  ev_timer_start(EV_DEFAULT, &t->watcher);
+}
+
+void capl_cancel_timer(struct capl_timer *t)
+{
+  if (t->watcher.data)
+    ev_timer_stop(EV_DEFAULT, &t->watcher);
+}
+
+int capl_timer_active(const struct capl_timer *t)
+{
+  return t->watcher.data != NULL && ev_is_active(&t->watcher);
+}
+
+double capl_now(void)
+{
+  struct timespec now;
+
+  clock_gettime(CLOCK_MONOTONIC, &now);
+  if (capl_start.tv_sec == 0 && capl_start.tv_nsec == 0)
+    capl_start = now;
+  return (now.tv_sec - capl_start.tv_sec) + (now.tv_nsec - capl_start.tv_nsec) / 1e9;
+}
+
+void delay(int milliseconds)
+{
+    long pause;
+    clock_t now,then;
+
+    pause = milliseconds*(CLOCKS_PER_SEC/1000);
+    now = then = clock();
+    while( (now-then) < pause )
+        now = clock();
+}
+
+#endif
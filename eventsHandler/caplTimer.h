@@ -0,0 +1,40 @@
+/*
+ * File:   caplTimer.h
+ *
+ * CAPL timers for the generated code. Built with -DVIRTUAL_TIME the time comes from
+ * a virtual clock advanced by a discrete-event scheduler instead of the libev loop.
+ */
+#ifndef CAPL_TIMER_H
+#define CAPL_TIMER_H
+
+#include <ev.h>
+#include "ascReplay.h"
+
+struct capl_timer {
+  void (*handler)(void);                // generated on timer event
+  double due;                           // VIRTUAL_TIME: expiry on the virtual clock
+  int heap_pos;                         // VIRTUAL_TIME: position in the scheduler + 1, 0 if not running
+  ev_timer watcher;                     // wall-clock build
+};
+
+typedef struct { struct capl_timer base; } timer;      // CAPL timer, period in seconds
+typedef struct { struct capl_timer base; } msTimer;    // CAPL msTimer, period in milliseconds
+
+#define capl_timer_unit(t) _Generic((t), timer: 1.0, msTimer: 0.001)
+#define setTimer(t, period) capl_set_timer(&(t).base, (period) * capl_timer_unit(t))
+#define cancelTimer(t) capl_cancel_timer(&(t).base)
+#define isTimerActive(t) capl_timer_active(&(t).base)
+
+extern void capl_timer_bind(struct capl_timer *t, void (*handler)(void));
+extern void capl_bind_timers(void);    // generated, binds every timer to its on timer event
+extern void capl_set_timer(struct capl_timer *t, double seconds);
+extern void capl_cancel_timer(struct capl_timer *t);
+extern int capl_timer_active(const struct capl_timer *t);
+extern double capl_now(void);          // seconds since start of the measurement
+extern void delay(int milliseconds);
+
+#ifdef VIRTUAL_TIME
+extern void vt_run(const struct replay *r, double endTime, void (*dispatch)(const struct can_frame *frame));
+#endif
+
+#endif
@@ -0,0 +1,43 @@
+#include <stdio.h>
+#include <string.h>
+#include "envVars.h"
+
+extern struct env_var env_vars[] __attribute__((weak));    // CAPL program without environment variables: NULL, count 0
+int __attribute__((weak)) env_var_count = 0;
+
+void env_notify(struct env_var *v)
+{
+  int i;
+
+  if (v->notifying)
+    return;
+  v->notifying = 1;
+  for (i = 0; i < v->handler_count; i++)
+    v->handlers[i]();
+  v->notifying = 0;
+}
+
+int env_subscribe(int slot, void (*handler)(void))
+{
+  struct env_var *v;
+
+  if (slot < 0 || slot >= env_var_count)
+    return -1;
+  v = &env_vars[slot];
+  if (v->handler_count == ENV_MAX_HANDLERS) {
+    fprintf(stderr, "envVars: too many handlers of %s\n", v->name);
+    return -1;
+  }
+  v->handlers[v->handler_count++] = handler;
+  return 0;
+}
+
+int env_find(const char *name)
+{
+  int i;
+
+  for (i = 0; i < env_var_count; i++)
+    if (strcmp(env_vars[i].name, name) == 0)
+      return i;
+  return -1;
+}
@@ -0,0 +1,88 @@
+/*
+ * File:   envVars.h
+ *
+ * CAPL environment variables of the generated code. Every variable has a slot in the generated
+ * env_vars[] table, putValue/getValue are typed accesses of the slot and a write runs only
+ * the on envVar handlers listed in (or subscribed to) the entry of the variable.
+ */
+#ifndef ENV_VARS_H
+#define ENV_VARS_H
+
+#include <stdint.h>
+#include <string.h>
+
+#define ENV_STRING_SIZE 64
+#define ENV_MAX_HANDLERS 8
+
+enum env_type { ENV_INTEGER, ENV_FLOAT, ENV_STRING };      // EV_ types of the DBC
+
+struct env_var {
+  const char *name;
+  enum env_type type;
+  union {
+    int64_t i;
+    double f;
+    char s[ENV_STRING_SIZE];
+  } value;
+  void (*handlers[ENV_MAX_HANDLERS])(void);    // on envVar events of the variable
+  int handler_count;
+  int notifying;                        // handlers running, a putValue of the same variable inside them does not re-trigger
+};
+
+extern struct env_var env_vars[];       // generated, indexed by the EV_<name> slots
+extern int env_var_count;
+
+extern void env_notify(struct env_var *v);
+extern int env_subscribe(int slot, void (*handler)(void));
+extern int env_find(const char *name);  // slot of a variable, -1 if unknown (panels, command line)
+
+static inline void env_put_int(int slot, int64_t value)
+{
+  env_vars[slot].value.i = value;
+  if (env_vars[slot].handler_count)
+    env_notify(&env_vars[slot]);
+}
+
+static inline void env_put_float(int slot, double value)
+{
+  env_vars[slot].value.f = value;
+  if (env_vars[slot].handler_count)
+    env_notify(&env_vars[slot]);
+}
+
+static inline void env_put_string(int slot, const char *value)
+{
+  strncpy(env_vars[slot].value.s, value, ENV_STRING_SIZE - 1);
+  if (env_vars[slot].handler_count)
+    env_notify(&env_vars[slot]);
+}
+
+static inline int64_t env_get_int(int slot)
+{
+  return env_vars[slot].value.i;
+}
+
+static inline double env_get_float(int slot)
+{
+  return env_vars[slot].value.f;
+}
+
+static inline const char *env_get_string_value(int slot)
+{
+  return env_vars[slot].value.s;
+}
+
+static inline long env_get_string(int slot, char *buffer, long size)     // getValue(envVar, buffer)
+{
+  size_t length = strnlen(env_vars[slot].value.s, ENV_STRING_SIZE - 1);
+
+  if (size <= 0)
+    return 0;
+  if (length > (size_t)size - 1)
+    length = size - 1;
+  memcpy(buffer, env_vars[slot].value.s, length);
+  buffer[length] = '\0';
+  return length;
+}
+
+#endif
@@ -10,7 +10,12 @@
 
 int main(int argc, char** argv) {
     
+#ifdef VIRTUAL_TIME
+    // main [trace.asc.idx] [end time in s]
+    start_virtual(argc > 1 ? argv[1] : NULL, argc > 2 ? atof(argv[2]) : 600.0);
+#else
     start_watcher();
+#endif
    
 	return 0;
 }
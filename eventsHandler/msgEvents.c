@@ -1,13 +1,20 @@
 #include <ev.h>
+#include "caplTimer.c"
+#include "envVars.c"
+#include "caplFile.c"
+#include "caplLog.c"
+#include "traceRecorder.c"
 #include "socketCan.h"
 #include "socketCan.c"
+#include "ascReplay.c"
 
 ev_idle idle;                  // processing watcher
 ev_io can_io;                  // I/O watcher   
-ev_timer timer;				   // timer
+ev_timer rx_timer;			   // timer (CAPL timers are in caplTimer.c)
  
 struct ev_loop *loop;  
 int s;
+struct can_frame rcv_frame;    // frame being handled, i.e. 'this' in CAPL events
 
 /* IDs from relevant DB of messages */
 //  CTRL_LED = 497;
@@ -28,27 +35,34 @@ const char * convert_hexToID(int hexID)
   }
 }
 
+void __attribute__((weak)) preStart_event() { }    // generated from on preStart / on start
+void __attribute__((weak)) start_event() { }
+void __attribute__((weak)) dispatch_signal_events(const struct can_frame *frame) { }     // generated from on signal
+void __attribute__((weak)) dispatch_message_events(const char *msg_name) { }            // generated from on message
+
+void dispatch_frame(const struct can_frame *frame)
+{
+  const char *msg_name;
+
+  rcv_frame = *frame;
+  dispatch_signal_events(frame);
+  msg_name = convert_hexToID(frame->can_id);
+
+  dispatch_message_events(msg_name);
+}
+
 static void recvmsg_cb(EV_P_ ev_io *w, int revents)  // (revents, ...) parameters as in CAPL must be placed
 {
-  char *msg_name;
+  struct can_frame frame;
 
-	printf("Receive callback ready\n");
+	capl_log_write("Receive callback ready",0,NULL);     // printed by the log thread
 	
-	int rcv_id = read_port(s);
-	printf("ID: %#010x\n",rcv_id);
+	read_frame(s, &frame);            // recorded to the trace ring by read_frame
   
-  msg_name = convert_hexToID(rcv_id);
-  
-/* Events */
-switch(msg_name) {
-case CTRL_Buttons: CTRL_Buttons_event(); break;
-}
-case CTRL_LED: CTRL_LED_event(); break;
-}
-/* inserted before here */
+  dispatch_frame(&frame);
 
-	if(rcvData[2] == 0x90) { printf("Reverse set in progress\n");	}
-	else { printf("Reverse done\n"); };
+	if(rcv_frame.data[2] == 0x90) { capl_log_write("Reverse set in progress",0,NULL);	}
+	else { capl_log_write("Reverse done",0,NULL); };
 		 
 	// stop the I/O watcher, we received the event, but
 	// are not yet ready to handle it.
@@ -58,9 +72,9 @@ case CTRL_LED: CTRL_LED_event(); break;
 static void timer_cb(EV_P_ ev_timer *w, int revents)
 {
 		
-	ev_timer_stop(loop, &timer);	// stop the timer
-	ev_timer_set(&timer, 5, 0.);	// reset the timer
-	ev_timer_start(loop, &timer);	// start the timer again
+	ev_timer_stop(loop, &rx_timer);	// stop the timer
+	ev_timer_set(&rx_timer, 5, 0.);	// reset the timer
+	ev_timer_start(loop, &rx_timer);	// start the timer again
 	
 	delay(1000);					// delay the time
     ev_io_init(&can_io,recvmsg_cb,s,EV_READ);
@@ -69,8 +83,8 @@ static void timer_cb(EV_P_ ev_timer *w, int revents)
 
 void reverse_set()
 {
-	ev_timer_init(&timer,timer_cb,2,0);
-    ev_timer_start(loop,&timer);    
+	ev_timer_init(&rx_timer,timer_cb,2,0);
+    ev_timer_start(loop,&rx_timer);    
 }
 
 int start_watcher() 
@@ -80,10 +94,62 @@ int start_watcher()
     
     s = open_port("can0");
     printf("port: %d\n",s);
+    trace_open("trace.rbs", 1 << 20, 1);   // 24 MB ring, export by traceRecorder.py
+    capl_log_open();                       // write() output, see caplLog.c
     
+    capl_bind_timers();
+    preStart_event();
+    start_event();
     reverse_set();
     
     ev_run(loop, 0);
+    capl_log_close();
+    trace_close();
    
 	return 0;
-}
\ No newline at end of file
+}
+
+// Feeds frames of a recorded trace to the events, after the same start sequence as start_watcher().
+// Timers are bound and may be set, but they never expire here: replay_run() sleeps between the frames
+// (or does not wait at all with REPLAY_AFAP) and the libev loop does not run. A replay with timers
+// needs the VIRTUAL_TIME build, see start_virtual().
+int start_replay(const char *indexPath, int mode, double scale)
+{
+    struct replay r;
+
+    if (replay_open(&r, indexPath) < 0)
+        return 1;
+    loop = EV_DEFAULT;
+    capl_log_open();
+
+    capl_bind_timers();
+    preStart_event();
+    start_event();
+    replay_run(&r, mode, scale, dispatch_frame);
+    capl_log_close();
+    replay_close(&r);
+
+	return 0;
+}
+
+#ifdef VIRTUAL_TIME
+int start_virtual(const char *indexPath, double endTime)    // runs timers and replayed frames in virtual time
+{
+    struct replay r = {0};
+
+    if (indexPath != NULL && replay_open(&r, indexPath) < 0)
+        return 1;
+    trace_open("trace.rbs", 1 << 20, 1);
+    capl_log_open();
+
+    capl_bind_timers();
+    preStart_event();
+    start_event();
+    vt_run(&r, endTime, dispatch_frame);
+
+    capl_log_close();
+    trace_close();
+    replay_close(&r);
+	return 0;
+}
+#endif
@@ -37,15 +37,34 @@
    }
 
    return frame.can_id;
-}
+}
+
+int read_frame(int soc, struct can_frame *frame){
+  ssize_t recvbytes;
+  recvbytes = read(soc, frame, sizeof(struct can_frame));
+  if (recvbytes < 0)   {
+    perror("Error during reading socket");
+    exit(1);
+  }
+  if (recvbytes < sizeof(struct can_frame))     {
+      fprintf(stderr, "Error: incomplete CAN frame\n");
+      exit(1);
+   }
+  trace_record(frame, 0);
+  return recvbytes;
+}
 
 int send_frame(int soc, const struct can_frame *frame){
   ssize_t sentbytes;
+#ifdef VIRTUAL_TIME
+  trace_record(frame, CAN_RECORD_TX);   // no bus in virtual time, frames only go to the trace
+  return sizeof(struct can_frame);
+#endif
   sentbytes = write(soc, frame, sizeof(struct can_frame));
   if (sentbytes < 0)  {
     perror("Error when sending a frame");
     return(1);
   }
-  printf("sent: %#010x\n",frame->data[6]);
+  trace_record(frame, CAN_RECORD_TX);
   return sentbytes;
 }
\ No newline at end of file
@@ -9,12 +9,14 @@
 #include <linux/can.h>
 #include <linux/can/raw.h>
 #include <time.h>
+#include "traceRecorder.h"
 
 int soc;
 
 extern int open_port(const char *portName);
 extern int send_frame(int soc, const struct can_frame *frame);
 canid_t read_port(int soc);
+extern int read_frame(int soc, struct can_frame *frame);
 
 
 
@@ -0,0 +1,95 @@
+#include <stdio.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <time.h>
+#include <sys/mman.h>
+#include "traceRecorder.h"
+#ifdef VIRTUAL_TIME
+#include "caplTimer.h"
+#endif
+
+static struct trace_ring_header *trace_header;          // NULL while the recorder is not open
+static struct can_record *trace_records;
+static uint32_t trace_mask;
+static uint8_t trace_channel;
+static size_t trace_size;
+static struct timespec trace_start;
+
+int trace_open(const char *ringPath, uint32_t capacity, uint8_t channel)
+{
+  void *map;
+  int fd;
+
+  if (capacity == 0 || (capacity & (capacity - 1)) != 0) {
+    fprintf(stderr, "Error: trace capacity must be a power of two\n");
+    return -1;
+  }
+  trace_size = sizeof(struct trace_ring_header) + (size_t)capacity * sizeof(struct can_record);
+
+  fd = open(ringPath, O_RDWR | O_CREAT | O_TRUNC, 0644);
+  if (fd < 0) {
+    perror(ringPath);
+    return -1;
+  }
+  if (ftruncate(fd, trace_size) < 0) {
+    perror("Error when sizing the trace file");
+    close(fd);
+    return -1;
+  }
+  map = mmap(NULL, trace_size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+  close(fd);
+  if (map == MAP_FAILED) {
+    perror("Error when mapping the trace file");
+    return -1;
+  }
+
+  trace_records = (struct can_record *)((struct trace_ring_header *)map + 1);
+  trace_mask = capacity - 1;
+  trace_channel = channel;
+  clock_gettime(CLOCK_MONOTONIC, &trace_start);
+
+  memcpy(((struct trace_ring_header *)map)->magic, "RBSRING", 8);
+  ((struct trace_ring_header *)map)->record_size = sizeof(struct can_record);
+  ((struct trace_ring_header *)map)->capacity = capacity;
+  __atomic_store_n(&((struct trace_ring_header *)map)->write_index, 0, __ATOMIC_RELEASE);
+  trace_header = map;                   // recording starts now
+  return 0;
+}
+
+// called for every frame - no formatting, no system call (clock_gettime is served by the vDSO)
+void trace_record(const struct can_frame *frame, uint8_t flags)
+{
+  struct can_record *rec;
+#ifndef VIRTUAL_TIME
+  struct timespec now;
+#endif
+  uint64_t index;
+
+  if (trace_header == NULL)
+    return;
+
+  index = __atomic_fetch_add(&trace_header->write_index, 1, __ATOMIC_ACQ_REL);
+  rec = &trace_records[index & trace_mask];
+
+#ifdef VIRTUAL_TIME
+  rec->timestamp = capl_now();          // virtual clock
+#else
+  clock_gettime(CLOCK_MONOTONIC, &now);
+  rec->timestamp = (now.tv_sec - trace_start.tv_sec) + (now.tv_nsec - trace_start.tv_nsec) / 1e9;
+#endif
+  rec->id = frame->can_id & CAN_EFF_MASK;
+  rec->dlc = frame->can_dlc;
+  rec->flags = flags | ((frame->can_id & CAN_EFF_FLAG) ? CAN_RECORD_EXT : 0);
+  rec->channel = trace_channel;
+  rec->reserved = 0;
+  memcpy(rec->data, frame->data, 8);
+}
+
+void trace_close(void)
+{
+  if (trace_header == NULL)
+    return;
+  msync(trace_header, trace_size, MS_ASYNC);
+  munmap(trace_header, trace_size);
+  trace_header = NULL;
+}
@@ -0,0 +1,25 @@
+/*
+ * File:   traceRecorder.h
+ *
+ * Always-on recorder of received and transmitted frames into a memory-mapped ring file.
+ * Records use the layout of canRecord.h, the file is exported to ASC by traceRecorder.py
+ */
+#ifndef TRACE_RECORDER_H
+#define TRACE_RECORDER_H
+
+#include <stdint.h>
+#include "canRecord.h"
+
+struct trace_ring_header {
+  char magic[8];                        // "RBSRING"
+  uint32_t record_size;                 // sizeof(struct can_record)
+  uint32_t capacity;                    // number of records, power of two
+  uint64_t write_index;                 // number of records written so far
+  uint64_t reserved;
+};                                      // 32 bytes
+
+extern int trace_open(const char *ringPath, uint32_t capacity, uint8_t channel);
+extern void trace_record(const struct can_frame *frame, uint8_t flags);
+extern void trace_close(void);
+
+#endif
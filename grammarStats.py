@@ -0,0 +1,157 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Which grammar rules of parserPy.Parser fire and where the parsing time goes. A Parser with a RuleStats
+# in its rule_stats attribute wraps the actions (p_* methods) of its LR parser, every reduction is counted
+# and timed. The actions never nest, so the times are exclusive; the rest of the parse time is spent in
+# PLY itself (lexing, table lookups, stack handling).
+#   python grammarStats.py --tables node.can
+
+from collections import Counter,defaultdict
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+
+from conversionMetrics import ConversionMetrics
+from parserPy import Parser
+import ply.yacc as yacc
+
+class RuleStats:
+
+    def wrap(self,production):
+        action = production.callable
+        function = production.func
+        rule = production.str
+
+        def timed_action(p):
+            start = time.perf_counter()
+            try:
+                action(p)
+            finally:
+                self.seconds[function] += time.perf_counter() - start
+                self.counts[function] += 1
+                self.productions[rule] += 1
+        return timed_action
+
+    def instrument(self,parser):                # yacc.LRParser of one Parser instance, its productions only
+        for production in parser.productions:
+            if production.callable is not None:
+                production.callable = self.wrap(production)
+
+    def parse(self,caplFile):                   # syntax errors; the time of the actions goes to report()
+        parser_init = Parser()
+        parser_init.rule_stats = self
+        parser_init.metrics = ConversionMetrics(caplFile)  # parse stage without the lexer's token dump
+        with contextlib.redirect_stdout(io.StringIO()):     # the lexer prints every token
+            parser_init.get_ast_tree(caplFile)
+        self.parse_seconds += sum(record['wall_ms'] for record in parser_init.metrics.stages()
+                                  if record['stage'] == 'parse') / 1000
+        self.files += 1
+        return parser_init.syntax_errors
+
+    def report(self):                           # rules, the slowest first
+        rules = []
+        for function,seconds in sorted(self.seconds.items(),key=lambda item: -item[1]):
+            rules.append({'rule': function, 'reductions': self.counts[function], 'ms': seconds * 1000,
+                          'us_per_reduction': seconds * 1e6 / self.counts[function]})
+        return {'files': self.files, 'parse_ms': self.parse_seconds * 1000,
+                'actions_ms': sum(self.seconds.values()) * 1000, 'reductions': sum(self.counts.values()),
+                'rules': rules, 'productions': dict(self.productions.most_common())}
+
+    def __init__(self):
+        self.counts = Counter()                 # p_* function -> reductions
+        self.seconds = defaultdict(float)       # p_* function -> time in the action
+        self.productions = Counter()            # 'expr -> expr PLUS expr' -> reductions
+        self.parse_seconds = 0.0                # yacc parse() of the files, actions included
+        self.files = 0
+
+def table_stats(module=None):                   # LALR tables built again, as by yacc.yacc(), without writing them
+    module = module or Parser()
+    pdict = dict((name,getattr(module,name)) for name in dir(module))
+    pdict['__file__'] = sys.modules[pdict['__module__']].__file__
+    log = yacc.NullLogger()
+    pinfo = yacc.ParserReflect(pdict,log=log)
+    pinfo.get_all()
+    pinfo.validate_all()
+    grammar = yacc.Grammar(pinfo.tokens)
+    for term,assoc,level in pinfo.preclist:
+        grammar.set_precedence(term,assoc,level)
+    for function,(file,line,name,symbols) in pinfo.grammar:
+        grammar.add_production(name,symbols,function,file,line)
+    grammar.set_start(pinfo.start)
+    start = time.perf_counter()
+    table = yacc.LRGeneratedTable(grammar,'LALR',log)
+    build_seconds = time.perf_counter() - start
+
+    actions = sum(len(row) for row in table.lr_action.values())
+    gotos = sum(len(row) for row in table.lr_goto.values())
+    return {'method': 'LALR', 'states': len(table.lr_action), 'productions': len(grammar.Productions) - 1,
+            'terminals': len(grammar.Terminals) - 1, 'nonterminals': len(grammar.Nonterminals),
+            'action_entries': actions, 'goto_entries': gotos, 'build_ms': build_seconds * 1000,
+            'shift_reduce_conflicts': len(table.sr_conflicts), 'reduce_reduce_conflicts': len(table.rr_conflicts),
+            'conflict_states': len(set([state for state,_,_ in table.sr_conflicts] +
+                                       [state for state,_,_ in table.rr_conflicts])),
+            'unused_tokens': sorted(grammar.unused_terminals()),
+            'unused_rules': sorted(production.name for production in grammar.unused_rules()),
+            'rr_conflicts': sorted(set("state %d: %s, not %s" % (state,rule,rejected)           # one per lookahead
+                                       for state,rule,rejected in table.rr_conflicts))}
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Count and time the grammar rules while parsing CAPL files.")
+    arg_parser.add_argument('--tables',action='store_true',help="statistics of the LALR tables too")
+    arg_parser.add_argument('--top',type=int,default=25,help="rules printed")
+    arg_parser.add_argument('--json',help="everything as JSON")
+    arg_parser.add_argument('files',nargs='*')
+    args = arg_parser.parse_args()
+
+    results = {}
+    if args.files:
+        stats = RuleStats()
+        for caplFile in args.files:
+            if stats.parse(caplFile):
+                print("WARNING! Syntax errors in %s" % caplFile)
+        report = stats.report()
+        results['rules'] = report
+        print("%d files: parse %.1f ms, %d reductions, %.1f ms (%.0f %%) in the actions" % (
+            report['files'],report['parse_ms'],report['reductions'],report['actions_ms'],
+            100 * report['actions_ms'] / max(report['parse_ms'],1e-9)))
+        print("%-32s %10s %10s %10s" % ("rule","reductions","ms","us/red."))
+        for rule in report['rules'][:args.top]:
+            print("%-32s %10d %10.2f %10.2f" % (rule['rule'],rule['reductions'],rule['ms'],rule['us_per_reduction']))
+    if args.tables:
+        tables = table_stats()
+        results['tables'] = tables
+        print("%s tables: %d states, %d productions, %d terminals, %d nonterminals, %d action and %d goto entries" % (
+            tables['method'],tables['states'],tables['productions'],tables['terminals'],tables['nonterminals'],
+            tables['action_entries'],tables['goto_entries']))
+        print("conflicts: %d shift/reduce, %d reduce/reduce in %d states; unused tokens: %s" % (
+            tables['shift_reduce_conflicts'],tables['reduce_reduce_conflicts'],tables['conflict_states'],
+            ", ".join(tables['unused_tokens']) or "none"))
+    if args.json:
+        with open(args.json,'w') as f:
+            json.dump(results,f,indent=2)
@@ -24,6 +24,7 @@ __email__ = "mikulkal@hotmail.com"
 
 
 import io
+import re
 from ply import *
 import ply.lex as lex
 from ply.lex import TOKEN
@@ -152,6 +153,7 @@ class Lexer:
 
     @TOKEN(vars_keyword)            # must be before declaring ID! -- precedence
     def t_VARS(self,t):
+        t.lexer.lineno += t.value.count('\n')     # newlines inside tokens count too, for the line numbers of errors
         return t
 
     # regular expressions
@@ -211,25 +213,27 @@ class Lexer:
     t_LPAR = r'\('
     t_RPAR = r'\)'
     t_NUM = r'[0-9]+'
-    t_STRING = r'\"(\\.|[^\\"])(\\.|[^\\"])+\"'
     t_CHARC = r'\"(.)\"'
     t_KEY = r'\'(.)\''
     t_ID = r'[a-zA-Z_][a-zA-Z0-9_-]*'
     t_DCOL = r'\:\:'
-    t_COMMENT = r'/\*([^\*]|\*[^*/])*\*/'     # manual - sec. 8.4. - comments
     t_CppCOMMENT = r'//.*'
-    t_CAPLEVENT_word =r'preStart|start|stopMeasurement|busOff|timer|key|message|errorActive|errorPassive|warningLimit|errorFrame|envVar|preStop'
+    t_CAPLEVENT_word =r'preStart|start|stopMeasurement|busOff|timer|key|message|errorActive|errorPassive|warningLimit|errorFrame|envVar|preStop|signal'
     #t_DATATYPE = r'(char|byte|int|word|dword|long|float|double|message|timer|msTimer)'
     #t_VAR = r'(' + t_DATATYPE + r')+(' + t_WS + r')*(' + t_ID + r')*(' + t_WS + r')*\;'
 
     float_const = r'(' + t_NUM + r')\.(' + t_NUM + r')'
     hex_const = r'(0[xX][0-9a-fA-F]+)'
 
-    array_decl = r'((' + t_LBRK + r')[a-zA-Z0-9]*(' + t_RBRK + r'))+'
+    array_dim = r'(' + t_LBRK + r')[a-zA-Z0-9]*(' + t_RBRK + r')'
+    array_decl = r'(' + array_dim + r')+'
 
-    on_event_declar = r'(on' + t_WS + r')+(' + t_CAPLEVENT_word + r')+'
-    capl_begin = r'\/\*\@\@(' + t_ID + r')*(\:)' + r'(' + t_WS + r')*(' + t_ID + r'|' + t_KEY+ r')?(\:)?(' + t_WS + r')*\*\/'
-    capl_func_begin = r'\/\*\@\@caplFunc\:(' + t_ID + r')+\((' + t_ID + r'|' + t_COM + r'|' + array_decl +  r'|' + t_WS + r')*\)\:(' + t_WS + r')*\*\/'
+    on_event_declar = r'(on' + t_WS + r')(' + t_CAPLEVENT_word + r')+'     # once, "on on on ..." was quadratic
+    # The markers can be matched in one way only, so a long marker without its end fails in linear time.
+    # E.g. (ID)* or (ID|COM|...)* split 'abc' into 'abc', 'ab' 'c', 'a' 'bc', ... and the master regex
+    # tried all of them - exponential in the length of the names. A name is followed by a separator here.
+    capl_begin = r'\/\*\@\@(' + t_ID + r')?(\:)(' + t_WS + r')*((' + t_ID + r'(\:\:' + t_ID + r')?|' + t_KEY + r')(\:)?(' + t_WS + r')*|(\:)(' + t_WS + r')*)?\*\/'     # ID::ID for on signal
+    capl_func_begin = r'\/\*\@\@caplFunc\:' + t_ID + r'\((' + t_ID + r')?((' + t_COM + r'|' + array_dim + r'|' + t_WS + r')(' + t_ID + r')?)*\)\:(' + t_WS + r')*\*\/'
 
     #capl_func_begin = r'\/\*\@\@caplFunc\:(' + t_ID + r')+\((' + t_ID + r')*\)(' + t_WS + r')*\*\/'
     capl_end = r'\/\*\@\@end(' + t_WS + r')*\*\/'
@@ -251,6 +255,7 @@ class Lexer:
 
     @TOKEN(on_event_declar)
     def t_CAPLEVENT(self,t):
+        t.lexer.lineno += t.value.count('\n')
         return t
 
     @TOKEN(t_ID)
@@ -264,16 +269,60 @@ class Lexer:
 
     @TOKEN(capl_begin)
     def t_CAPLBEGIN(self,t):
+        t.lexer.lineno += t.value.count('\n')
         return t   
 
     @TOKEN(capl_func_begin)
     def t_CAPLFUNCBEGIN(self,t):
+        t.lexer.lineno += t.value.count('\n')
         return t
     
     @TOKEN(capl_end)
     def t_CAPLEND(self,t):
+        t.lexer.lineno += t.value.count('\n')
         return t    
 
+    def t_COMMENT(self,t):                  # manual - sec. 8.4. - comments, up to the first */
+        r'/\*'
+        data = t.lexer.lexdata
+        if data is self.unclosed_comment[0] and t.lexpos >= self.unclosed_comment[1]:
+            end = -1                            # no */ after an earlier /* either
+        else:
+            end = data.find('*/',t.lexpos + 2)
+        if end < 0:                             # '/' as before, a later /* is not searched to the end again
+            self.unclosed_comment = (data,t.lexpos)
+            t.type = 'DIVIDE'
+            t.value = '/'
+            t.lexer.lexpos = t.lexpos + 1
+            return t
+        t.value = data[t.lexpos:end + 2]
+        t.lexer.lexpos = end + 2
+        t.lexer.lineno += t.value.count('\n')
+        return t
+
+    string_chars = re.compile(r'(\\.|[^\\"])*')      # up to the closing quote, a backslash at a line end or EOF
+
+    def t_STRING(self,t):                   # at least two characters, "x" is CHARC
+        r'\"'
+        data = t.lexer.lexdata
+        if data is self.unclosed_string[0] and t.lexpos < self.unclosed_string[1]:
+            end = -1                            # an escaped quote of a string found unclosed before, it ends there too
+        else:
+            end = self.string_chars.match(data,t.lexpos + 1).end()
+            body = data[t.lexpos + 1:end]
+            if data[end:end + 1] == '"' and (len(body) > 2 or len(body) == 2 and body[0] != '\\'):
+                t.value = data[t.lexpos:end + 1]
+                t.lexer.lexpos = end + 1
+                t.lexer.lineno += t.value.count('\n')
+                return t
+            self.unclosed_string = (data,end)
+        if data[t.lexpos + 2:t.lexpos + 3] == '"' and data[t.lexpos + 1] != '\n':
+            t.type = 'CHARC'
+            t.value = data[t.lexpos:t.lexpos + 3]
+            t.lexer.lexpos = t.lexpos + 3
+            return t
+        print("Illegal character '%s'" % t.value[0])    # as t_error(), the text after the quote is lexed again
+
     def getTokens(self):
         return self.tokens;
    
@@ -293,13 +342,18 @@ class Lexer:
     def build(self,**kwargs):
         self.lexer = lex.lex(module=self, **kwargs)
 
-    def test(self,filename):
+    def test(self,filename):                    # number of tokens
         data = open(filename).read()
         self.lexer.input(data)
+        count = 0
         while True:
             tok = self.lexer.token()            # take next token
             if not tok: break                   # EOF reached
             print(tok)
+            count += 1
+        return count
 
     def __init__(self):
+       self.unclosed_comment = (None,0)         # lexdata and position from which it has no */
+       self.unclosed_string = (None,0)          # lexdata and the end of the last string found unclosed
        print("Lexer initialized.")
\ No newline at end of file
@@ -28,196 +28,26 @@ __email__ = "mikulkal@hotmail.com"
 import tkinter as tk
 from tkinter import *
 from tkinter import filedialog
-from lxml import etree
+from tkinter import ttk
 import os.path
 import io
-from enum import Enum
+import sys
 
-from parserPy import Parser
+import conversionJobs
+import xvpConverter
 
-class Ctrl(Enum):
-    CheckBoxControl = 1
-    ButtonControl = 2
-    SwitchControl = 3
-    RadioButtonControl = 4
-    ComboBoxControl = 5
-    MeterControl = 6
-    AnalogGaugeControl = 7
-    LCDControl = 8
+POLL_MS = 100                                   # progress of a running conversion is read this often
 
-class PanelsWindow:
-
-    # Pythonic way of switch-case stmt
-    def checkbox():
-        return Ctrl.CheckBoxControl
-
-    def button():
-        return Ctrl.ButtonControl
-
-    def switch():
-        return Ctrl.SwitchControl
-
-    def radio_button():
-        return Ctrl.RadioButtonControl
-
-    def combo_box():
-        return Ctrl.ComboBoxControl
-
-    def meter():
-        return Ctrl.MeterControl
+def file_size(path):                            # a missing file is reported by the conversion itself
+    return os.path.getsize(path) if os.path.isfile(path) else 0
 
-    def analog_gauge():
-        return Ctrl.AnalogGaugeControl
-
-    def lcd():
-        return Ctrl.LCDControl
-
-    objects_options = { 'CheckBoxControl' : checkbox,
-                       'ButtonControl' : button,
-                       'SwitchControl' : switch,
-                       'RadioButtonControl' : radio_button,
-                       'ComboBoxControl' : combo_box,
-                       'MeterControl' : meter,
-                       'AnalogGaugeControl' : analog_gauge,
-                       'LCDControl' : lcd,
-                    }           
+class PanelsWindow:
 
     def convert_xvp_callback(self,xvpFiles):
         xvpFiles_list = (xvpFiles.get()).split(",")
-        
-        panel_id = 1
-        for xvpFile in xvpFiles_list:
-
-            tree = etree.parse(xvpFile)           # parse xvp file
-            root = tree.getroot()                       # get root of an xml tree
- 
-            controls_list = []
-            design_list = []
-
-            #objects = tree.xpath("Object/Object/@Type")      # select attribute Type of all tags Object inside Panels.Runtime.Panel
-            objects = tree.xpath("Object/Object")  
-
-            for num in range(1,len(objects)+1):              # iterate through objects      
-                # from an attribute Type of tag Object select an actual type of an object (e.g. CheckBoxControl)
-                object = tree.xpath("/Panel/Object/Object[%s]/@Type" % num)
-                object_typeAttr = object[0]
-                object_typeAttr_list = object_typeAttr.split(",")    # split all entries of type (i.e. attributes to list)
-                object_vectorType_list = (object_typeAttr_list[0]).split(".")   # select the first entry and split so we can get type of an object
-                object_type = object_vectorType_list.pop()            # actual type (e.g. CheckBoxControl) is located as the last element 
-
-                object_type = self.objects_options[object_type]()    # convert to ENUM type
-
-                # select text inside tags <Property Name='SymbolConfiguration'>
-                prop_config = tree.xpath("/Panel/Object/Object[%s]/Property[@Name='SymbolConfiguration']/text()" % num)
-                object_config_entry = prop_config[0]
-                object_config_list = object_config_entry.split(";")     # put all properties from SymbolConfiguration into a list
-
-                node = object_config_list[3]
-                message = object_config_list[4]
-                signal = object_config_list[5]
-                dbc_file = object_config_list[7]
-
-                prop_position = tree.xpath("/Panel/Object/Object[%s]/Property[@Name='Location']/text()" % num)
-                object_position = prop_position[0]
-                object_position = object_position.split(", ")
-                prop_size = tree.xpath("/Panel/Object/Object[%s]/Property[@Name='Size']/text()" % num) 
-                object_size = prop_size[0]
-                object_size = object_size.split(", ")
-                prop_label = tree.xpath("/Panel/Object/Object[%s]/Property[@Name='Text']/text()" % num) 
-                object_label = prop_label[0]
-
-                controls_list.append([('ID',num),(object_type),('Node',node),('Message',message),('Signal',signal),('DBC',dbc_file)])
-                design_list.append([('Position',object_position),('Size',object_size),('Label',object_label)])
-          
-            self.generate_code_aof(panel_id,controls_list, design_list)
-            panel_id += 1
-
-    def generate_code_aof(self,panel_id,controls,design):
-        string = ""
-        if (panel_id == 1):
-            f = open('generatedWorkspace.aof','w')
-            string += "[Allgemein]\n"+"Version=3\n"+"LeftSide=0\n"+"[ErfassSignale]\n"+"SignalschlsselListe=\n"
-            string += "[Page%s]\n" % str(panel_id)
-            string += "SCROLLPOS=0|0\n"
-        else:
-            f = open('generatedWorkspace.aof','a')
-            string += "[Page%s]\n" % str(panel_id)
-            string += "SCROLLPOS=0|0\n"
-
-        # example: output[0][0][1] = 1st object, 1st tuple ('ID',num), value (num)
-        name = ""
-        position_fill = [[0 for x in range(1000)] for x in range(1000)]          # init empty list
-        for i in range(0,len(controls)):
-            object_type = controls[i][1]
-
-            if (object_type == Ctrl.ButtonControl) or (object_type == Ctrl.CheckBoxControl):
-                if not (str(controls[i][2][1])=="" and str(controls[i][3][1])==""):     # empty message and signal ---> i.e. variable
-                    string += "BOOLCONTROL=Signalschlssel:TX."
-                    for j in range (2,5):   # positions in control_list
-                        if (j < 4):
-                            #string += str(controls[i][j][1])+'.'
-                            name += str(controls[i][j][1])+'.'
-                        else:
-                            #string += str(controls[i][j][1])+';'
-                            name += str(controls[i][j][1])+';'
-
-                    string += name
-                    
-                    width = round(len(name)/5.5)      # width according to text in the button field
-                    
-                    x_pos = design[i][0][1][0]      # i-th tuple, 1st tuple, value, x-position
-                    y_pos = design[i][0][1][1]
-                    #width = design[i][1][1][0]
-                    height = design[i][1][1][1]
-
-                    h_space = 18
-                    v_space = 12
-                    move_left = 5
-                    x_pos = round(int(x_pos) / h_space) - move_left      # divider says how large space is between controls, substractor moves controls to the left
-                    y_pos = round(int(y_pos) / v_space)
-                    #width = int(width)
-                    height = int(height)
-                    #if width < 49:
-                    #    width = 49
-                    if height < 25:
-                        height = 25
-                    #width = round(width*3.5 / 49)
-                    height = round(height*1.5 / 25)          
-
-                    specific_aof_attributes_1 = "Shortname:1;ColorOn:255;ColorOff:8421504;ButtonStyle:7;TextAlignment:0;ButtonAlignment:2;"
-                    specific_aof_attributes_2 = "ButtonHeight:15;ButtonWidth:15;ButtonMode:1;IsHiActive:1;\n"   # hi/low button at the corner of a object 
-
-                    #if position_fill[x_pos][y_pos] == 1:
-                    #    condition = True
-                    #    while condition:
-                    #        x_pos = x_pos + 1
-                    #        condition = self.test_loop_condition(x_pos,y_pos,position_fill)
-                    #if position_fill[x_pos+width][y_pos] == 1:
-                    #    condition = True
-                    #    while condition:
-                    #        x_pos = x_pos - 1
-                    #        condition = self.test_loop_condition(x_pos+width,y_pos,position_fill)
-
-                    for i in range(x_pos,x_pos+width):
-                        for j in range(y_pos,y_pos+height):
-                            position_fill[i][j] = 1
-
-                    string += "XPos:%s;YPos:%s;" % (x_pos,y_pos)
-                    string += "XSize:%s;YSize:%s;" % (width,height)
-                    string += specific_aof_attributes_1
-                    string += specific_aof_attributes_2
-                else:
-                    pass
-                name = ""
-
-            
-
-        f.write(string)
-        print("Transfer to AOF file successful.")
-
-    def test_loop_condition(self,x_pos,y_pos,positionFill):
-         return (positionFill[x_pos][y_pos] == 0)
-
+        aofFile = 'generatedWorkspace.aof'
+        self.start_job("XVP -> AOF",conversionJobs.xvp_to_aof,(xvpFiles_list,aofFile,None),len(xvpFiles_list),
+                       [aofFile,os.path.join(xvpConverter.cache_dir(aofFile),'*')])
 
     def select_xvp_callback(self,xvp):
         files = tk.filedialog.askopenfilenames(**self.file_opt)
@@ -233,16 +63,67 @@ class PanelsWindow:
                 xvp.insert(END,file+",")
 
     def convert_caplWwb_callback(self,caplFile):
-        parser_init = Parser()
-        ast_tree = parser_init.get_ast_tree(caplFile)
-        parser_init.generate_code(ast_tree)
-        parser_init.write_to_file()
+        self.start_job("CAPL -> WWB",conversionJobs.capl_to_wwb,
+                       (caplFile.get(),'generatedScript.mac',self.dbcArxml_path.get()),file_size(caplFile.get()),
+                       ['generatedScript.mac'])
 
     def convert_caplC_callback(self,caplFile):
-        parser_init = Parser()
-        ast_tree = parser_init.get_ast_tree(caplFile)
-        parser_init.generate_code_c(ast_tree)
-        parser_init.write_to_file_c()
+        self.start_job("CAPL -> C",conversionJobs.capl_to_c,
+                       (caplFile.get(),'generatedScript.c',self.dbcArxml_path.get()),file_size(caplFile.get()),
+                       ['generatedScript.c'])
+
+    def start_job(self,name,function,args,size,outputs):    # size: bytes of CAPL or number of panels, for the progress bar
+        if self.job is not None:
+            print("WARNING! %s is still running." % self.job.name)
+            return
+        self.job = conversionJobs.BackgroundJob(name,function,args,outputs)
+        self.job_size = size
+        self.fragments = 0
+        self.status.set("%s: started" % name)
+        self.progress_bar['value'] = 0
+        self.cancel_btn.config(state=NORMAL)
+        self.top.after(POLL_MS,self.poll_job)
+
+    def poll_job(self):
+        if self.job is None:
+            return
+        for event in self.job.poll():
+            if event[0] == 'progress':
+                self.show_progress(*event[1:])
+        result = self.job.result
+        if result is None:
+            self.top.after(POLL_MS,self.poll_job)
+            return
+        sys.stdout.write(result.output)         # console output of the conversion, as before
+        if result.ok:
+            self.status.set("%s: done in %.1f s" % (result.name,result.seconds))
+            self.progress_bar['value'] = 100
+        else:
+            print("ERROR! %s: %s" % (result.name,result.error))
+            self.status.set("%s: %s" % (result.name,result.error))
+        self.cancel_btn.config(state=DISABLED)
+        self.job = None
+
+    def show_progress(self,stage,count,size):   # parsing up to 50 %, generating the rest
+        if stage == 'parse':
+            self.fragments = count
+            self.progress_bar['value'] = 50 * size / max(self.job_size,1)
+            self.status.set("%s: %d fragments parsed, %d of %d kB" % (self.job.name,count,size // 1024,self.job_size // 1024))
+        elif stage == 'generate':
+            self.progress_bar['value'] = 50 + 50 * count / max(self.fragments,1)
+            self.status.set("%s: %d of %d fragments generated, %d kB" % (self.job.name,count,self.fragments,size // 1024))
+        else:                                   # 'convert', panels
+            self.progress_bar['value'] = 100 * count / max(self.job_size,1)
+            self.status.set("%s: %d panels converted, %d kB" % (self.job.name,count,size // 1024))
+
+    def cancel_callback(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.poll_job()
+
+    def close_callback(self):                   # the conversion does not outlive its window
+        self.cancel_callback()
+        self.top.destroy()
 
     def select_capl_callback(self,capl):
         file = tk.filedialog.askopenfilename(**self.file_opt)
@@ -295,8 +176,22 @@ class PanelsWindow:
         convert_xvp_btn.config(width=20,padx=10,pady=10,bd=2,font="Cambria 13")
         convert_xvp_btn.grid(row=2,column = 1)
 
-    def __init__(self,master):
+        self.status = StringVar()
+        status_label = Label(master,textvariable = self.status,anchor=W)
+        status_label.grid(row=3,column = 1,columnspan = 3,sticky = W+E)
+        status_label.config(font="Cambria 11")
+        self.progress_bar = ttk.Progressbar(master,length=400,maximum=100)
+        self.progress_bar.grid(row=4,column = 1,columnspan = 3,sticky = W+E,pady=(0,5))
+        self.cancel_btn = Button(master, text=u"CANCEL", command = self.cancel_callback, state=DISABLED)
+        self.cancel_btn.config(width=20,padx=10,pady=5,bd=2,font="Cambria 13")
+        self.cancel_btn.grid(row=3,column = 4,rowspan = 2)
+
+    def __init__(self,master,dbcArxml_path):
+        self.dbcArxml_path = dbcArxml_path      # DBC/ARXML selected in the main window
+        self.job = None                         # conversionJobs.BackgroundJob running
         top = tk.Toplevel(master)
+        self.top = top
+        top.protocol("WM_DELETE_WINDOW",self.close_callback)
         frame_top = Frame(top)
         frame_top.grid(row = 0, column = 0, rowspan = 3, columnspan = 2, sticky = W+E+N+S,padx=5,pady=(5,1)) 
         frame_bottom = Frame(top)
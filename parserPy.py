@@ -23,6 +23,10 @@ __version__ = "1.0"
 __email__ = "mikulkal@hotmail.com"
 
 from lexer import Lexer
+import dbcIndex
+from signalCodegen import SignalCodegen
+from envVarCodegen import EnvVarCodegen
+import conversionMetrics
 import ply.lex as lex
 import ply.yacc as yacc
 import ast
@@ -30,15 +34,18 @@ import io
 import string
 import mmap
 import os
+import contextlib
+import threading
 
 class Node:
-    def __init__(self,type,children=None,leaf=None):
+    def __init__(self,type,children=None,leaf=None,lineno=None):
          self.type = type
          if children:
               self.children = children
          else:
               self.children = [ ]
          self.leaf = leaf
+         self.lineno = lineno                   # of identifiers and case labels, for error messages
 
     def __repr__(self):
         return "{type: %s, children: %s, leaf: %s}" % (self.type,self.children,self.leaf)
@@ -49,9 +56,9 @@ class Node:
 
 class Parser:
     
-    string = ""
-    inside = 0
     tokens = Lexer().tokens                     # define tokens
+    file_functions = ('openFileRead','fileGetString','fileGetStringSZ','fileGetBinaryBlock','fileRewind','fileClose')
+    timer_functions = ('setTimer','cancelTimer','isTimerActive')
 
     precedence = (
         ('left','PLUS','MINUS'),
@@ -73,6 +80,11 @@ class Parser:
                 p[0] = p[1],p[2]
             else:
                 p[0] = p[1]+(p[2],)             # append to the tuple
+        if self.progress:                       # fragments parsed, bytes of CAPL read
+            self.progress('parse',len(p[0]) if isinstance(p[0],tuple) else 1,p.lexer.lexpos)
+        if self.metrics:
+            fragment = p[0][-1] if isinstance(p[0],tuple) else p[0]
+            self.metrics.split('parse',conversionMetrics.fragment_name(fragment),nodes=conversionMetrics.count_nodes(fragment))
 
     def p_code_fragment_1(self,p):
         ''' code_fragment : CAPLFUNCBEGIN user_function compound_statement CAPLEND '''
@@ -104,8 +116,9 @@ class Parser:
         else:
             p[0] = p[1],p[2],p[4]
 
-    def p_capl_event_declaration(self,p):           # e.g. on envVar initialize
+    def p_capl_event_declaration(self,p):           # e.g. on envVar initialize, on signal Msg::Sig
         ''' capl_event_declaration : CAPLBEGIN on_event entry
+                                   | CAPLBEGIN on_event message_signal
                                    | CAPLBEGIN on_event const
                                    | CAPLBEGIN on_event '''
         if len(p) == 3:
@@ -380,7 +393,7 @@ class Parser:
                            | CASE const COL inside_block_list_switch
                            | DEFAULT COL inside_block_list_switch'''
         if len(p) == 5:
-            p[0] = Node("Case",p[4],p[2])             # since we wanna get tuple
+            p[0] = Node("Case",p[4],p[2],p.lineno(1))             # since we wanna get tuple
         else:
             p[0] = Node("Case",p[3],'Default')
 
@@ -444,7 +457,7 @@ class Parser:
 
     def p_entry_ID(self,p):                  
         ''' entry : ID '''                    # single identifier
-        p[0] = Node('ID', None ,p[1])
+        p[0] = Node('ID', None ,p[1],p.lineno(1))
 
     def p_entry_this(self,p):                   # word this
         ''' entry : THIS '''
@@ -467,7 +480,7 @@ class Parser:
 
     def p_entry_signal(self,p):                 # message.signal
         ''' entry : ID DOT ID '''
-        p[0] = Node("Signal",None,p[1]+p[2]+p[3])
+        p[0] = Node("Signal",None,p[1]+p[2]+p[3],p.lineno(1))
 
     def p_entry_key(self,p):
         ''' entry : KEY '''
@@ -567,6 +580,7 @@ class Parser:
         pass
 
     def p_error(self,p):
+        self.syntax_errors += 1
         if p:
             print('Syntax error %s' % p.value,p.lineno)
         else:
@@ -1271,6 +1285,12 @@ class Parser:
                 elif event_name == 'on timer':
                     timer = root.leaf[1].leaf
                     self.string += "Sub On_timer_%s()\n" % timer
+                elif event_name == 'on signal':
+                    message_name,signal_name = self.signal_event_name(root.leaf[1])
+                    if message_name is None:
+                        self.string += "Sub On_signal_%s()\n" % signal_name
+                    else:
+                        self.string += "Sub On_signal_%s_%s()\n" % (message_name,signal_name)
                 else:
                     self.string += "Sub On_%s()\n" % event_name
                 self.inside = 1 
@@ -1287,6 +1307,8 @@ class Parser:
 
     def generate_declaration_c(self,declaration_param):
         variable_type = declaration_param.leaf.leaf
+        if variable_type in ('timer','msTimer'):
+            self.include_c('caplTimer.h')
         print(declaration_param.children)
 
         if not isinstance(declaration_param.children,tuple):    # single declaration
@@ -1523,6 +1545,17 @@ class Parser:
         if function_param.type == 'CAPL_fcn':
             function_name = function_param.leaf.leaf          # leaf: {ID, _ , ILSetSignal}
             parameters = function_param.children
+            if function_name == 'ILSetSignal' or function_name == 'getSignal':
+                self.generate_signal_access_c(function_name,parameters)
+                return
+            if function_name in ('putValue','getValue','getvalue') and self.generate_env_access_c(function_name,parameters):
+                return
+            if function_name == 'write' and self.generate_write_c(parameters):
+                return
+            if function_name in self.file_functions:
+                self.include_c('caplFile.h')                # mapped files, see eventsHandler/caplFile.c
+            elif function_name in self.timer_functions:
+                self.include_c('caplTimer.h')               # timer types and macros of both builds
             self.string += "%s" % function_name
             if not isinstance(parameters,tuple):
                 if parameters == []:         # no parameters
@@ -1570,6 +1603,88 @@ class Parser:
                         else:
                             self.string += "%s," % param_name
 
+    def signal_event_name(self,entry):              # (message, signal) of on signal Msg::Sig / Msg.Sig / Sig
+        if entry.type == 'msg_sig':
+            return entry.leaf[0].leaf,entry.leaf[1].leaf
+        elif entry.type == 'Signal':
+            return tuple(entry.leaf.split('.'))
+        else:
+            return None,entry.leaf
+
+    def generate_signal_access_c(self,function_name,parameters):    # e.g. ILSetSignal(Ctrl_C_Stat1_AR::ReturnKey_Psd_UB,1)
+        if function_name == 'ILSetSignal':                  # sets the transferred signal to the provided physical value
+            msg_sig = parameters[0].leaf
+            value = parameters[1].leaf
+        else:                                               # gets the value of a signal
+            msg_sig = parameters.leaf
+            value = None
+        message_name = msg_sig.leaf[0].leaf
+        signal_name = msg_sig.leaf[1].leaf
+        found = self.signal_code.lookup(message_name,signal_name)
+
+        if value is None:
+            if found:
+                self.string += self.signal_code.get_call(*found)
+            else:
+                self.string += "getSignal(%s::%s)" % (message_name,signal_name)
+            return
+
+        value_code = self.parameter_code_c(value)
+        if found:
+            self.string += self.signal_code.set_call(found[0],found[1],value_code)
+        else:
+            self.string += "ILSetSignal(%s::%s,%s)" % (message_name,signal_name,value_code)
+
+    def parameter_code_c(self,value):               # C code of a function argument
+        value_start = len(self.string)
+        if value.type == 'CAPL_fcn':
+            self.generate_function_c(value)
+        elif value.type == 'Expression':
+            self.generate_code_c(value)
+        else:
+            self.string += "%s" % value.leaf
+        value_code = self.string[value_start:]
+        self.string = self.string[:value_start]
+        return value_code
+
+    def generate_env_access_c(self,function_name,parameters):   # e.g. putValue(Ignition,1), False if not translatable
+        if not isinstance(parameters,tuple):
+            parameters = (parameters,)
+        if parameters == ([],) or parameters[0].leaf.type not in ('ID','This'):
+            return False
+        if parameters[0].leaf.type == 'This':       # getValue(this) in on envVar
+            if self.env_var is None:
+                return False
+            name = self.env_var
+        else:
+            name = parameters[0].leaf.leaf
+
+        if function_name == 'putValue':
+            if len(parameters) != 2:
+                return False
+            self.string += self.env_code.put_call(name,self.parameter_code_c(parameters[1].leaf))
+        elif len(parameters) == 2:                  # string copied into a buffer
+            self.string += self.env_code.get_call(name,self.parameter_code_c(parameters[1].leaf))
+        else:
+            self.string += self.env_code.get_call(name)
+        return True
+
+    def generate_write_c(self,parameters):         # e.g. write("value = %d",value), formatted by the log thread
+        if not isinstance(parameters,tuple):
+            parameters = (parameters,)
+        if parameters == ([],) or parameters[0].leaf.type != 'STRING':
+            return False
+        self.include_c('caplLog.h')
+        args = [self.parameter_code_c(param.leaf) for param in parameters[1:]]
+        if len(args) > 8:
+            print("WARNING! write() with more than 8 arguments, the rest is not printed.")
+        if args:
+            self.string += "capl_log_write(%s,%d,(const struct capl_log_arg[]){%s})" % (
+                parameters[0].leaf.leaf,len(args),",".join("CAPL_LOG_ARG(%s)" % arg for arg in args))
+        else:
+            self.string += "capl_log_write(%s,0,NULL)" % parameters[0].leaf.leaf
+        return True
+
     def generate_message_declaration_c(self,message):
         message_id = message.leaf.leaf
         message_name = message.children.leaf
@@ -1580,6 +1695,7 @@ class Parser:
     def generate_code_c(self,tree):
         print(tree)
         print("--------------")
+        self.env_code.scan(tree)                    # types of environment variables, once for the whole tree
 
         root = tree
         if not isinstance(root,tuple):
@@ -1651,27 +1767,8 @@ class Parser:
                 self.string += "\n"
 
             elif root.type == 'CAPL_fcn':             # translation of CAPL defined functions
-                function_name = root.leaf.leaf 
-                if function_name == 'ILSetSignal':          # sets the transferred signal to the provided physical value
-                    self.string += "\tILSetSignal"
-                    parameters = root.children
-                    message_name = parameters[0].leaf.leaf[0].leaf
-                    signal_name = parameters[0].leaf.leaf[1].leaf
-                    signal_value = parameters[1].leaf.leaf
-                    self.string += "(%s::%s,%s)" % (message_name,signal_name,signal_value)
-
-                elif function_name == 'getSignal':          # gets the valueo of a signal
-                    self.string += "getSignal"
-                    parameter = root.children.leaf
-                    values = parameter.leaf
-                    if(parameter.type == 'msg_sig'):
-                        message_name = values[0].leaf
-                        signal_name = values[1].leaf
-                        self.string += "(%s::%s)" % (message_name,signal_name)
-
-                else:
-                    self.generate_function_c(root)
-                    self.string += ";\n"
+                self.generate_function_c(root)          # ILSetSignal/getSignal see generate_signal_access_c
+                self.string += ";\n"
 
             elif root.type == 'IF':
                 self.string += 'if('
@@ -1788,37 +1885,32 @@ class Parser:
                     event_name = root.leaf.split("on ")[1]   # get event name, i.e. preStart, start, ... 
                 if event_name == 'on message':
                     message = root.leaf[1].leaf
-                    with open('eventsHandler/msgEvents.c','r') as f_init:
-                        string_ev = ""
-                        s = mmap.mmap(f_init.fileno(), 0, access=mmap.ACCESS_READ)
-                        f_data = list(f_init.read())
-
-                        cb_index = s.find(b'recvmsg_cb')
-                        switch_ix = s.find(b'switch',cb_index)
-                        s.close()
-                    if switch_ix == -1:
-                        with open('eventsHandler/msgEvents.c') as fin, open('eventsHandler/msgEvents_temp.c','w') as fout:
-                            for line in fin:
-                                fout.write(line)
-                                if line == '/* Events */\n':
-                                   next_line = next(fin)
-                                   switch_str = 'switch(msg_name) {\n'
-                                   switch_str += 'case %s: %s_event(); break;\n}\n' % (message,message)
-                                   fout.write(switch_str)
-                                   fout.writelines(next_line)
-                    else:
-                        with open('eventsHandler/msgEvents.c') as fin, open('eventsHandler/msgEvents_temp.c','w') as fout:
-                            for line in fin:
-                                fout.write(line)               
-                                if line == 'switch(msg_name) {\n':
-                                   next_line = next(fin)
-                                   switch_str = 'case %s: %s_event(); break;\n}\n' % (message,message)
-                                   fout.write(switch_str)
-                                   fout.writelines(next_line) 
-
-                    os.remove('eventsHandler/msgEvents.c')
-                    os.rename('eventsHandler/msgEvents_temp.c','eventsHandler/msgEvents.c')
+                    if message not in self.message_events:
+                        self.message_events.append(message)     # called from dispatch_message_events()
                     self.string += "void %s_event() {\n" % message
+
+                elif event_name == 'on timer':
+                    timer = root.leaf[1].leaf
+                    self.timer_events.append(timer)         # bound to the timer in capl_bind_timers()
+                    self.include_c('caplTimer.h')
+                    self.string += "void timer_%s_event() {\n" % timer
+
+                elif event_name == 'on envVar':
+                    self.env_var = root.leaf[1].leaf        # 'this' inside the handler
+                    self.string += "void %s() {\n" % self.env_code.subscribe(self.env_var)     # run by writes of the variable
+
+                elif event_name == 'on signal':
+                    message_name,signal_name = self.signal_event_name(root.leaf[1])
+                    found = self.signal_code.lookup(message_name,signal_name)
+                    if found:
+                        self.string += "void %s() {\n" % self.signal_code.add_event(*found)    # called by dispatch_signal_events()
+                    else:                                   # never dispatched, see dispatch_signal_events()
+                        if self.signal_code.database is None:
+                            print("WARNING! on signal %s: no database, the handler is never called." % signal_name)
+                        if message_name is None:
+                            self.string += "void signal_%s_event() {\n" % signal_name
+                        else:
+                            self.string += "void signal_%s__%s_event() {\n" % (message_name,signal_name)
                     
                 else:
                     self.string += "void %s_event() {\n" % event_name
@@ -1828,6 +1920,7 @@ class Parser:
                     for statement in statements:
                         self.generate_code_c(statement)
                 self.string += "}\n\n"
+                self.env_var = None
 
 
         else:
@@ -1835,8 +1928,7 @@ class Parser:
                 self.generate_code_c(entry)
 
         
-    def write_to_file(self):
-        f = open('generatedScript.mac','w')
+    def write_to_file(self,outputFile='generatedScript.mac'):
         self.string = (self.string).replace("Int","Integer")
         self.string = (self.string).replace("Word","UInteger")      # unsigned 16-bits
         self.string = (self.string).replace("Dword","ULong")        # unsigned 32-bits
@@ -1844,31 +1936,88 @@ class Parser:
         self.string = (self.string).replace("Float","Decimal")
         self.string = (self.string).replace("0x","&H")              # hex numbers
 
-        f.write(self.string)
+        temp_path = outputFile + '.%d.%d.tmp' % (os.getpid(),threading.get_ident())
+        with open(temp_path,'w') as f:
+            f.write(self.string)
+        os.replace(temp_path,outputFile)        # a cancelled conversion leaves the previous script
         print("WWB Script generated.")
 
-    def write_to_file_c(self):
-        f = open('generatedScript.c','w')
-        f.write(self.string)
+    def include_c(self,header):                 # runtime header, written once at the top of the C file
+        if header not in self.includes:
+            self.includes.append(header)
+
+    def generate_timer_binding_c(self):
+        self.string += "void capl_bind_timers(void) {\n"
+        for timer in self.timer_events:
+            self.string += "capl_timer_bind(&%s.base,timer_%s_event);\n" % (timer,timer)
+        self.string += "}\n"
+
+    def generate_message_dispatch_c(self):      # overrides the weak one of eventsHandler/msgEvents.c
+        self.string += "#include <string.h>\n"
+        self.string += "void dispatch_message_events(const char *msg_name) {\n"
+        for message in self.message_events:
+            self.string += "if (strcmp(msg_name,\"%s\") == 0) %s_event();\n" % (message,message)
+        self.string += "}\n"
+
+    def write_to_file_c(self,outputFile='generatedScript.c'):
+        if self.timer_events:
+            self.generate_timer_binding_c()
+        if self.message_events:
+            self.generate_message_dispatch_c()
+        temp_path = outputFile + '.%d.%d.tmp' % (os.getpid(),threading.get_ident())
+        with open(temp_path,'w') as f:
+            f.write("".join('#include "%s"\n' % header for header in self.includes))
+            f.write(self.signal_code.generate())        # frame buffers and signal accessors used by the code below
+            f.write(self.env_code.generate())           # environment variable slots and table
+            f.write(self.string)
+        os.replace(temp_path,outputFile)
         print("C Script generated.")
 
-    def get_ast_tree(self,caplFile):
+    def measure(self,stage,fragment=None):      # metrics of a stage if requested, see conversionMetrics.py
+        if self.metrics is None:
+            return contextlib.nullcontext({})
+        return self.metrics.measure(stage,fragment)
+
+    def get_ast_tree(self,caplFile):                # path of the CAPL file
         lexer_init = Lexer()                         # create instance of Lexer
         lexer_init.build()                           # build the lexer
-        if isinstance(caplFile,str):                # program called from command line
-            lexer_init.test(caplFile)                   # analyze an input file
-            # Build the lexer and parser
-            yacc.yacc(module = self)
-            ast_tree = yacc.parse(open(caplFile).read())
-        else:                                       # program called from GUI
-            lexer_init.test(caplFile.get())              # analyze an input file
-            # Build the lexer and parser
-            yacc.yacc(module = self)
-            ast_tree = yacc.parse(open(caplFile.get()).read())
-
-            return ast_tree
+        with self.measure('lex') as counters:
+            counters['tokens'] = lexer_init.test(caplFile)      # analyze an input file
+            counters['bytes'] = os.path.getsize(caplFile)
+        lexer_init.lexer.lineno = 1                 # the same lexer again, line numbers of syntax errors from 1
+        # Parser of this instance, not PLY's global yacc.parse() -- conversions may run on several threads
+        with self.measure('tables'):
+            parser = yacc.yacc(module = self)   # loaded from parsetab.py, built once per process by PLY
+        if self.rule_stats:
+            self.rule_stats.instrument(parser)
+        with self.measure('parse') as counters:
+            with open(caplFile) as f:
+                ast_tree = parser.parse(f.read(),lexer = lexer_init.lexer)
+            if self.metrics:
+                counters['nodes'] = conversionMetrics.count_nodes(ast_tree)
+
+        return ast_tree
+
+    def load_database(self,databaseFile):       # DBC/ARXML describing the Msg::Signal references
+        if databaseFile:
+            self.database = dbcIndex.load_database_warm(databaseFile)
+            self.signal_code = SignalCodegen(self.database)
+            self.env_code = EnvVarCodegen(self.database)
 
     def __init__(self):
+        self.timer_events = []                  # timers with an on timer event, C backend
+        self.message_events = []                # messages with an on message event, C backend
+        self.database = None                    # dbcIndex.DatabaseIndex, see load_database()
+        self.signal_code = SignalCodegen(None)  # C accessors of the signals used by the CAPL code
+        self.env_code = EnvVarCodegen(None)     # C slots of the environment variables
+        self.env_var = None                     # variable of the on envVar event being translated
+        self.includes = []                      # runtime headers needed by the generated C code
+        self.string = ""                        # generated code
+        self.inside = 0                         # 1 inside a function or an event handler
+        self.syntax_errors = 0
+        self.progress = None                    # callable(stage,fragments,bytes), see conversionJobs
+        self.metrics = None                     # conversionMetrics.ConversionMetrics
+        self.rule_stats = None                  # grammarStats.RuleStats, counts and times the p_* actions
         print("Parser Initialized")
         #self.generate_code(ast_tree) 
         #self.write_to_file()
@@ -0,0 +1,96 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+from lxml import etree
+import argparse
+import os
+import threading
+import time
+
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+class PreConfigPatcher:
+
+    # Sets bit rate, NWDescriptor (DBC/ARXML) and RBSDescriptor of a CAN port in Provetech:RE config files.
+    # The XPath expressions are compiled once and every file is read by the same parser, so patching
+    # hundreds of configs costs little more than parsing them. Files already containing the values are not written.
+    find_port = etree.XPath("/RCConfiguration/Device/Config/Port[Name/text() = $name]")
+    find_settings = etree.XPath("Config/BitRate | Config/NWDescriptor | Config/RBSDescriptor")
+    parser = etree.XMLParser()
+
+    def patch(self,preConf,portName,bitRate,nwDescriptor,rbsDescriptor):
+        if not bitRate or not nwDescriptor or not rbsDescriptor:
+            print("ERROR! Empty field.")
+            return FAILED
+        try:
+            tree = etree.parse(preConf,self.parser)
+        except (OSError,etree.XMLSyntaxError) as e:
+            print("ERROR! %s: %s" % (preConf,e))
+            return FAILED
+
+        ports = self.find_port(tree,name=portName)
+        if not ports:
+            print("ERROR! Port not found: %s" % preConf)
+            return FAILED
+        values = {'BitRate': bitRate, 'NWDescriptor': nwDescriptor, 'RBSDescriptor': rbsDescriptor}
+        settings = self.find_settings(ports[0])
+        missing = set(values) - set(setting.tag for setting in settings)
+        if missing:
+            print("ERROR! %s missing in %s" % (", ".join(sorted(missing)),preConf))
+            return FAILED
+
+        changed = False
+        for setting in settings:
+            if setting.text != values[setting.tag]:
+                setting.text = values[setting.tag]
+                changed = True
+        if not changed:
+            return UNCHANGED
+
+        temp_path = preConf + '.%d.%d.tmp' % (os.getpid(),threading.get_ident())
+        etree.ElementTree(tree.getroot()).write(temp_path,pretty_print=True)
+        os.replace(temp_path,preConf)           # a config is never left half-written
+        return CHANGED
+
+    def patch_files(self,preConfs,portName,bitRate,nwDescriptor,rbsDescriptor):    # number of files per result
+        results = {CHANGED: 0, UNCHANGED: 0, FAILED: 0}
+        for preConf in preConfs:
+            results[self.patch(preConf,portName,bitRate,nwDescriptor,rbsDescriptor)] += 1
+        return results
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Set port settings in Provetech:RE config files.")
+    arg_parser.add_argument('--port',default='HU_CAN',help="port name, i.e. CAN channel")
+    arg_parser.add_argument('--bit-rate',required=True)
+    arg_parser.add_argument('--nw-descriptor',required=True,help="DBC/ARXML file")
+    arg_parser.add_argument('--rbs-descriptor',required=True,help="XML file of the rest-bus simulation")
+    arg_parser.add_argument('configs',nargs='+')
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    results = PreConfigPatcher().patch_files(args.configs,args.port,args.bit_rate,args.nw_descriptor,args.rbs_descriptor)
+    print("%d changed, %d unchanged, %d failed (%.1f ms)" % (results[CHANGED],results[UNCHANGED],results[FAILED],
+                                                             (time.perf_counter()-start)*1000))
@@ -0,0 +1,161 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Conversions from the command line, e.g. on build servers without a display:
+#   python restbusCli.py capl2c -d vehicle.dbc -o build -j 4 "nodes/*.can"
+#   python restbusCli.py xvp2aof -o workspace.aof "panels/*.xvp"
+#   python restbusCli.py pre-config --bit-rate 500000 --nw-descriptor v.dbc --rbs-descriptor rbs.xml "configs/*.xml"
+# One line is printed per file, the exit status is 1 when any of them failed. With --watch the conversions
+# are run again whenever an input file is saved, only those reading the file.
+
+import argparse
+import os
+import sys
+import time
+
+import conversionJobs
+import conversionMetrics
+import watchMode
+
+def capl_jobs(args,function,extension):
+    jobs = []
+    if args.output_dir:                         # once here, the jobs would race to create it
+        try:
+            os.makedirs(args.output_dir,exist_ok=True)
+        except OSError as e:
+            raise conversionJobs.ConversionError("output directory not made: %s" % e)
+    for caplFile in conversionJobs.expand_inputs(args.files):
+        job_args = (caplFile,conversionJobs.output_path(caplFile,extension,args.output_dir),args.database)
+        if args.metrics or args.profile:
+            job_args += (None,conversionMetrics.ConversionMetrics(caplFile,args.metrics_memory,args.profile))
+        jobs.append((caplFile,function,job_args))
+    return jobs
+
+def xvp_jobs(args):                             # one AOF of all panels, the panels are converted by its own pool
+    xvpFiles = conversionJobs.expand_inputs(args.files)
+    return [(args.output,conversionJobs.xvp_to_aof,(xvpFiles,args.output,args.jobs))]
+
+def pre_config_jobs(args):
+    return [(preConf,conversionJobs.pre_config,(preConf,args.port,args.bit_rate,args.nw_descriptor,args.rbs_descriptor))
+            for preConf in conversionJobs.expand_inputs(args.files)]
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Convert CANoe files without the GUI.")
+    commands = arg_parser.add_subparsers(dest='command',required=True)
+
+    for command,help_text,extension,function in (('capl2c',"CAPL to C (eventsHandler)",'.c',conversionJobs.capl_to_c),
+                                                 ('capl2wwb',"CAPL to WWB macro",'.mac',conversionJobs.capl_to_wwb)):
+        command_parser = commands.add_parser(command,help=help_text)
+        command_parser.add_argument('-d','--database',help="DBC file of the messages")
+        command_parser.add_argument('-o','--output-dir',help="default: next to each input file")
+        command_parser.add_argument('--metrics',help="times and sizes of the stages and fragments, .json or .csv")
+        command_parser.add_argument('--metrics-memory',action='store_true',help="memory peaks too, runs slower")
+        command_parser.add_argument('--profile',choices=conversionMetrics.STAGES,help="cProfile of one stage, printed")
+        command_parser.set_defaults(make_jobs=lambda args,function=function,extension=extension:
+                                    capl_jobs(args,function,extension))
+
+    command_parser = commands.add_parser('xvp2aof',help="XVP panels to one AOF workspace")
+    command_parser.add_argument('-o','--output',default='generatedWorkspace.aof')
+    command_parser.set_defaults(make_jobs=xvp_jobs)
+
+    command_parser = commands.add_parser('pre-config',help="set port settings in Provetech:RE config files")
+    command_parser.add_argument('--port',default='HU_CAN',help="port name, i.e. CAN channel")
+    command_parser.add_argument('--bit-rate',required=True)
+    command_parser.add_argument('--nw-descriptor',required=True,help="DBC/ARXML file")
+    command_parser.add_argument('--rbs-descriptor',required=True,help="XML file of the rest-bus simulation")
+    command_parser.set_defaults(make_jobs=pre_config_jobs)
+
+    for command in ('capl2c','capl2wwb','xvp2aof'):
+        commands.choices[command].add_argument('-w','--watch',action='store_true',
+                                               help="convert again when an input file changes, until Ctrl+C")
+
+    for command_parser in commands.choices.values():
+        command_parser.add_argument('-j','--jobs',type=int,help="worker processes, default: number of CPUs")
+        command_parser.add_argument('--threads',action='store_true',help="worker threads instead of processes")
+        command_parser.add_argument('-v','--verbose',action='store_true',help="print the output of every conversion")
+        command_parser.add_argument('files',nargs='+',help="input files or glob patterns")
+    return arg_parser
+
+def run(jobs,args):                             # number of failed jobs
+    start = time.perf_counter()
+    failed = 0
+    metrics_list = []
+    for result in conversionJobs.run_jobs(jobs,args.jobs,args.threads):
+        if args.verbose and result.output:
+            sys.stdout.write(result.output)
+        if result.metrics:
+            metrics_list.append(result.metrics)
+            if args.verbose:
+                print("\n".join(conversionMetrics.summary(result.metrics)))
+            if result.metrics.profile():
+                print(result.metrics.profile())
+        if result.ok:
+            print("OK    %8.1f ms  %s" % (result.seconds*1000,result.name))
+        else:
+            failed += 1
+            print("FAIL  %8.1f ms  %s: %s" % (result.seconds*1000,result.name,result.error))
+    print("%d converted, %d failed (%.1f ms)" % (len(jobs)-failed,failed,(time.perf_counter()-start)*1000))
+    if getattr(args,'metrics',None) and metrics_list:
+        conversionMetrics.write_report(metrics_list,args.metrics)
+    return failed
+
+def job_inputs(job,databaseFile):               # files read by a job: the CAPL file or all panels, and the database
+    name,function,args = job
+    files = list(args[0]) if isinstance(args[0],list) else [args[0]]
+    if databaseFile:
+        files.append(databaseFile)
+    return set(os.path.abspath(path) for path in files)
+
+def watch(jobs,args):
+    # A saved CAPL file converts that file again; a saved panel rebuilds the AOF, where the page cache
+    # leaves the other panels alone; a saved database converts every CAPL file.
+    inputs = [job_inputs(job,getattr(args,'database',None)) for job in jobs]
+    watcher = watchMode.open_watcher(set().union(*inputs))
+    print("Watching %d files, Ctrl+C to stop." % len(set().union(*inputs)))
+    try:
+        for changed in watchMode.changes(watcher):
+            print("%s changed: %s" % (time.strftime("%H:%M:%S"),", ".join(sorted(os.path.relpath(path) for path in changed))))
+            run([job for job,files in zip(jobs,inputs) if files & changed],args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        jobs = args.make_jobs(args)
+    except conversionJobs.ConversionError as e:
+        print("ERROR! %s" % e)
+        return 2
+
+    failed = run(jobs,args)
+    if getattr(args,'watch',False):
+        watch(jobs,args)
+        return 0
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+# Generates one inline set/get function per signal used in the CAPL code. Everything known from
+# the database (bit positions, byte order, masks, scaling) is resolved here, so the C compiler only
+# sees constant shifts and masks on the frame buffer of the message.
+
+swap_functions = {16: '16', 32: '32', 64: '64'}         # lengths with a single load/store via memcpy
+
+class SignalCodegen:
+
+    def frame_name(self,message):
+        return "%s_frame" % message.name
+
+    def function_name(self,prefix,message,signal):
+        return "%s_%s__%s" % (prefix,message.name,signal.name)
+
+    def lookup(self,message_name,signal_name):          # registers the signal for generate(), None if unknown
+        if self.database is None:
+            return None
+        if message_name is None:                        # e.g. on signal ReturnKey_Psd_UB
+            message = self.database.signal_owner(signal_name)
+            message_name = ''
+        else:
+            message = self.database.message(message_name)
+        if message is None or signal_name not in message.signals:
+            print("WARNING! Signal %s::%s not found in the database." % (message_name,signal_name))
+            return None
+        signal = message.signals[signal_name]
+        self.messages.setdefault(message.name,message)
+        self.signals.setdefault((message.name,signal.name),(message,signal))
+        return (message,signal)
+
+    def add_event(self,message,signal):      # on signal handler, called from dispatch_signal_events()
+        handler = "signal_%s__%s_event" % (message.name,signal.name)
+        if handler not in self.events:
+            self.events[handler] = (message,signal)
+        return handler
+
+    def set_call(self,message,signal,value):
+        return "%s(&%s,%s)" % (self.function_name('set',message,signal),self.frame_name(message),value)
+
+    def get_call(self,message,signal):
+        return "%s(&%s)" % (self.function_name('get',message,signal),self.frame_name(message))
+
+    def bit_positions(self,signal):     # frame bit (byte*8 + bit) of every signal bit, LSB first
+        if signal.little_endian:        # Intel: start bit is the LSB, counting upwards
+            return [signal.start_bit + i for i in range(signal.length)]
+        positions = []                  # Motorola: start bit is the MSB, counting down and jumping to the next byte
+        pos = signal.start_bit
+        for i in range(signal.length):
+            positions.append(pos)
+            if pos % 8 == 0:
+                pos += 15
+            else:
+                pos -= 1
+        positions.reverse()
+        return positions
+
+    def byte_parts(self,signal):        # (byte, lowest bit in the byte, lowest signal bit, number of bits) per byte
+        parts = []
+        for i,pos in enumerate(self.bit_positions(signal)):
+            if parts and parts[-1][0] == pos // 8:
+                byte,bit,lsb,count = parts[-1]
+                parts[-1] = (byte,bit,lsb,count+1)
+            else:
+                parts.append((pos // 8,pos % 8,i,1))
+        return parts
+
+    def aligned_bytes(self,signal):     # (first byte, 'le'/'be') when a single 16/32/64 bit load/store can be used
+        if signal.length not in swap_functions:
+            return None
+        if signal.little_endian and signal.start_bit % 8 == 0:
+            return (signal.start_bit // 8,'le')
+        if not signal.little_endian and signal.start_bit % 8 == 7:
+            return (signal.start_bit // 8,'be')
+        return None
+
+    def change_mask(self,signal):       # bits of the signal in the frame data read as a little-endian 64 bit word
+        mask = 0
+        for pos in self.bit_positions(signal):
+            mask |= 1 << pos
+        return mask
+
+    def scaled(self,signal):
+        return signal.factor != 1 or signal.offset != 0
+
+    def value_type(self,signal):
+        if self.scaled(signal):
+            return 'double'
+        return 'int64_t' if signal.signed else 'uint64_t'
+
+    def generate_set(self,message,signal):
+        code = "static inline void %s(struct can_frame *frame, %s value)\n{\n" % (
+            self.function_name('set',message,signal),self.value_type(signal))
+        if self.scaled(signal):
+            code += "  double scaled = (value - (%r)) / (%r);\n" % (float(signal.offset),float(signal.factor))
+            code += "  uint64_t raw = (uint64_t)(int64_t)(scaled >= 0 ? scaled + 0.5 : scaled - 0.5);\n"
+        else:
+            code += "  uint64_t raw = (uint64_t)value;\n"
+
+        aligned = self.aligned_bytes(signal)
+        if aligned:
+            first,order = aligned
+            bits = swap_functions[signal.length]
+            code += "  uint%s_t bytes = hto%s%s((uint%s_t)raw);\n" % (bits,order,bits,bits)
+            code += "  memcpy(&frame->data[%d], &bytes, %d);\n" % (first,signal.length // 8)
+        else:
+            for byte,bit,lsb,count in self.byte_parts(signal):
+                mask = (1 << count) - 1
+                piece = "raw >> %d" % lsb if lsb else "raw"
+                if count == 8:          # whole byte, plain store
+                    code += "  frame->data[%d] = (uint8_t)(%s);\n" % (byte,piece)
+                else:
+                    piece = "(%s) & 0x%X" % (piece,mask) if lsb else "raw & 0x%X" % mask
+                    if bit:
+                        piece = "(%s) << %d" % (piece,bit)
+                    code += "  frame->data[%d] = (frame->data[%d] & 0x%02X) | (uint8_t)(%s);\n" % (
+                        byte,byte,~(mask << bit) & 0xFF,piece)
+        code += "}\n\n"
+        return code
+
+    def generate_get(self,message,signal):
+        code = "static inline %s %s(const struct can_frame *frame)\n{\n" % (
+            self.value_type(signal),self.function_name('get',message,signal))
+
+        aligned = self.aligned_bytes(signal)
+        if aligned:
+            first,order = aligned
+            bits = swap_functions[signal.length]
+            code += "  uint%s_t bytes;\n" % bits
+            code += "  memcpy(&bytes, &frame->data[%d], %d);\n" % (first,signal.length // 8)
+            code += "  uint64_t raw = %s%stoh(bytes);\n" % (order,bits)
+        else:
+            pieces = []
+            for byte,bit,lsb,count in self.byte_parts(signal):
+                mask = (1 << count) - 1
+                piece = "(uint64_t)frame->data[%d]" % byte
+                if bit:
+                    piece = "(%s >> %d)" % (piece,bit)
+                if count != 8:
+                    piece = "(%s & 0x%X)" % (piece,mask)
+                if lsb:
+                    piece = "(%s << %d)" % (piece,lsb)
+                pieces.append(piece)
+            code += "  uint64_t raw = %s;\n" % " | ".join(pieces)
+
+        if signal.signed and signal.length < 64:
+            sign = 1 << (signal.length - 1)
+            code += "  int64_t value = (int64_t)(raw ^ 0x%XULL) - 0x%XLL;\n" % (sign,sign)    # sign extension
+        elif signal.signed:
+            code += "  int64_t value = (int64_t)raw;\n"
+        else:
+            code += "  uint64_t value = raw;\n"
+
+        if self.scaled(signal):
+            code += "  return value * (%r) + (%r);\n" % (float(signal.factor),float(signal.offset))
+        else:
+            code += "  return value;\n"
+        code += "}\n\n"
+        return code
+
+    def generate_dispatch(self):        # receive buffers of the used messages and on signal handlers with changed bits
+        code = "".join("void %s(void);\n" % handler for handler in self.events) + "\n"
+        code += "void dispatch_signal_events(const struct can_frame *frame)\n{\n"
+        if self.events:
+            code += "  uint64_t bits, changed;\n\n"
+        code += "  switch (frame->can_id) {\n"
+        by_message = {}
+        for handler,(message,signal) in self.events.items():
+            by_message.setdefault(message.name,[]).append((handler,self.change_mask(signal)))
+        for name,message in self.messages.items():
+            code += "  case 0x%X%s:\n" % (message.id," | CAN_EFF_FLAG" if message.extended else "")
+            code += "    %s = *frame;                 // getSignal() reads the last received values\n" % self.frame_name(message)
+            handlers = by_message.get(name)
+            if handlers:
+                code += "    memcpy(&bits, frame->data, 8);\n"
+                code += "    bits = le64toh(bits);\n"
+                code += "    changed = %s_received ? bits ^ %s_bits : ~0ULL;     // the first frame is a change\n" % (name,name)
+                code += "    %s_bits = bits;\n    %s_received = 1;\n" % (name,name)
+                for handler,mask in handlers:
+                    code += "    if (changed & 0x%016XULL)\n      %s();\n" % (mask,handler)
+            code += "    break;\n"
+        code += "  }\n}\n\n"
+        return code
+
+    def generate(self):                 # frame buffers and accessors of all signals looked up so far
+        if not self.signals:
+            return ""
+        code = "#include <stdint.h>\n#include <string.h>\n#include <endian.h>\n#include <linux/can.h>\n\n"
+        for message in self.messages.values():
+            can_id = "0x%X" % message.id
+            if message.extended:
+                can_id += " | CAN_EFF_FLAG"
+            code += "struct can_frame %s = { .can_id = %s, .can_dlc = %d };\n" % (self.frame_name(message),can_id,message.dlc)
+        for name in dict((message.name,None) for message,signal in self.events.values()):
+            code += "static uint64_t %s_bits;                // data of the last received frame\n" % name
+            code += "static int %s_received;\n" % name
+        code += "\n"
+        for message,signal in self.signals.values():
+            code += self.generate_set(message,signal)
+            code += self.generate_get(message,signal)
+        code += self.generate_dispatch()
+        return code
+
+    def __init__(self,database):
+        self.database = database        # dbcIndex.DatabaseIndex
+        self.messages = {}              # name -> Message, in order of first use
+        self.signals = {}               # (message, signal) -> (Message, Signal)
+        self.events = {}                # on signal handler name -> (Message, Signal)
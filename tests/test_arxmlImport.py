@@ -0,0 +1,134 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import os
+import tempfile
+import unittest
+
+import dbcIndex
+
+try:
+    import lxml
+except ImportError:                             # optional, needed for ARXML only
+    lxml = None
+
+ARXML = """<?xml version="1.0" encoding="UTF-8"?>
+<AUTOSAR xmlns="http://autosar.org/schema/r4.0">
+<AR-PACKAGES>
+<AR-PACKAGE><SHORT-NAME>Types</SHORT-NAME><ELEMENTS>
+  <COMPU-METHOD><SHORT-NAME>CM_Speed</SHORT-NAME><UNIT-REF DEST="UNIT">/Units/km_h</UNIT-REF>
+    <COMPU-PHYS-TO-INTERNAL><COMPU-SCALES><COMPU-SCALE>
+      <LOWER-LIMIT>0</LOWER-LIMIT><UPPER-LIMIT>2000</UPPER-LIMIT>
+      <COMPU-RATIONAL-COEFFS><COMPU-NUMERATOR><V>-100</V><V>1</V></COMPU-NUMERATOR>
+        <COMPU-DENOMINATOR><V>10</V></COMPU-DENOMINATOR></COMPU-RATIONAL-COEFFS>
+    </COMPU-SCALE></COMPU-SCALES></COMPU-PHYS-TO-INTERNAL>
+  </COMPU-METHOD>
+  <SW-BASE-TYPE><SHORT-NAME>sint8</SHORT-NAME><BASE-TYPE-ENCODING>2C</BASE-TYPE-ENCODING></SW-BASE-TYPE>
+</ELEMENTS></AR-PACKAGE>
+<AR-PACKAGE><SHORT-NAME>Signals</SHORT-NAME><ELEMENTS>
+  <SYSTEM-SIGNAL><SHORT-NAME>SysSpeed</SHORT-NAME>
+    <PHYSICAL-PROPS><SW-DATA-DEF-PROPS-VARIANTS><SW-DATA-DEF-PROPS-CONDITIONAL>
+      <COMPU-METHOD-REF DEST="COMPU-METHOD">/Types/CM_Speed</COMPU-METHOD-REF>
+    </SW-DATA-DEF-PROPS-CONDITIONAL></SW-DATA-DEF-PROPS-VARIANTS></PHYSICAL-PROPS>
+  </SYSTEM-SIGNAL>
+  <I-SIGNAL><SHORT-NAME>Speed</SHORT-NAME><LENGTH>12</LENGTH>
+    <SYSTEM-SIGNAL-REF DEST="SYSTEM-SIGNAL">/Signals/SysSpeed</SYSTEM-SIGNAL-REF></I-SIGNAL>
+  <I-SIGNAL><SHORT-NAME>Slope</SHORT-NAME><LENGTH>8</LENGTH>
+    <NETWORK-REPRESENTATION-PROPS><SW-DATA-DEF-PROPS-VARIANTS><SW-DATA-DEF-PROPS-CONDITIONAL>
+      <BASE-TYPE-REF DEST="SW-BASE-TYPE">/Types/sint8</BASE-TYPE-REF>
+    </SW-DATA-DEF-PROPS-CONDITIONAL></SW-DATA-DEF-PROPS-VARIANTS></NETWORK-REPRESENTATION-PROPS></I-SIGNAL>
+</ELEMENTS></AR-PACKAGE>
+<AR-PACKAGE><SHORT-NAME>Pdus</SHORT-NAME><ELEMENTS>
+  <I-SIGNAL-I-PDU><SHORT-NAME>MotionPdu</SHORT-NAME><LENGTH>4</LENGTH>
+    <I-PDU-TIMING-SPECIFICATIONS><I-PDU-TIMING><TRANSMISSION-MODE-DECLARATION><TRANSMISSION-MODE-TRUE-TIMING>
+      <CYCLIC-TIMING><TIME-PERIOD><VALUE>0.02</VALUE></TIME-PERIOD></CYCLIC-TIMING>
+    </TRANSMISSION-MODE-TRUE-TIMING></TRANSMISSION-MODE-DECLARATION></I-PDU-TIMING></I-PDU-TIMING-SPECIFICATIONS>
+    <I-SIGNAL-TO-PDU-MAPPINGS>
+      <I-SIGNAL-TO-I-PDU-MAPPING><SHORT-NAME>m1</SHORT-NAME><I-SIGNAL-REF DEST="I-SIGNAL">/Signals/Speed</I-SIGNAL-REF>
+        <PACKING-BYTE-ORDER>MOST-SIGNIFICANT-BYTE-LAST</PACKING-BYTE-ORDER><START-POSITION>0</START-POSITION></I-SIGNAL-TO-I-PDU-MAPPING>
+      <I-SIGNAL-TO-I-PDU-MAPPING><SHORT-NAME>m2</SHORT-NAME><I-SIGNAL-REF DEST="I-SIGNAL">/Signals/Slope</I-SIGNAL-REF>
+        <PACKING-BYTE-ORDER>MOST-SIGNIFICANT-BYTE-FIRST</PACKING-BYTE-ORDER><START-POSITION>23</START-POSITION></I-SIGNAL-TO-I-PDU-MAPPING>
+      <I-SIGNAL-TO-I-PDU-MAPPING><SHORT-NAME>group</SHORT-NAME>
+        <I-SIGNAL-GROUP-REF DEST="I-SIGNAL-GROUP">/Signals/Group</I-SIGNAL-GROUP-REF></I-SIGNAL-TO-I-PDU-MAPPING>
+    </I-SIGNAL-TO-PDU-MAPPINGS>
+  </I-SIGNAL-I-PDU>
+</ELEMENTS></AR-PACKAGE>
+<AR-PACKAGE><SHORT-NAME>Frames</SHORT-NAME><ELEMENTS>
+  <CAN-FRAME><SHORT-NAME>Motion</SHORT-NAME><FRAME-LENGTH>8</FRAME-LENGTH><PDU-TO-FRAME-MAPPINGS>
+    <PDU-TO-FRAME-MAPPING><SHORT-NAME>p1</SHORT-NAME><PDU-REF DEST="I-SIGNAL-I-PDU">/Pdus/MotionPdu</PDU-REF>
+      <START-POSITION>16</START-POSITION></PDU-TO-FRAME-MAPPING>
+    <PDU-TO-FRAME-MAPPING><SHORT-NAME>p2</SHORT-NAME><PDU-REF DEST="NM-PDU">/Pdus/Nm</PDU-REF>
+      <START-POSITION>0</START-POSITION></PDU-TO-FRAME-MAPPING>
+  </PDU-TO-FRAME-MAPPINGS></CAN-FRAME>
+  <CAN-FRAME><SHORT-NAME>Unused</SHORT-NAME><FRAME-LENGTH>2</FRAME-LENGTH></CAN-FRAME>
+</ELEMENTS></AR-PACKAGE>
+<AR-PACKAGE><SHORT-NAME>Cluster</SHORT-NAME><ELEMENTS>
+  <CAN-CLUSTER><SHORT-NAME>Body</SHORT-NAME><CAN-CLUSTER-VARIANTS><CAN-CLUSTER-CONDITIONAL><PHYSICAL-CHANNELS>
+    <CAN-PHYSICAL-CHANNEL><SHORT-NAME>BodyA</SHORT-NAME><FRAME-TRIGGERINGS>
+      <CAN-FRAME-TRIGGERING><SHORT-NAME>t1</SHORT-NAME><FRAME-REF DEST="CAN-FRAME">/Frames/Motion</FRAME-REF>
+        <CAN-ADDRESSING-MODE>EXTENDED</CAN-ADDRESSING-MODE><IDENTIFIER>0x18FEF100</IDENTIFIER></CAN-FRAME-TRIGGERING>
+    </FRAME-TRIGGERINGS></CAN-PHYSICAL-CHANNEL>
+    <CAN-PHYSICAL-CHANNEL><SHORT-NAME>BodyB</SHORT-NAME><FRAME-TRIGGERINGS>
+      <CAN-FRAME-TRIGGERING><SHORT-NAME>t2</SHORT-NAME><FRAME-REF DEST="CAN-FRAME">/Frames/Motion</FRAME-REF>
+        <CAN-ADDRESSING-MODE>STANDARD</CAN-ADDRESSING-MODE><IDENTIFIER>291</IDENTIFIER></CAN-FRAME-TRIGGERING>
+    </FRAME-TRIGGERINGS></CAN-PHYSICAL-CHANNEL>
+  </PHYSICAL-CHANNELS></CAN-CLUSTER-CONDITIONAL></CAN-CLUSTER-VARIANTS></CAN-CLUSTER>
+</ELEMENTS></AR-PACKAGE>
+</AR-PACKAGES>
+</AUTOSAR>
+"""
+
+@unittest.skipUnless(lxml,"needs lxml")
+class ArxmlImportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            arxmlFile = os.path.join(temp_dir,'system.arxml')
+            with open(arxmlFile,'w') as f:
+                f.write(ARXML)
+            cls.index = dbcIndex.load_database(arxmlFile)
+            cls.cached = dbcIndex.load_database(arxmlFile)
+
+    def test_frames(self):
+        self.assertEqual(list(self.index.message_names()),['Motion'])      # frames without a triggering are left out
+        motion = self.index.message('Motion')
+        self.assertEqual((motion.id,motion.extended,motion.dlc,motion.cycle_time),(0x18FEF100,True,8,20))   # first channel
+        self.assertIs(self.index.message_by_id(0x98FEF100),motion)
+
+    def test_scaled_signal(self):                   # linear method of the system signal, PDU at bit 16 of the frame
+        self.assertEqual(self.index.signal('Motion','Speed'),
+                         dbcIndex.Signal('Speed',16,12,True,False,0.1,-10.0,-10.0,190.0,'km_h',(),None))
+
+    def test_signed_signal(self):
+        self.assertEqual(self.index.signal('Motion','Slope'),
+                         dbcIndex.Signal('Slope',39,8,False,True,1,0,-128,127,'',(),None))
+
+    def test_cached_index(self):
+        self.assertEqual(self.cached.entries,self.index.entries)
+        self.assertEqual(self.index.signal_count(),2)      # the signal group has no bits of its own
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from ascReplay import AscReplay,RECORD_EXT,RECORD_TX
+
+EVENTS_HANDLER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'eventsHandler')
+
+ASC = """date Mon Oct 19 02:50:55 pm 2026
+base hex  timestamps absolute
+internal events logged
+Begin Triggerblock Mon Oct 19 02:50:55 pm 2026
+   0.000000 Start of measurement
+   0.015320 1  1F3             Rx   d 8 00 01 02 03 04 05 06 07  Length = 0 BitCount = 0
+   0.020000 2  18FEF100x       Tx   d 3 AA BB CC
+   1.500000 1  7FF             Rx   d 0
+End TriggerBlock
+"""
+
+def index_frames(ascFile):                      # frames of the index built or read by open()
+    replay = AscReplay(ascFile)
+    with contextlib.redirect_stdout(io.StringIO()):
+        frames = list(replay.frames())
+    replay.close()
+    return frames
+
+class AscIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.ascFile = os.path.join(temp_dir.name,'trace.asc')
+        self.write(ASC)
+
+    def write(self,text):
+        with open(self.ascFile,'w') as f:
+            f.write(text)
+
+    def test_frames(self):
+        self.assertEqual(index_frames(self.ascFile),
+                         [(0.01532,0x1F3,8,0,1,bytes(range(8))),
+                          (0.02,0x18FEF100,3,RECORD_TX | RECORD_EXT,2,b'\xaa\xbb\xcc' + bytes(5)),
+                          (1.5,0x7FF,0,0,1,bytes(8))])
+
+    def test_decimal_ids_and_relative_timestamps(self):
+        self.write(ASC.replace("base hex  timestamps absolute","base dec  timestamps relative")
+                   .replace(" 1F3 "," 499 ").replace(" 18FEF100x "," 419361024x ").replace(" 7FF "," 2047 "))
+        frames = index_frames(self.ascFile)
+        self.assertEqual([frame[1] for frame in frames],[0x1F3,0x18FEF100,0x7FF])
+        self.assertAlmostEqual(frames[2][0],0.01532 + 0.02 + 1.5)
+
+    def test_index_is_reused(self):
+        index_frames(self.ascFile)
+        with mock.patch.object(AscReplay,'build_index') as build_index:
+            self.assertEqual(len(index_frames(self.ascFile)),3)
+        build_index.assert_not_called()
+
+    def test_changed_trace_is_indexed_again(self):
+        index_frames(self.ascFile)
+        self.write(ASC.replace("End TriggerBlock","   2.000000 1  100             Rx   d 1 11\nEnd TriggerBlock"))
+        self.assertEqual(index_frames(self.ascFile)[-1],(2.0,0x100,1,0,1,b'\x11' + bytes(7)))
+
+    def test_replay_feeds_received_frames(self):
+        replay = AscReplay(self.ascFile)
+        received = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            replay.replay(received.append)
+        replay.close()
+        self.assertEqual([frame[1] for frame in received],[0x1F3,0x7FF])
+
+LAYOUT = """
+#include <stdio.h>
+#include "ascReplay.h"
+
+int main(void)
+{
+  printf("%zu %zu %zu %zu %zu %zu %zu\\n", sizeof(struct can_record), offsetof(struct can_record, id),
+         offsetof(struct can_record, dlc), offsetof(struct can_record, flags), offsetof(struct can_record, channel),
+         offsetof(struct can_record, data), sizeof(struct replay_header));
+  return 0;
+}
+"""
+
+@unittest.skipUnless(shutil.which('cc') and os.path.exists('/usr/include/linux/can.h'),"needs a C compiler and linux/can.h")
+class RecordLayoutTest(unittest.TestCase):    # the index is mapped by eventsHandler/ascReplay.c as it is
+
+    def test_layout_as_in_c(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir,'layout.c')
+            with open(source,'w') as f:
+                f.write(LAYOUT)
+            program = os.path.join(temp_dir,'layout')
+            subprocess.run(['cc','-I',EVENTS_HANDLER,'-o',program,source],check=True)
+            sizes = subprocess.run([program],check=True,capture_output=True,text=True).stdout.split()
+        self.assertEqual([int(size) for size in sizes],[AscReplay.frame_record.size,8,12,13,14,16,AscReplay.index_header.size])
+        self.assertEqual(AscReplay.frame_record.pack(1.0,2,3,4,5,b'\x06'*8)[8:16],b'\x02\x00\x00\x00\x03\x04\x05\x00')
+
+if __name__ == '__main__':
+    unittest.main()
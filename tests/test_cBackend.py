@@ -0,0 +1,106 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import conversionJobs
+from tests.test_dbcIndex import DBC
+
+TIMERS = """/*@@var:*/
+variables
+{
+  msTimer cycle;
+}
+/*@@end */
+/*@@startStart: */
+on start
+{
+  setTimer(cycle,100);
+}
+/*@@end */
+/*@@timer:cycle:*/
+on timer cycle
+{
+  cancelTimer(cycle);
+}
+/*@@end */
+"""
+
+def convert(source,dbc=None):                   # C file generated from CAPL code, printed text
+    with tempfile.TemporaryDirectory() as temp_dir:
+        caplFile = os.path.join(temp_dir,'node.can')
+        with open(caplFile,'w') as f:
+            f.write(source)
+        databaseFile = None
+        if dbc is not None:
+            databaseFile = os.path.join(temp_dir,'node.dbc')
+            with open(databaseFile,'w') as f:
+                f.write(dbc)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            conversionJobs.capl_to_c(caplFile,os.path.join(temp_dir,'node.c'),databaseFile)
+        with open(os.path.join(temp_dir,'node.c')) as f:
+            return f.read(),output.getvalue()
+
+def convert_c(source):                          # text of the C file generated from CAPL code
+    return convert(source)[0]
+
+class IncludesTest(unittest.TestCase):
+
+    def test_timer_header(self):
+        code = convert_c(TIMERS)
+        self.assertEqual(code.count('#include "caplTimer.h"'),1)
+        self.assertTrue(code.startswith('#include'))
+        self.assertIn('capl_timer_bind(&cycle.base,timer_cycle_event);',code)
+
+    def test_no_timer_header(self):
+        self.assertNotIn('caplTimer.h',convert_c("/*@@var:*/\nvariables\n{\n  int x;\n}\n/*@@end */\n"))
+
+def on_signal(name):
+    return "/*@@signal:%s:*/\non signal %s\n{\n  write(\"changed\");\n}\n/*@@end */\n" % (name,name)
+
+class SignalEventTest(unittest.TestCase):
+
+    def test_handler_dispatched(self):
+        code,output = convert(on_signal('Gear'),DBC)
+        self.assertIn("void signal_Status__Gear_event() {",code)
+        self.assertIn("signal_Status__Gear_event();",code)     # in dispatch_signal_events()
+        self.assertNotIn("WARNING!",output)
+
+    def test_no_database(self):
+        code,output = convert(on_signal('Gear'))
+        self.assertIn("void signal_Gear_event() {",code)
+        self.assertIn("WARNING! on signal Gear: no database, the handler is never called.",output)
+
+    def test_unknown_signal(self):
+        code,output = convert(on_signal('Status::Missing'),DBC)
+        self.assertIn("void signal_Status__Missing_event() {",code)
+        self.assertIn("WARNING! Signal Status::Missing not found in the database.",output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from caplEval import CaplSimulation,SimulationError,c_div,c_mod
+from parserPy import Node,Parser
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'working_example.txt')
+
+def parse(caplFile):
+    with contextlib.redirect_stdout(io.StringIO()):     # the lexer prints every token
+        return Parser().get_ast_tree(caplFile)
+
+def simulate(source):                           # CaplSimulation of CAPL code given as text
+    with tempfile.TemporaryDirectory() as temp_dir:
+        caplFile = os.path.join(temp_dir,'node.can')
+        with open(caplFile,'w') as f:
+            f.write(source)
+        tree = parse(caplFile)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CaplSimulation(tree)
+
+class WorkingExampleTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        tree = parse(EXAMPLE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.sim = CaplSimulation(tree)
+
+    def test_speed_test(self):
+        self.assertEqual(self.sim.call('speedTest',100.0,50.0),0.0)
+        self.assertEqual(self.sim.bus.log[-3:],['70.0','58.0','0.0'])
+
+    def test_compile_errors(self):
+        self.assertEqual(self.sim.errors,['myDeclar(): undeclared: msg_name at line 43',
+                                          'myFunc(): undeclared: result at line 85',
+                                          'on start: undeclared: val at line 137',
+                                          'on envVar initialize: undeclared: buffer at line 154',
+                                          'on start: undeclared: readHandle at line 172'])
+
+    def test_functions_with_undeclared_names(self):
+        with self.assertRaisesRegex(SimulationError,r'^myDeclar\(\): undeclared: msg_name at line 43$'):
+            self.sim.call('myDeclar')
+        with self.assertRaisesRegex(SimulationError,r'^myFunc\(\): undeclared: result at line 85$'):
+            self.sim.call('myFunc')
+        self.assertIsNone(self.sim.call('function'))
+
+    def test_handlers_with_undeclared_names(self):
+        with self.assertRaisesRegex(SimulationError,'undeclared: val at line 137'):
+            self.sim.start()
+        with self.assertRaisesRegex(SimulationError,'undeclared: buffer at line 154'):
+            self.sim.put_value('initialize',1)
+
+class SimulationTest(unittest.TestCase):
+
+    def test_undeclared_timer(self):
+        sim = simulate("/*@@startStart: */\non start\n{\n  setTimer(one_tenth,10);\n}\n/*@@end */\n")
+        self.assertEqual(sim.errors,['on start: undeclared: one_tenth at line 4'])
+        with self.assertRaises(SimulationError):
+            sim.start()
+
+    def test_case_label_not_constant(self):     # the grammar allows constants only, e.g. a tree built by hand
+        sim = simulate("/*@@var:*/\nvariables\n{\n  int x;\n  int y;\n}\n/*@@end */\n")
+        switch = Node("SWITCH",(Node("Case",(Node("BREAK"),),Node("ID",None,'y',7)),),Node("ID",None,'x',5))
+        with self.assertRaisesRegex(SimulationError,'^unsupported: case label y at line 7$'):
+            sim.compile_switch(switch)
+
+    def test_timer_and_output(self):
+        sim = simulate("/*@@var:*/\nvariables\n{\n  msTimer cycle;\n  message 0x100 msg;\n  int count = 0;\n}\n/*@@end */\n"
+                       "/*@@startStart: */\non start\n{\n  setTimer(cycle,10);\n}\n/*@@end */\n"
+                       "/*@@timer:cycle:*/\non timer cycle\n{\n  count = count + 1;\n  output(msg);\n"
+                       "  setTimer(cycle,10);\n}\n/*@@end */\n")
+        self.assertEqual(sim.errors,[])
+        sim.start()
+        sim.advance(35)
+        self.assertEqual(sim.globals['count'],3)
+        self.assertEqual([(time,msg_id) for time,msg_id,dlc,data in sim.bus.sent],[(10,0x100),(20,0x100),(30,0x100)])
+
+    def test_c_division(self):
+        self.assertEqual(c_div(-7,2),-3)
+        self.assertEqual(c_mod(-7,2),-1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from tests.test_ascReplay import EVENTS_HANDLER
+
+READER = r"""
+#include <stdio.h>
+#include "caplFile.h"
+
+static void print_text(long result, const char *text)       // newlines made visible
+{
+  printf("%ld:", result);
+  for (; *text; text++)
+    if (*text == '\n')
+      printf("\\n");
+    else if (*text == '\r')
+      printf("\\r");
+    else
+      putchar(*text);
+  printf("\n");
+}
+
+static void read_lines(const char *path, long (*get)(char *, long, uint32_t), long size)
+{
+  char buffer[64];
+  uint32_t handle = openFileRead(path, 0);
+  long result;
+
+  do {
+    buffer[0] = '\0';
+    result = get(buffer, size, handle);
+    print_text(result, buffer);
+  } while (result);
+  printf("close %ld\n", fileClose(handle));
+}
+
+static void read_blocks(const char *path)
+{
+  unsigned char buffer[16];
+  uint32_t handle = openFileRead(path, 1);
+  long i, n;
+
+  n = fileGetBinaryBlock(buffer, 4, handle);
+  printf("%ld:", n);
+  for (i = 0; i < n; i++)
+    printf("%02x", buffer[i]);
+  printf(" %ld", fileGetBinaryBlock(buffer, sizeof(buffer), handle));
+  printf(" %ld", fileGetBinaryBlock(buffer, sizeof(buffer), handle));
+  printf(" rewind %ld", fileRewind(handle));
+  n = fileGetBinaryBlock(buffer, 3, handle);
+  printf(" %ld:%02x%02x%02x", n, buffer[0], buffer[1], buffer[2]);
+  printf(" close %ld", fileClose(handle));
+  printf(" %ld\n", fileClose(handle));     // closed already
+}
+
+int main(int argc, char **argv)
+{
+  char buffer[8];
+
+  read_lines(argv[1], fileGetString, 5);
+  read_lines(argv[1], fileGetStringSZ, 5);
+  read_lines(argv[1], fileGetStringSZ, sizeof(buffer));
+  read_lines(argv[2], fileGetString, sizeof(buffer));
+  printf("empty block %ld\n", fileGetBinaryBlock(buffer, sizeof(buffer), openFileRead(argv[2], 1)));
+  printf("missing %u", openFileRead(argv[3], 0));
+  printf(" %ld %ld %ld\n", fileGetString(buffer, sizeof(buffer), 0), fileRewind(0), fileClose(0));
+  read_blocks(argv[4]);
+  return 0;
+}
+"""
+
+@unittest.skipUnless(shutil.which('cc'),"needs a C compiler")
+class CaplFileTest(unittest.TestCase):         # eventsHandler/caplFile.c
+
+    def test_reader(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            files = [os.path.join(temp_dir,name) for name in ('lines.txt','empty.txt','missing.txt','block.bin')]
+            with open(files[0],'wb') as f:
+                f.write(b'abcdefghij\nxy\r\nlast')             # the last line without '\n'
+            open(files[1],'wb').close()
+            with open(files[3],'wb') as f:
+                f.write(bytes(range(10)))
+            source = os.path.join(temp_dir,'reader.c')
+            with open(source,'w') as f:
+                f.write(READER)
+            program = os.path.join(temp_dir,'reader')
+            subprocess.run(['cc','-std=gnu11','-Wall','-Werror','-I',EVENTS_HANDLER,'-o',program,source,
+                            os.path.join(EVENTS_HANDLER,'caplFile.c')],check=True)
+            result = subprocess.run([program] + files,check=True,capture_output=True,text=True)
+        self.assertEqual(result.stdout.splitlines(),
+                         ["1:abcd","1:efgh","1:ij\\n","1:xy\\r\\n","1:last","0:","close 1",      # longer lines in pieces
+                          "1:abcd","1:efgh","1:ij","1:xy","1:last","0:","close 1",             # without '\n' and '\r'
+                          "1:abcdefg","1:hij","1:xy","1:last","0:","close 1",
+                          "0:","close 1",
+                          "empty block 0",
+                          "missing 0 0 0 0",
+                          "4:00010203 6 0 rewind 1 3:000102 close 1 0"])
+        self.assertIn("missing.txt: No such file or directory",result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
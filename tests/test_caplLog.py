@@ -0,0 +1,118 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from tests.test_ascReplay import EVENTS_HANDLER
+
+def run_c(main):                                # stdout and stderr of main() built with eventsHandler/caplLog.c
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir,'log.c')
+        with open(source,'w') as f:
+            f.write('#include <stdio.h>\n#include "caplLog.h"\n\n' + main)
+        program = os.path.join(temp_dir,'log')
+        subprocess.run(['cc','-std=gnu11','-Wall','-Werror','-I',EVENTS_HANDLER,'-o',program,source,
+                        os.path.join(EVENTS_HANDLER,'caplLog.c'),'-lpthread'],check=True)
+        result = subprocess.run([program],check=True,capture_output=True,text=True)
+        return result.stdout,result.stderr
+
+FORMATS = r"""
+int main(void)
+{
+  int64_t big = 1234567890123LL;
+  int count = 3;
+  double half = 0.5;
+
+  capl_log_write("%d %s %.2f",3,(const struct capl_log_arg[]){CAPL_LOG_ARG(count),CAPL_LOG_ARG("abc"),CAPL_LOG_ARG(half * 3)});
+  capl_log_write("%I64d %ld %hx %llu",4,(const struct capl_log_arg[]){CAPL_LOG_ARG(big),CAPL_LOG_ARG(-3),CAPL_LOG_ARG(255),
+                                                                       CAPL_LOG_ARG(2.9)});
+  capl_log_write("%d and %s and %f",1,(const struct capl_log_arg[]){CAPL_LOG_ARG(5)});
+  capl_log_write("%c 100%% %y %5.1f|%-4d|",3,(const struct capl_log_arg[]){CAPL_LOG_ARG(65),CAPL_LOG_ARG(2),CAPL_LOG_ARG(3)});
+  capl_log_write("%0000000000000000000000000000000000000005d|",1,(const struct capl_log_arg[]){CAPL_LOG_ARG(1)});
+  capl_log_write("no arguments",0,NULL);
+  capl_log_write("%s",1,(const struct capl_log_arg[]){CAPL_LOG_ARG("a string longer than the thirty-two byte copy")});
+  capl_log_close();
+  return 0;
+}
+"""
+
+OVERFLOW = r"""
+int main(void)
+{
+  int i;
+
+  for (i = 0; i < CAPL_LOG_CAPACITY + 5; i++)      // no output thread, nothing is printed meanwhile
+    capl_log_write("%d",1,(const struct capl_log_arg[]){CAPL_LOG_ARG(i)});
+  capl_log_close();
+  return 0;
+}
+"""
+
+THREAD = r"""
+int main(void)
+{
+  int i;
+
+  capl_log_open();
+  for (i = 0; i < 20000; i++)
+    capl_log_write("%d",1,(const struct capl_log_arg[]){CAPL_LOG_ARG(i)});
+  capl_log_close();
+  return 0;
+}
+"""
+
+@unittest.skipUnless(shutil.which('cc'),"needs a C compiler")
+class CaplLogTest(unittest.TestCase):
+
+    def test_formats(self):
+        stdout,stderr = run_c(FORMATS)
+        self.assertEqual(stdout.splitlines(),["3 abc 1.50",
+                                              "1234567890123 -3 ff 2",           # length modifiers of the stored value
+                                              "5 and  and 0.000000",             # missing arguments
+                                              "A 100% %y   2.0|3   |",           # unknown conversion, no argument taken
+                                              "%0000000000000000000000000000000000000005d|",     # spec too long, as written
+                                              "no arguments",
+                                              "a string longer than the thirty"])
+        self.assertEqual(stderr,"")
+
+    def test_full_ring_drops_and_reports(self):
+        stdout,stderr = run_c(OVERFLOW)
+        self.assertEqual(stdout.splitlines(),[str(i) for i in range(1024)])
+        self.assertEqual(stderr,"Warning: 5 write() records lost, the log ring was full\n")
+
+    def test_output_thread(self):
+        stdout,stderr = run_c(THREAD)
+        printed = [int(line) for line in stdout.splitlines()]
+        self.assertEqual(printed,sorted(set(printed)))             # in order, none twice
+        dropped = re.match(r"(?:Warning: (\d+) write\(\) records lost)?",stderr).group(1)
+        self.assertEqual(len(printed) + int(dropped or 0),20000)
+
+if __name__ == '__main__':
+    unittest.main()
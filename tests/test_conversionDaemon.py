@@ -0,0 +1,157 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+import conversionClient
+from conversionClient import ConversionClient
+import conversionDaemon
+import conversionJobs
+from tests.test_cBackend import TIMERS
+
+class MakeJobsTest(unittest.TestCase):
+
+    def test_capl_jobs(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = os.path.join(temp_dir,'build','c')
+            jobs = conversionDaemon.make_jobs({'command': 'capl2c', 'files': ['/src/a.can','/src/b.can'],
+                                               'database': '/src/db.dbc', 'output_dir': output_dir})
+            self.assertTrue(os.path.isdir(output_dir))      # made once, not by every job
+        self.assertEqual(jobs,[('/src/a.can',conversionJobs.capl_to_c,('/src/a.can',os.path.join(output_dir,'a.c'),'/src/db.dbc')),
+                               ('/src/b.can',conversionJobs.capl_to_c,('/src/b.can',os.path.join(output_dir,'b.c'),'/src/db.dbc'))])
+
+    def test_outputs_next_to_the_inputs(self):
+        jobs = conversionDaemon.make_jobs({'command': 'capl2wwb', 'files': ['/src/a.can']})
+        self.assertEqual(jobs,[('/src/a.can',conversionJobs.capl_to_wwb,('/src/a.can','/src/a.mac',None))])
+
+    def test_xvp_job(self):             # one process converts all panels, the daemon serves other requests meanwhile
+        jobs = conversionDaemon.make_jobs({'command': 'xvp2aof', 'files': ['/p/1.xvp','/p/2.xvp'], 'output': '/p/w.aof'})
+        self.assertEqual(jobs,[('/p/w.aof',conversionJobs.xvp_to_aof,(['/p/1.xvp','/p/2.xvp'],'/p/w.aof',1))])
+
+    def test_unknown_command(self):
+        with self.assertRaisesRegex(conversionJobs.ConversionError,'unknown command convert'):
+            conversionDaemon.make_jobs({'command': 'convert'})
+
+@unittest.skipUnless(hasattr(conversionDaemon.socketserver,'UnixStreamServer'),"needs Unix sockets")
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        stdout = sys.stdout
+        self.addCleanup(setattr,sys,'stdout',stdout)    # run_job() installs a ThreadOutput
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        path = os.path.join(self.temp_dir,'daemon.sock')
+        self.server = conversionDaemon.ConversionServer(path,conversionDaemon.RequestHandler)
+        self.addCleanup(self.server.server_close)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+        self.addCleanup(self.stop)
+        self.client = ConversionClient(path)
+        self.addCleanup(self.client.close)
+
+    def serve(self):
+        while not self.server.stopping:
+            self.server.handle_request()
+
+    def stop(self):
+        self.server.stopping = True
+        self.thread.join()
+
+    def send(self,line):                        # answer to a raw request line
+        self.client.file.write(line + b'\n')
+        self.client.file.flush()
+        return json.loads(self.client.file.readline())
+
+    def test_ping(self):
+        self.assertEqual(self.client.request({'command': 'ping'}),{'ok': True, 'pid': os.getpid()})
+
+    def test_bad_requests(self):                # answered, the connection stays usable
+        answer = self.send(b'{"command": ')
+        self.assertFalse(answer['ok'])
+        self.assertRegex(answer['error'],'^bad request: Expecting value')
+        self.assertEqual(self.send(b'[1, 2]'),{'ok': False, 'error': "bad request: not a JSON object"})
+        self.assertEqual(self.send(b'"capl2c"'),{'ok': False, 'error': "bad request: not a JSON object"})
+        self.assertEqual(self.client.request({'command': 'xvp2aof', 'files': []}),{'ok': False, 'error': "bad request: 'output'"})
+        self.assertEqual(self.client.request({'command': 'convert'}),{'ok': False, 'error': "bad request: unknown command convert"})
+        self.assertEqual(self.client.request({'command': 'capl2c', 'files': 5}),
+                         {'ok': False, 'error': "bad request: files must be a list of paths"})
+        self.assertEqual(self.client.request({'command': 'capl2c', 'files': ['a.can',None]}),
+                         {'ok': False, 'error': "bad request: files must be a list of paths"})
+        self.assertTrue(self.client.request({'command': 'ping'})['ok'])
+
+    def test_output_dir_not_made(self):
+        blocker = os.path.join(self.temp_dir,'file')
+        open(blocker,'w').close()
+        answer = self.client.request({'command': 'capl2c', 'files': ['a.can'], 'output_dir': os.path.join(blocker,'x')})
+        self.assertFalse(answer['ok'])
+        self.assertIn("Not a directory",answer['error'])
+        self.assertTrue(self.client.request({'command': 'ping'})['ok'])
+
+    def test_conversion(self):
+        caplFile = os.path.join(self.temp_dir,'node.can')
+        with open(caplFile,'w') as f:
+            f.write(TIMERS)
+        output_dir = os.path.join(self.temp_dir,'out')
+        answer = self.client.request({'command': 'capl2c', 'files': [caplFile,caplFile + '.missing'], 'output_dir': output_dir})
+        self.assertFalse(answer['ok'])
+        self.assertEqual([(result['name'],result['ok'],result['output']) for result in answer['results']],
+                         [(caplFile,True,''),(caplFile + '.missing',False,'')])
+        self.assertTrue(os.path.isfile(os.path.join(output_dir,'node.c')))
+
+    def test_stop(self):
+        self.assertEqual(self.client.request({'command': 'stop'}),{'ok': True})
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+
+class ClientTest(unittest.TestCase):
+
+    def test_connection_closed_without_answer(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir,'daemon.sock')
+            listener = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+            listener.bind(path)
+            listener.listen(1)
+            def close_connection():
+                connection,address = listener.accept()
+                connection.close()
+            thread = threading.Thread(target=close_connection)
+            thread.start()
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                self.assertEqual(conversionClient.main(['--socket',path,'ping']),2)
+            thread.join()
+            listener.close()
+        self.assertRegex(output.getvalue(),r"^ERROR! No answer of the conversion daemon \(")     # closed or reset
+
+if __name__ == '__main__':
+    unittest.main()
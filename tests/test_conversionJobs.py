@@ -0,0 +1,125 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+import conversionJobs
+from tests.test_cBackend import TIMERS
+
+class ThreadOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        stdout = sys.stdout
+        self.addCleanup(setattr,sys,'stdout',stdout)    # captured_output() leaves a ThreadOutput installed
+
+    def test_output_of_each_thread(self):
+        barrier = threading.Barrier(4)
+        def job(n):
+            with conversionJobs.captured_output() as output:
+                for line in range(3):
+                    print("job %d line %d" % (n,line))
+                    barrier.wait()              # all threads print between each other's lines
+            return output.getvalue()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            outputs = list(executor.map(job,range(4)))
+        self.assertEqual(outputs,["".join("job %d line %d\n" % (n,line) for line in range(3)) for n in range(4)])
+
+    def test_nested_capture(self):
+        with conversionJobs.captured_output() as outer:
+            print("outer")
+            with conversionJobs.captured_output() as inner:
+                print("inner")
+            print("outer again")
+        self.assertEqual(inner.getvalue(),"inner\n")
+        self.assertEqual(outer.getvalue(),"outer\nouter again\n")
+
+    def test_threads_without_buffer_write_to_the_stream(self):
+        stream = io.StringIO()
+        thread_output = conversionJobs.ThreadOutput(stream)
+        thread_output.local.buffer = io.StringIO()
+        worker = threading.Thread(target=thread_output.write,args=("other thread\n",))
+        worker.start()
+        worker.join()
+        thread_output.write("this thread\n")
+        self.assertEqual(stream.getvalue(),"other thread\n")
+        self.assertEqual(thread_output.local.buffer.getvalue(),"this thread\n")
+        self.assertEqual(thread_output.getvalue(),"other thread\n")     # other attributes of the real stream
+
+class RunJobTest(unittest.TestCase):
+
+    def setUp(self):
+        stdout = sys.stdout
+        self.addCleanup(setattr,sys,'stdout',stdout)
+
+    def test_result_and_output(self):
+        def convert(name):
+            print("converting %s" % name)
+        result = conversionJobs.run_job('a',convert,('a',))
+        self.assertEqual((result.name,result.ok,result.error,result.output),('a',True,None,"converting a\n"))
+
+    def test_errors_printed_first(self):
+        def convert():
+            print("ERROR! first")
+            print("something else")
+            raise conversionJobs.ConversionError("failed")
+        result = conversionJobs.run_job('a',convert,())
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error,"ERROR! first; failed")
+
+    def test_unexpected_exception(self):
+        result = conversionJobs.run_job('a',lambda: 1 / 0,())
+        self.assertEqual(result.error,"ZeroDivisionError: division by zero")
+
+    def test_threads_convert_like_one_thread(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jobs = []
+            for n in range(6):
+                caplFile = os.path.join(temp_dir,'node%d.can' % n)
+                with open(caplFile,'w') as f:
+                    f.write(TIMERS.replace('cycle','cycle%d' % n))
+                jobs.append((caplFile,conversionJobs.capl_to_c,(caplFile,caplFile[:-4] + '.c')))
+            conversionJobs.prepare()
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                results = list(executor.map(lambda job: conversionJobs.run_job(*job),jobs))
+            self.assertTrue(all(result.ok for result in results),[result.error for result in results])
+            threaded = []
+            for caplFile,function,args in jobs:
+                with open(args[1]) as f:
+                    threaded.append(f.read())
+            for result,(caplFile,function,args) in zip(results,jobs):
+                self.assertIn(" cycle%s" % caplFile[-5],result.output)     # the tokens of its own file only
+            for caplFile,function,args in jobs:
+                conversionJobs.run_job(caplFile,function,args)
+                with open(args[1]) as f:
+                    self.assertEqual(f.read(),threaded.pop(0))
+
+if __name__ == '__main__':
+    unittest.main()
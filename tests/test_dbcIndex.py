@@ -0,0 +1,163 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import dbcIndex
+
+DBC = """VERSION ""
+
+BU_: Ctrl Dash Gw
+
+BO_ 291 Status: 8 Ctrl
+ SG_ Speed : 0|16@1+ (0.1,0) [0|6553.5] "km/h" Dash
+ SG_ Gear m2 : 24|3@1+ (1,0) [0|7] "" Dash,Gw
+ SG_ Temp : 23|12@0- (1,-40) [-40|100] "degC" Dash
+ SG_ Counter : 39|16@0+ (1,0) [0|65535] "" Dash
+
+BO_ 2147484672 Ext: 4 Gw
+ SG_ Flag : 7|1@0+ (1,0) [0|1] "" Ctrl
+
+BA_DEF_DEF_ "GenMsgCycleTime" 50;
+BA_ "GenMsgCycleTime" BO_ 291 100;
+
+EV_ Ignition: 0 [0|1] "" 1 1 DUMMY_NODE_VECTOR0 Vector__XXX;
+EV_ Voltage: 1 [0|16.5] "V" 12.5 2 DUMMY_NODE_VECTOR0 Vector__XXX;
+"""
+
+def database(text=DBC):                         # DatabaseIndex of DBC text, without a file
+    parser = dbcIndex.DbcParser()
+    return dbcIndex.DatabaseIndex('test.dbc',parser.parse(text),parser.env_vars)
+
+class DbcParserTest(unittest.TestCase):
+
+    def test_messages(self):
+        index = database()
+        status = index.message('Status')
+        self.assertEqual((status.id,status.extended,status.dlc,status.sender,status.cycle_time),(0x123,False,8,'Ctrl',100))
+        ext = index.message('Ext')
+        self.assertEqual((ext.id,ext.extended,ext.dlc,ext.cycle_time),(0x400,True,4,50))
+        self.assertIs(index.message_by_id(0x80000400),ext)
+        self.assertIsNone(index.message_by_id(0x400))
+        self.assertIsNone(index.message('Missing'))
+        self.assertEqual(index.signal_count(),5)
+
+    def test_signals(self):
+        index = database()
+        self.assertEqual(index.signal('Status','Speed'),
+                         dbcIndex.Signal('Speed',0,16,True,False,0.1,0,0,6553.5,'km/h',('Dash',),None))
+        self.assertEqual(index.signal('Status','Gear').multiplex,'m2')
+        self.assertEqual(index.signal('Status','Gear').receivers,('Dash','Gw'))
+        temp = index.signal('Status','Temp')
+        self.assertEqual((temp.start_bit,temp.length,temp.little_endian,temp.signed,temp.offset),(23,12,False,True,-40))
+        self.assertIs(index.signal_owner('Flag'),index.message('Ext'))
+        self.assertIsNone(index.signal('Status','Flag'))
+
+    def test_env_vars(self):
+        index = database()
+        self.assertEqual(index.env_var('Ignition'),dbcIndex.EnvVar('Ignition',dbcIndex.ENV_INTEGER,0,1,'',1))
+        self.assertEqual(index.env_var('Voltage').initial,12.5)
+
+class DatabaseFileTest(unittest.TestCase):         # a DBC file in a temporary directory
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dbcFile = os.path.join(temp_dir.name,'bus.dbc')
+        self.cacheDir = os.path.join(temp_dir.name,'.dbc_cache')
+        self.write(DBC)
+
+    def write(self,text):
+        with open(self.dbcFile,'w') as f:
+            f.write(text)
+
+    def index_files(self):
+        return sorted(os.listdir(self.cacheDir)) if os.path.isdir(self.cacheDir) else []
+
+class IndexCacheTest(DatabaseFileTest):
+
+    def test_index_is_saved_and_loaded(self):
+        built = dbcIndex.load_database(self.dbcFile)
+        self.assertEqual(self.index_files(),[dbcIndex.file_hash(self.dbcFile) + '.idx'])
+        with mock.patch('dbcIndex.build_index') as build_index:
+            cached = dbcIndex.load_database(self.dbcFile)
+        build_index.assert_not_called()
+        self.assertEqual(cached.entries,built.entries)
+        self.assertEqual(cached.env_vars,built.env_vars)
+        self.assertEqual(cached.message('Status'),built.message('Status'))
+
+    def test_changed_database_is_parsed_again(self):
+        dbcIndex.load_database(self.dbcFile)
+        self.write(DBC.replace('BO_ 291 Status: 8','BO_ 292 Status: 6'))
+        status = dbcIndex.load_database(self.dbcFile).message('Status')
+        self.assertEqual((status.id,status.dlc),(0x124,6))
+        self.assertEqual(len(self.index_files()),2)
+
+    def test_unreadable_index_is_rebuilt(self):
+        path = dbcIndex.cache_path(self.dbcFile,dbcIndex.file_hash(self.dbcFile))
+        os.makedirs(self.cacheDir)
+        with open(path,'wb') as f:
+            f.write(b'\x80\x05broken')
+        self.assertEqual(dbcIndex.load_database(self.dbcFile).message('Status').id,0x123)
+        with open(path,'rb') as f:
+            self.assertNotEqual(f.read(),b'\x80\x05broken')
+
+    def test_unsupported_format(self):
+        symFile = os.path.join(os.path.dirname(self.dbcFile),'bus.sym')
+        with open(symFile,'w') as f:
+            f.write(DBC)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertIsNone(dbcIndex.load_database(symFile))
+        self.assertIn("ERROR! Unsupported database format",output.getvalue())
+        self.assertEqual(self.index_files(),[])
+
+class WarmLoadTest(DatabaseFileTest):
+
+    def setUp(self):
+        super().setUp()
+        dbcIndex.loaded.clear()
+        self.addCleanup(dbcIndex.loaded.clear)
+
+    def test_unchanged_database_is_not_hashed(self):
+        index = dbcIndex.load_database_warm(self.dbcFile)
+        with mock.patch('dbcIndex.file_hash') as file_hash:
+            self.assertIs(dbcIndex.load_database_warm(self.dbcFile),index)
+        file_hash.assert_not_called()
+
+    def test_changed_database_is_loaded_again(self):
+        index = dbcIndex.load_database_warm(self.dbcFile)
+        self.write(DBC.replace('BO_ 291 Status: 8','BO_ 292 Status: 6'))
+        os.utime(self.dbcFile,ns=(0,os.stat(self.dbcFile).st_mtime_ns + 1000000000))    # coarse file system clocks
+        reloaded = dbcIndex.load_database_warm(self.dbcFile)
+        self.assertIsNot(reloaded,index)
+        self.assertEqual(reloaded.message('Status').id,0x124)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from envVarCodegen import EnvVarCodegen
+import dbcIndex
+from tests.test_ascReplay import EVENTS_HANDLER
+from tests.test_cBackend import convert_c
+from tests.test_dbcIndex import database
+
+PUT_VALUES = """/*@@var:*/
+variables
+{
+  char text[20];
+}
+/*@@end */
+/*@@startStart: */
+on start
+{
+  putValue(Voltage,13);
+  putValue(Mode,2.5);
+  putValue(Label,"on");
+  putValue(Ignition,1);
+  getValue(Label,text);
+}
+/*@@end */
+"""
+
+class SlotTest(unittest.TestCase):
+
+    def test_types_from_the_database(self):
+        codegen = EnvVarCodegen(database())
+        self.assertEqual(codegen.put_call('Voltage','13'),"env_put_float(EV_Voltage,13)")
+        self.assertEqual(codegen.get_call('Ignition'),"env_get_int(EV_Ignition)")
+        self.assertEqual(codegen.get_call('Missing'),"env_get_int(EV_Missing)")     # integer if nothing is known
+        self.assertEqual(list(codegen.types),['Voltage','Ignition','Missing'])
+
+    def test_database_before_constants(self):
+        codegen = EnvVarCodegen(database())
+        codegen.inferred.update(Voltage=dbcIndex.ENV_INTEGER,Mode=dbcIndex.ENV_FLOAT)      # as scan() finds them
+        self.assertEqual(codegen.put_call('Voltage','13'),"env_put_float(EV_Voltage,13)")
+        self.assertEqual(codegen.put_call('Mode','2.5'),"env_put_float(EV_Mode,2.5)")
+
+    def test_types_of_written_constants(self):
+        code = convert_c(PUT_VALUES)
+        self.assertIn("env_put_int(EV_Voltage,13)",code)
+        self.assertIn("env_put_float(EV_Mode,2.5)",code)
+        self.assertIn('env_put_string(EV_Label,"on")',code)
+        self.assertIn("env_get_string(EV_Label,text,sizeof(text))",code)
+
+    def test_table(self):
+        codegen = EnvVarCodegen(database())
+        codegen.subscribe('Voltage')
+        codegen.subscribe('Voltage')
+        codegen.slot('Ignition')
+        code = codegen.generate()
+        self.assertIn("enum {\n  EV_Voltage,\n  EV_Ignition,\n  EV_COUNT\n};",code)
+        self.assertIn('[EV_Voltage] = { .name = "Voltage", .type = ENV_FLOAT, .value.f = 12.5, '
+                      '.handlers = { envVar_Voltage_event }, .handler_count = 1 },',code)
+        self.assertIn('[EV_Ignition] = { .name = "Ignition", .type = ENV_INTEGER, .value.i = 1 },',code)
+
+    def test_no_variables(self):
+        self.assertEqual(EnvVarCodegen(None).generate(),"")
+
+STORE = """
+#include <stdio.h>
+
+int writes;
+
+void envVar_Voltage_event(void)
+{
+  writes++;
+  env_put_float(EV_Voltage, env_get_float(EV_Voltage) + 1);      // does not run the handler again
+}
+
+void count_write(void)
+{
+  writes += 10;
+}
+
+int main(void)
+{
+  char text[3];
+
+  env_put_float(EV_Voltage, 13.0);
+  env_subscribe(env_find("Ignition"), count_write);
+  env_put_int(EV_Ignition, 0);
+  env_put_string(EV_Label, "standby");
+  printf("%.1f %d %d %ld %s %d %d\\n", env_get_float(EV_Voltage), (int)env_get_int(EV_Ignition), writes,
+         env_get_string(EV_Label, text, sizeof(text)), text, env_find("Missing"), env_subscribe(EV_COUNT, count_write));
+  return 0;
+}
+"""
+
+@unittest.skipUnless(shutil.which('cc'),"needs a C compiler")
+class StoreTest(unittest.TestCase):             # generated table with eventsHandler/envVars.c
+
+    def test_put_get_and_handlers(self):
+        codegen = EnvVarCodegen(database())
+        codegen.subscribe('Voltage')
+        codegen.slot('Ignition')
+        codegen.types['Label'] = dbcIndex.ENV_STRING
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir,'store.c')
+            with open(source,'w') as f:
+                f.write(codegen.generate() + STORE)
+            program = os.path.join(temp_dir,'store')
+            subprocess.run(['cc','-Wall','-Werror','-I',EVENTS_HANDLER,'-o',program,source,
+                            os.path.join(EVENTS_HANDLER,'envVars.c')],check=True)
+            output = subprocess.run([program],check=True,capture_output=True,text=True).stdout
+        self.assertEqual(output,"14.0 0 11 2 st -1 -1\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import unittest
+
+from benchmarks.lexerStress import SLOPE,run_case,slope
+from lexer import Lexer
+
+def tokens(source):                             # (type, value) of every token
+    with contextlib.redirect_stdout(io.StringIO()):
+        lexer_init = Lexer()
+        lexer_init.build()
+        lexer_init.lexer.input(source)
+        return [(token.type,token.value) for token in iter(lexer_init.lexer.token,None)]
+
+class TokenTest(unittest.TestCase):
+
+    def test_star_comments(self):               # lexed as / * ... before the rules were made linear
+        self.assertEqual(tokens('/***/'),[('COMMENT','/***/')])
+        self.assertEqual(tokens('/* a ** b */ x'),[('COMMENT','/* a ** b */'),('ID','x')])
+
+    def test_strings(self):
+        self.assertEqual(tokens('"x"'),[('CHARC','"x"')])
+        self.assertEqual(tokens('"xy"'),[('STRING','"xy"')])
+
+class LinearTimeTest(unittest.TestCase):       # small sizes of benchmarks/lexerStress.py
+
+    SIZE = 40000
+    TIMEOUT = 30                                # seconds per case, the old rules backtracked for ever
+
+    def check_case(self,name):
+        slopes = []
+        for attempt in range(3):                # a timing disturbed by other processes is measured again
+            runs = run_case(name,self.SIZE,0,3,self.TIMEOUT)
+            self.assertIsNotNone(runs,"%s: no result in %d s" % (name,self.TIMEOUT))
+            slopes.append(slope(runs))
+            if slopes[-1] <= SLOPE:
+                return
+        self.fail("%s: time per byte grows x%s when the input doubles" % (name,", x".join("%.2f" % s for s in slopes)))
+
+    def test_marker_name(self):
+        self.check_case('marker_name')
+
+    def test_func_params(self):
+        self.check_case('func_params')
+
+    def test_unclosed_comments(self):
+        self.check_case('unclosed_comments')
+
+    def test_unclosed_strings(self):
+        self.check_case('unclosed_strings')
+
+    def test_events(self):
+        self.check_case('events')
+
+    def test_fuzz(self):
+        self.check_case('fuzz')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import preConfig
+
+CONFIG = """<?xml version="1.0" encoding="utf-8"?>
+<RCConfiguration>
+  <Device>
+    <Config>
+      <Port>
+        <Name>HU_CAN</Name>
+        <Config>
+          <BitRate>500000</BitRate>
+          <NWDescriptor>old.dbc</NWDescriptor>
+          <RBSDescriptor>old.xml</RBSDescriptor>
+        </Config>
+      </Port>
+    </Config>
+  </Device>
+</RCConfiguration>
+"""
+
+class PatchTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.preConf = self.config(CONFIG)
+
+    def config(self,text):
+        path = os.path.join(self.temp_dir,'preConfig.xml')
+        with open(path,'w') as f:
+            f.write(text)
+        return path
+
+    def patch(self,portName='HU_CAN',bitRate='500000',nwDescriptor='new.dbc',rbsDescriptor='new.xml'):   # result and printed lines
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            result = preConfig.PreConfigPatcher().patch(self.preConf,portName,bitRate,nwDescriptor,rbsDescriptor)
+        return result,output.getvalue().splitlines()
+
+    def settings(self):
+        tree = preConfig.etree.parse(self.preConf)
+        return [(setting.tag,setting.text) for setting in tree.find('Device/Config/Port/Config')]
+
+    def test_changed(self):
+        self.assertEqual(self.patch(bitRate='125000'),(preConfig.CHANGED,[]))
+        self.assertEqual(self.settings(),[('BitRate','125000'),('NWDescriptor','new.dbc'),('RBSDescriptor','new.xml')])
+        self.assertEqual(os.listdir(self.temp_dir),['preConfig.xml'])    # no temp file left
+
+    def test_unchanged_not_written(self):
+        os.utime(self.preConf,(1000000000,1000000000))
+        self.assertEqual(self.patch(nwDescriptor='old.dbc',rbsDescriptor='old.xml'),(preConfig.UNCHANGED,[]))
+        self.assertEqual(os.stat(self.preConf).st_mtime,1000000000)
+        with open(self.preConf) as f:
+            self.assertEqual(f.read(),CONFIG)
+
+    def test_second_patch_unchanged(self):
+        self.assertEqual(self.patch()[0],preConfig.CHANGED)
+        self.assertEqual(self.patch()[0],preConfig.UNCHANGED)
+
+    def test_missing_port(self):
+        result,lines = self.patch(portName='BODY_CAN')
+        self.assertEqual(result,preConfig.FAILED)
+        self.assertEqual(lines,["ERROR! Port not found: %s" % self.preConf])
+        with open(self.preConf) as f:
+            self.assertEqual(f.read(),CONFIG)
+
+    def test_missing_element(self):
+        self.preConf = self.config(CONFIG.replace("          <RBSDescriptor>old.xml</RBSDescriptor>\n",""))
+        result,lines = self.patch()
+        self.assertEqual(result,preConfig.FAILED)
+        self.assertEqual(lines,["ERROR! RBSDescriptor missing in %s" % self.preConf])
+
+    def test_malformed_xml(self):
+        self.preConf = self.config(CONFIG.replace("</RCConfiguration>",""))
+        result,lines = self.patch()
+        self.assertEqual(result,preConfig.FAILED)
+        self.assertTrue(lines[0].startswith("ERROR! %s: " % self.preConf))
+
+    def test_empty_field(self):
+        self.assertEqual(self.patch(bitRate=''),(preConfig.FAILED,["ERROR! Empty field."]))
+
+    def test_patch_files(self):
+        preConfs = [self.preConf,self.preConf,os.path.join(self.temp_dir,'none.xml')]
+        with contextlib.redirect_stdout(io.StringIO()):
+            counts = preConfig.PreConfigPatcher().patch_files(preConfs,'HU_CAN','500000','new.dbc','new.xml')
+        self.assertEqual(counts,{preConfig.CHANGED: 1, preConfig.UNCHANGED: 1, preConfig.FAILED: 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+import restbusCli
+from tests.test_cBackend import TIMERS
+
+class OutputDirTest(unittest.TestCase):
+
+    def setUp(self):
+        stdout = sys.stdout
+        self.addCleanup(setattr,sys,'stdout',stdout)    # run_job() installs a ThreadOutput
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.caplFile = os.path.join(self.temp_dir,'node.can')
+        with open(self.caplFile,'w') as f:
+            f.write(TIMERS)
+
+    def main(self,argv):                        # exit status and printed lines
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            status = restbusCli.main(argv)
+        return status,output.getvalue().splitlines()
+
+    def test_missing_output_dir_is_made(self):
+        output_dir = os.path.join(self.temp_dir,'build','c')
+        status,lines = self.main(['capl2c','-o',output_dir,self.caplFile])
+        self.assertEqual(status,0)
+        self.assertTrue(os.path.isfile(os.path.join(output_dir,'node.c')))
+
+    def test_output_dir_not_made(self):
+        blocker = os.path.join(self.temp_dir,'file')
+        open(blocker,'w').close()
+        status,lines = self.main(['capl2c','-o',os.path.join(blocker,'x'),self.caplFile])
+        self.assertEqual(status,2)
+        self.assertRegex(lines[-1],r"^ERROR! output directory not made: .*Not a directory")
+
+if __name__ == '__main__':
+    unittest.main()
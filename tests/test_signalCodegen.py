@@ -0,0 +1,137 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from signalCodegen import SignalCodegen
+from tests.test_dbcIndex import database
+
+def pack(signal,raw,data):                      # reference layout from the DBC definition, into bytearray data
+    if signal.little_endian:                    # Intel: bit i of the value at frame bit start + i
+        positions = [signal.start_bit + i for i in range(signal.length)]
+    else:                                       # Motorola: MSB at the start bit, then in byte order, bit 7 first
+        first = signal.start_bit // 8 * 8 + 7 - signal.start_bit % 8
+        positions = [(n // 8 * 8 + 7 - n % 8) for n in range(first + signal.length - 1,first - 1,-1)]
+    for i,pos in enumerate(positions):
+        if raw >> i & 1:
+            data[pos // 8] |= 1 << pos % 8
+    return data
+
+def pack_bit(pos):                              # frame with only the bit at pos set
+    data = bytearray(8)
+    data[pos // 8] = 1 << pos % 8
+    return data
+
+class LayoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codegen = SignalCodegen(database())
+
+    def signal(self,message,name):
+        return self.codegen.lookup(message,name)[1]
+
+    def test_intel_bit_positions(self):
+        self.assertEqual(self.codegen.bit_positions(self.signal('Status','Gear')),[24,25,26])
+        self.assertEqual(self.codegen.byte_parts(self.signal('Status','Gear')),[(3,0,0,3)])
+
+    def test_motorola_bit_positions(self):
+        temp = self.signal('Status','Temp')          # 23|12@0: bits 3..0 in byte 3 bits 7..4, bits 11..4 in byte 2
+        self.assertEqual(self.codegen.bit_positions(temp),[28,29,30,31,16,17,18,19,20,21,22,23])
+        self.assertEqual(self.codegen.byte_parts(temp),[(3,4,0,4),(2,0,4,8)])
+
+    def test_positions_match_the_reference_layout(self):
+        for message_name,signal_name in (('Status','Speed'),('Status','Gear'),('Status','Temp'),('Status','Counter'),
+                                         ('Ext','Flag')):
+            signal = self.signal(message_name,signal_name)
+            for i,pos in enumerate(self.codegen.bit_positions(signal)):
+                self.assertEqual(pack(signal,1 << i,bytearray(8)),pack_bit(pos),"%s bit %d" % (signal_name,i))
+
+    def test_aligned_signals(self):
+        self.assertEqual(self.codegen.aligned_bytes(self.signal('Status','Speed')),(0,'le'))
+        self.assertEqual(self.codegen.aligned_bytes(self.signal('Status','Counter')),(4,'be'))
+        self.assertIsNone(self.codegen.aligned_bytes(self.signal('Status','Temp')))
+
+    def test_change_mask(self):
+        self.assertEqual(self.codegen.change_mask(self.signal('Status','Temp')),0xF0FF0000)
+        self.assertEqual(self.codegen.change_mask(self.signal('Ext','Flag')),0x80)
+
+    def test_unknown_signal(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertIsNone(self.codegen.lookup('Status','Missing'))
+        self.assertIn("WARNING! Signal Status::Missing not found",output.getvalue())
+        self.assertEqual(self.codegen.generate(),"")
+
+    def test_signal_without_message(self):
+        message,signal = self.codegen.lookup(None,'Flag')
+        self.assertEqual((message.name,signal.name),('Ext','Flag'))
+
+ROUND_TRIP = """
+#include <stdio.h>
+
+int main(void)
+{
+  set_Status__Speed(&Status_frame,123.4);
+  set_Status__Gear(&Status_frame,5);
+  set_Status__Temp(&Status_frame,-100.0);
+  set_Status__Counter(&Status_frame,0xBEEF);
+  set_Ext__Flag(&Ext_frame,1);
+  for (int i = 0; i < 8; i++)
+    printf("%02x",Status_frame.data[i]);
+  printf(" %02x %.1f %d %.1f %d %d\\n",Ext_frame.data[0],get_Status__Speed(&Status_frame),(int)get_Status__Gear(&Status_frame),
+         get_Status__Temp(&Status_frame),(int)get_Status__Counter(&Status_frame),(int)get_Ext__Flag(&Ext_frame));
+  return 0;
+}
+"""
+
+@unittest.skipUnless(shutil.which('cc') and os.path.exists('/usr/include/linux/can.h'),"needs a C compiler and linux/can.h")
+class GeneratedCodeTest(unittest.TestCase):
+
+    def run_c(self,code):                       # output of the compiled C code
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir,'signals.c')
+            with open(source,'w') as f:
+                f.write(code)
+            program = os.path.join(temp_dir,'signals')
+            subprocess.run(['cc','-std=gnu99','-Wall','-Werror','-o',program,source],check=True)
+            return subprocess.run([program],check=True,capture_output=True,text=True).stdout
+
+    def test_set_and_get(self):
+        codegen = SignalCodegen(database())
+        signals = [codegen.lookup(message,signal) for message,signal in
+                   (('Status','Speed'),('Status','Gear'),('Status','Temp'),('Status','Counter'),('Ext','Flag'))]
+        data = bytearray(8)
+        for (message,signal),raw in zip(signals[:4],(1234,5,-60 & 0xFFF,0xBEEF)):
+            pack(signal,raw,data)
+        self.assertEqual(self.run_c(codegen.generate() + ROUND_TRIP),
+                         "%s 80 123.4 5 -100.0 48879 1\n" % data.hex())
+
+if __name__ == '__main__':
+    unittest.main()
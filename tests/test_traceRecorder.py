@@ -0,0 +1,92 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from ascReplay import AscReplay,RECORD_EXT,RECORD_TX
+from traceRecorder import TraceRing
+
+def frame(n):                                   # n-th recorded frame, every third one transmitted
+    return (n * 0.01,0x100 + n,n % 9,RECORD_TX if n % 3 == 0 else 0,1,bytes((n + i) % 256 for i in range(8)))
+
+class TraceRingTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.ringFile = os.path.join(self.temp_dir,'trace.rbs')
+
+    def write_ring(self,capacity,written,magic=TraceRing.ring_magic):     # as eventsHandler/traceRecorder.c leaves it
+        records = [bytes(TraceRing.frame_record.size)] * capacity
+        for n in range(written):
+            records[n % capacity] = TraceRing.frame_record.pack(*frame(n))
+        with open(self.ringFile,'wb') as f:
+            f.write(TraceRing.ring_header.pack(magic,TraceRing.frame_record.size,capacity,written,0))
+            f.writelines(records)
+
+    def test_ring_not_wrapped(self):
+        self.write_ring(8,5)
+        self.assertEqual(TraceRing(self.ringFile).frames(),[frame(n) for n in range(5)])
+
+    def test_wrapped_ring_oldest_first(self):
+        self.write_ring(8,21)
+        self.assertEqual(TraceRing(self.ringFile).frames(),[frame(n) for n in range(13,21)])
+
+    def test_not_a_ring_file(self):
+        self.write_ring(8,5,b'RBSIDX1\x00')
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(TraceRing(self.ringFile).frames(),[])
+        self.assertIn("is not a trace ring file",output.getvalue())
+
+    def test_exported_asc_replays_the_same_frames(self):
+        self.write_ring(16,20)
+        ascFile = os.path.join(self.temp_dir,'trace.asc')
+        replay = AscReplay(ascFile)
+        with contextlib.redirect_stdout(io.StringIO()):
+            TraceRing(self.ringFile).export_asc(ascFile)
+            frames = list(replay.frames())
+        replay.close()
+        expected = []
+        for timestamp,msg_id,dlc,flags,channel,data in (frame(n) for n in range(4,20)):
+            expected.append((timestamp,msg_id,dlc,flags,channel,data[:dlc] + bytes(8 - dlc)))     # only dlc bytes are logged
+        self.assertEqual(frames,expected)
+
+    def test_extended_id(self):
+        with open(self.ringFile,'wb') as f:
+            f.write(TraceRing.ring_header.pack(TraceRing.ring_magic,TraceRing.frame_record.size,1,1,0))
+            f.write(TraceRing.frame_record.pack(0.5,0x18FEF100,2,RECORD_EXT,3,b'\x01\x02' + bytes(6)))
+        ascFile = os.path.join(self.temp_dir,'trace.asc')
+        with contextlib.redirect_stdout(io.StringIO()):
+            TraceRing(self.ringFile).export_asc(ascFile)
+        with open(ascFile) as f:
+            self.assertIn("   0.500000 3  18FEF100x       Rx   d 2 01 02\n",f.read())
+
+if __name__ == '__main__':
+    unittest.main()
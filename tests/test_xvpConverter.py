@@ -0,0 +1,144 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import xvpConverter
+
+def control(kind,name,signal,x,y,nested=""):    # Object of a control as written by the panel designer
+    return ('<Object Type="Vector.CANalyzer.Panels.Design.%s, Vector.CANalyzer.Panels.Design, Version=8.0" '
+            'Name="%s" Children="Controls">\n' % (kind,name) +
+            '<Property Name="SymbolConfiguration">1;16;;Node;Msg;%s;1;db.dbc;</Property>\n' % signal +
+            '<Property Name="Location">%d, %d</Property>\n' % (x,y) +
+            '<Property Name="Size">48, 23</Property>\n<Property Name="Text">%s</Property>\n' % name +
+            nested + '</Object>\n')
+
+def panel(*controls):
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            '<Panel Type="Vector.CANalyzer.Panels.PanelSerializer, Vector.CANalyzer.Panels.Serializer">\n'
+            '<Object Type="Vector.CANalyzer.Panels.Runtime.Panel, Vector.CANalyzer.Panels.Runtime" Name="Panel">\n'
+            '<Property Name="Name">P</Property>\n<Property Name="Size">800, 600</Property>\n' +
+            "".join(controls) + '</Object>\n</Panel>\n')
+
+class OccupancyGridTest(unittest.TestCase):
+
+    def test_free_position_is_kept(self):
+        grid = xvpConverter.OccupancyGrid()
+        self.assertEqual(grid.place(10,20,30,15),(10,20))
+        self.assertEqual(grid.place(40,20,30,15),(40,20))
+
+    def test_negative_position_is_kept(self):
+        grid = xvpConverter.OccupancyGrid()
+        self.assertEqual(grid.place(5,0,10,10),(5,0))
+        self.assertEqual(grid.place(-4,-2,5,3),(-4,-2))
+        self.assertEqual(grid.place(-30,7,10,1),(-30,7))
+
+    def test_overlap_moves_to_nearest_free_position(self):
+        grid = xvpConverter.OccupancyGrid()
+        grid.place(0,0,10,10)
+        self.assertEqual(grid.place(8,2,4,4),(10,2))
+        self.assertEqual(grid.place(2,8,4,4),(2,10))
+
+    def test_moved_control_stays_on_the_page(self):
+        grid = xvpConverter.OccupancyGrid()
+        grid.place(-3,0,30,50)
+        self.assertEqual(grid.place(0,0,4,4),(27,0))    # left of 0 only where the panel put a control
+
+class ReadXvpTest(unittest.TestCase):
+
+    def test_controls(self):
+        nested = ('<Object Type="Vector.CANalyzer.Panels.Design.ImageControl, Vector.CANalyzer.Panels.Design" Name="Image">\n'
+                  '<Property Name="SymbolConfiguration">1;16;;Other;Msg;Inner;1;db.dbc;</Property>\n'
+                  '<Property Name="Location">1, 1</Property>\n</Object>\n')
+        text = panel(control('CheckBoxControl','Check','SigA',100,50,nested),
+                     control('SwitchControl','Switch','SigB',200,60).replace('</Object>','<Property Name="Text">Second</Property>\n</Object>'))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            xvpFile = os.path.join(temp_dir,'p.xvp')
+            with open(xvpFile,'w') as f:
+                f.write(text)
+            controls,design = xvpConverter.XvpConverter().read_xvp(xvpFile)
+        self.assertEqual(controls,[[('ID',1),xvpConverter.Ctrl.CheckBoxControl,('Node','Node'),('Message','Msg'),
+                                    ('Signal','SigA'),('DBC','db.dbc')],
+                                   [('ID',2),xvpConverter.Ctrl.SwitchControl,('Node','Node'),('Message','Msg'),
+                                    ('Signal','SigB'),('DBC','db.dbc')]])       # not the panel, not the image inside Check
+        self.assertEqual(design,[[('Position',['100','50']),('Size',['48','23']),('Label','Check')],
+                                 [('Position',['200','60']),('Size',['48','23']),('Label','Switch')]])   # first Text
+
+class WorkspaceTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.aofFile = os.path.join(self.temp_dir,'workspace.aof')
+        self.xvpFiles = []
+        for n in range(4):
+            self.xvpFiles.append(os.path.join(self.temp_dir,'p%d.xvp' % n))
+            self.write(n,'Sig%d' % n)
+
+    def write(self,n,signal):
+        with open(self.xvpFiles[n],'w') as f:
+            f.write(panel(control('ButtonControl','B','%s_1' % signal,100,50),control('ButtonControl','C','%s_2' % signal,300,50)))
+
+    def convert(self,workers):                  # number of panels converted, AOF text
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            xvpConverter.convert_workspace(self.xvpFiles,self.aofFile,workers)
+        with open(self.aofFile) as f:
+            return int(output.getvalue().split('(')[1].split()[0]),f.read()
+
+    def pages(self,aof):                        # signals of each page, in the order of the AOF
+        return [[part.split('.')[-1] for part in page.split(';') if ':TX.' in part]
+                for page in aof.split('[Page')[1:]]
+
+    def cached_pages(self):
+        return sorted(name for name in os.listdir(xvpConverter.cache_dir(self.aofFile)) if name.endswith('.page'))
+
+    def test_pages_in_input_order(self):
+        converted,aof = self.convert(2)
+        self.assertEqual(converted,4)
+        self.assertEqual(self.pages(aof),[['Sig%d_1' % n,'Sig%d_2' % n] for n in range(4)])
+        self.assertEqual([line for line in aof.splitlines() if line.startswith('[Page')],['[Page1]','[Page2]','[Page3]','[Page4]'])
+
+    def test_unchanged_panels_from_the_cache(self):
+        converted,aof = self.convert(2)
+        self.assertEqual(self.convert(2),(0,aof))
+
+    def test_edited_panel_converted_again(self):
+        converted,aof = self.convert(2)
+        pages = self.cached_pages()
+        self.write(2,'Edited')
+        converted,aof = self.convert(2)
+        self.assertEqual(converted,1)
+        self.assertEqual(self.pages(aof)[2],['Edited_1','Edited_2'])
+        self.assertEqual(self.pages(aof)[3],['Sig3_1','Sig3_2'])
+        self.assertEqual(len(self.cached_pages()),4)                # the page of the old panel is removed
+        self.assertEqual(len(set(pages) & set(self.cached_pages())),3)
+
+if __name__ == '__main__':
+    unittest.main()
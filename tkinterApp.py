@@ -32,40 +32,17 @@ import os.path
 import io
 from panelsWindow import PanelsWindow
 from parserPy import Parser
+import preConfig
 
 class App:
     
     def next_btn_callback(self,preConf,portName,bitRate,dbc,xmlr):
-        tree = etree.parse(preConf.get())           # parse Provetech:RE config file
-        root = tree.getroot()                       # get root of an xml tree
- 
-
-        find_portName = etree.XPath("/RCConfiguration/Device/Config/Port/Name/text()")
-        port_name_xml = find_portName(tree)[0]      # get a port name from the xml-file
-        print(port_name_xml)
-
-        port_name_app = portName.get()              # get a port name from the text field
-        if (port_name_xml == port_name_app):
-            print("Port found...")
-            bit_rate = tree.xpath('//RCConfiguration/Device/Config/Port/Config/BitRate')        # xml-path of bit rate
-            bit_rate[0].text = bitRate.get()
-            bit_rate_text = bit_rate[0].text
-            dbc_arxml = tree.xpath('//RCConfiguration/Device/Config/Port/Config/NWDescriptor')  # xml-path of DBC/ARXML file
-            dbc_arxml[0].text = dbc.get()
-            dbc_arxml_text = dbc_arxml[0].text
-            xml_rbs = tree.xpath('//RCConfiguration/Device/Config/Port/Config/RBSDescriptor')    # xml-path of xml for Rest-bus sim. file
-            xml_rbs[0].text = xmlr.get()
-            xml_rbs_text = xml_rbs[0].text
-
-            # check whether all text fields are not empty and write to an output
-            if (not bit_rate_text or not dbc_arxml_text or not xml_rbs_text):
-                print("ERROR! Empty field.") 
-            else:
-                etree.ElementTree(root).write(preConf.get(), pretty_print=True)
-                print("Values in the output XML file set.")
-
-        else:
-            print("ERROR! Port not found.")
+        # Provetech:RE config file, several files at once: python preConfig.py
+        result = self.pre_patcher.patch(preConf.get(),portName.get(),bitRate.get(),dbc.get(),xmlr.get())
+        if result == preConfig.CHANGED:
+            print("Values in the output XML file set.")
+        elif result == preConfig.UNCHANGED:
+            print("Values already set in the output XML file.")
 
     def select_pre_callback(self,preConf):
         file = tk.filedialog.askopenfilename(**self.file_opt)
@@ -107,6 +84,7 @@ class App:
         pre_path.set("")                # path of XML file where it should be written
         dbcArxml_path = StringVar()
         dbcArxml_path.set("")           # path of DBC file
+        self.dbcArxml_path = dbcArxml_path      # used by the code conversion
         xmlRbs_path = StringVar()
         xmlRbs_path.set("")             # path of XML file
         port_name_init = StringVar()
@@ -145,7 +123,7 @@ class App:
 
     def layout_scheme_bottom(self,master):
         
-        panels_conv_btn = Button(master, text=u"GUI & CODE CONVERSION", command = lambda: PanelsWindow(master))
+        panels_conv_btn = Button(master, text=u"GUI & CODE CONVERSION", command = lambda: PanelsWindow(master,self.dbcArxml_path))
         panels_conv_btn.grid(row=5,column=1)
         panels_conv_btn.config(width=50,padx=20,pady=5,bd=3,font="Cambria 12")
 
@@ -154,6 +132,7 @@ class App:
         frame_top.grid(row = 0, column = 0, rowspan = 5, columnspan = 2, sticky = W+E+N+S,padx=5,pady=(5,1)) 
         frame_bottom = Frame(master)
         frame_bottom.grid(row = 5, column = 0, rowspan = 1, columnspan = 2, sticky = W+E+N+S,padx=(70,50),pady=(0,2))
+        self.pre_patcher = preConfig.PreConfigPatcher()
         self.layout_scheme(frame_top)
         self.layout_scheme_bottom(frame_bottom)
         #frame.pack()
@@ -0,0 +1,83 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+import mmap
+import struct
+import sys
+import time
+
+from ascReplay import AscReplay, RECORD_TX, RECORD_EXT
+
+class TraceRing:
+
+    ring_magic = b'RBSRING\x00'
+    ring_header = struct.Struct('<8sIIQQ')          # magic, record size, capacity, write index -- struct trace_ring_header
+    frame_record = AscReplay.frame_record           # records share the layout of the replay index
+
+    def frames(self):           # oldest to newest, i.e. in order of recording
+        with open(self.ringFile,'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                magic,record_size,capacity,write_index,reserved = self.ring_header.unpack_from(data)
+                if magic != self.ring_magic or record_size != self.frame_record.size:
+                    print("ERROR! %s is not a trace ring file." % self.ringFile)
+                    return []
+                records = data[self.ring_header.size:self.ring_header.size + capacity*record_size]
+            finally:
+                data.close()
+        if write_index <= capacity:                 # ring not wrapped yet
+            return list(self.frame_record.iter_unpack(records[:write_index*record_size]))
+        split = (write_index % capacity)*record_size    # oldest record follows the newest one
+        frames = list(self.frame_record.iter_unpack(records[split:]))
+        frames += self.frame_record.iter_unpack(records[:split])
+        return frames
+
+    def export_asc(self,ascFile):
+        frames = self.frames()
+        stamp = time.strftime("%a %b %d %I:%M:%S %p %Y")
+        lines = ["date %s\n" % stamp,
+                 "base hex  timestamps absolute\n",
+                 "internal events logged\n",
+                 "Begin Triggerblock %s\n" % stamp,
+                 "   0.000000 Start of measurement\n"]
+        for timestamp,msg_id,dlc,flags,channel,data in frames:
+            if flags & RECORD_EXT:
+                id_str = "%Xx" % msg_id
+            else:
+                id_str = "%X" % msg_id
+            direction = "Tx" if flags & RECORD_TX else "Rx"
+            lines.append("%11.6f %d  %-15s %s   d %d %s\n" % (timestamp,channel,id_str,direction,dlc," ".join("%02X" % b for b in data[:dlc])))
+        lines.append("End TriggerBlock\n")
+        with open(ascFile,'w') as f:
+            f.writelines(lines)
+        print("Trace exported to ASC: %d frames." % len(frames))
+
+    def __init__(self,ringFile):
+        self.ringFile = ringFile
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("usage: traceRecorder.py trace.rbs output.asc")
+        sys.exit(1)
+    TraceRing(sys.argv[1]).export_asc(sys.argv[2])
@@ -0,0 +1,151 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+
+# Waits for changes of input files. On Linux the directories of the files are watched by inotify, elsewhere
+# (or when inotify fails) the files are polled by os.stat(). Editors save in bursts -- truncate, write,
+# rename -- so the changes are collected until the files have been quiet for DEBOUNCE seconds.
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+POLL_INTERVAL = 0.2                             # seconds between two os.stat() of the same file
+DEBOUNCE = 0.15                                 # quiet time ending a burst of writes
+MAX_DELAY = 0.5                                 # files written continuously are converted after this anyway
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080                        # new file renamed over the old one
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')            # struct inotify_event without the name
+
+class InotifyWatcher:
+
+    def __init__(self,paths):
+        self.paths = set(os.path.abspath(path) for path in paths)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(),"inotify_init1 failed")
+        self.directories = {}                   # watch descriptor -> directory
+        for directory in set(os.path.dirname(path) for path in self.paths):
+            wd = self.libc.inotify_add_watch(self.fd,os.fsencode(directory),IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error,"inotify_add_watch failed",directory)
+            self.directories[wd] = directory
+
+    def wait(self,timeout=None):                # changed files, empty after the timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0,deadline - time.monotonic())
+            if not select.select([self.fd],[],[],remaining)[0]:
+                return set()
+            changed = self.read_events()
+            if changed:
+                return changed
+
+    def read_events(self):
+        data = os.read(self.fd,64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd,mask,cookie,length = EVENT_HEADER.unpack_from(data,offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset+length].rstrip(b'\0')
+            offset += length
+            path = os.path.join(self.directories.get(wd,''),os.fsdecode(name))
+            if path in self.paths:              # outputs and temporary files in the same directory are ignored
+                changed.add(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+
+    def __init__(self,paths,interval=POLL_INTERVAL):
+        self.interval = interval
+        self.stats = dict((path,self.stat(path)) for path in set(os.path.abspath(path) for path in paths))
+
+    def stat(self,path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns,st.st_size,st.st_ino
+        except OSError:
+            return None                         # deleted, or being replaced
+
+    def wait(self,timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path,old in self.stats.items():
+                new = self.stat(path)
+                if new != old:
+                    self.stats[path] = new
+                    if new is not None:
+                        changed.add(path)
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else max(0,min(self.interval,deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+def open_watcher(paths):
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError,AttributeError) as e:   # no inotify in libc, or out of watches
+            print("WARNING! inotify not available, files are polled: %s" % e)
+    return PollingWatcher(paths)
+
+def changes(watcher):                           # sets of changed files, one per burst of writes
+    while True:
+        changed = watcher.wait()
+        deadline = time.monotonic() + MAX_DELAY
+        while True:
+            more = watcher.wait(min(DEBOUNCE,max(0,deadline - time.monotonic())))
+            changed |= more
+            if not more or time.monotonic() >= deadline:
+                break
+        yield changed
+
+if __name__ == '__main__':
+    watcher = open_watcher(sys.argv[1:])
+    print("Watching %d files (%s)" % (len(sys.argv[1:]),type(watcher).__name__))
+    try:
+        for changed in changes(watcher):
+            print(time.strftime("%H:%M:%S"),", ".join(sorted(changed)))
+    except KeyboardInterrupt:
+        watcher.close()
@@ -0,0 +1,342 @@
+#
+# Copyright 2015 Leos Mikulka
+#
+# This file is part of RestbusSim-Converter.
+
+# RestbusSim-Converter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# RestbusSim-Converter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with RestbusSim-Converter.  If not, see <http://www.gnu.org/licenses/>.
+
+__author__ = "Leos Mikulka"
+__copyright__ = "Copyright 2015, Leos Mikulka"
+__license__ = "GPL"
+__version__ = "1.0"
+__email__ = "mikulkal@hotmail.com"
+
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from lxml import etree
+import contextlib
+import hashlib
+import os
+import sys
+import threading
+import time
+
+AOF_VERSION = b'1'              # change whenever the generated pages change, cached pages are then ignored
+
+aof_header = "[Allgemein]\n"+"Version=3\n"+"LeftSide=0\n"+"[ErfassSignale]\n"+"SignalschlüsselListe=\n"
+
+class Ctrl(Enum):
+    CheckBoxControl = 1
+    ButtonControl = 2
+    SwitchControl = 3
+    RadioButtonControl = 4
+    ComboBoxControl = 5
+    MeterControl = 6
+    AnalogGaugeControl = 7
+    LCDControl = 8
+
+class OccupancyGrid:
+
+    # Occupied cells of an AOF page, one int per row used as a bitset (bit x = column x).
+    # Only rows with controls exist, free slots of a band of rows are found by shifts and masks.
+
+    def band(self,y,height):                # columns occupied in any of the rows y .. y+height-1
+        occupied = 0
+        for row in range(y,y+height):
+            occupied |= self.rows.get(row,0)
+        return occupied
+
+    def free_starts(self,occupied,width):   # bit x set if the columns x .. x+width-1 are all free
+        starts = ~occupied
+        span = 1
+        while span < width:                 # doubling the run length, log(width) steps
+            step = min(span,width-span)
+            starts &= starts >> step
+            span += step
+        return starts
+
+    def nearest_column(self,starts,x):      # free start closest to x, columns right of all controls are always free
+        right = starts >> x
+        right = x + (right & -right).bit_length() - 1
+        left = (starts & ((1 << x) - 1)).bit_length() - 1
+        if left >= 0 and x - left < right - x:
+            return left
+        return right
+
+    def place(self,x,y,width,height):       # nearest free position (x+y distance) of a control, marked as occupied
+        width = max(width,1)
+        height = max(height,1)
+        if x < self.left:                   # bit 0 is column self.left, negative positions are kept as in the panel
+            for row in self.rows:
+                self.rows[row] <<= self.left - x
+            self.left = x
+        column_x = x - self.left
+        not_before = ~((1 << (min(x,0) - self.left)) - 1)   # moved controls stay right of 0 or of their own x
+        best = None
+        dy = 0
+        while best is None or dy < best[0]:     # a row further away cannot be closer than the best one
+            for row in (y+dy,y-dy) if dy else (y,):
+                if row < min(y,0):
+                    continue
+                starts = self.free_starts(self.band(row,height),width) & not_before
+                column = self.nearest_column(starts,column_x)
+                distance = abs(column-column_x) + dy
+                if best is None or distance < best[0]:
+                    best = (distance,column,row)
+            dy += 1
+        distance,column,y = best
+        mask = ((1 << width) - 1) << column
+        for row in range(y,y+height):
+            self.rows[row] = self.rows.get(row,0) | mask
+        return column + self.left,y
+
+    def __init__(self):
+        self.rows = {}                      # row -> occupied columns
+        self.left = 0                       # column of bit 0, below 0 once a control is left of the page
+
+class XvpConverter:
+
+    # Pythonic way of switch-case stmt
+    def checkbox():
+        return Ctrl.CheckBoxControl
+
+    def button():
+        return Ctrl.ButtonControl
+
+    def switch():
+        return Ctrl.SwitchControl
+
+    def radio_button():
+        return Ctrl.RadioButtonControl
+
+    def combo_box():
+        return Ctrl.ComboBoxControl
+
+    def meter():
+        return Ctrl.MeterControl
+
+    def analog_gauge():
+        return Ctrl.AnalogGaugeControl
+
+    def lcd():
+        return Ctrl.LCDControl
+
+    objects_options = { 'CheckBoxControl' : checkbox,
+                       'ButtonControl' : button,
+                       'SwitchControl' : switch,
+                       'RadioButtonControl' : radio_button,
+                       'ComboBoxControl' : combo_box,
+                       'MeterControl' : meter,
+                       'AnalogGaugeControl' : analog_gauge,
+                       'LCDControl' : lcd,
+                    }           
+
+    def is_control(self,elem):                      # Object inside Panel/Object, i.e. not the panel itself or a nested object
+        parent = elem.getparent()
+        if parent is None or parent.tag != 'Object':
+            return False
+        root = parent.getparent()
+        return root is not None and root.getparent() is None
+
+    def read_xvp(self,xvpFile):
+        controls_list = []
+        design_list = []
+
+        # One streaming pass over the file: every control is read when its end tag is parsed, all its
+        # Property children at once, and cleared afterwards -- panels with thousands of controls
+        # neither need the whole tree in memory nor one query from the root per property.
+        num = 0
+        for event,control in etree.iterparse(xvpFile,events=('end',),tag='Object'):
+            if not self.is_control(control):
+                continue
+            num += 1
+            properties = {}
+            for prop in control.iterchildren('Property'):
+                properties.setdefault(prop.get('Name'),prop.text)      # first one wins as with xpath()[0]
+
+            # from an attribute Type of tag Object select an actual type of an object (e.g. CheckBoxControl)
+            object_typeAttr = control.get('Type')
+            object_typeAttr_list = object_typeAttr.split(",")    # split all entries of type (i.e. attributes to list)
+            object_vectorType_list = (object_typeAttr_list[0]).split(".")   # select the first entry and split so we can get type of an object
+            object_type = object_vectorType_list.pop()            # actual type (e.g. CheckBoxControl) is located as the last element 
+
+            object_type = self.objects_options[object_type]()    # convert to ENUM type
+
+            # text inside tags <Property Name='SymbolConfiguration'>
+            object_config_list = properties['SymbolConfiguration'].split(";")     # put all properties from SymbolConfiguration into a list
+
+            node = object_config_list[3]
+            message = object_config_list[4]
+            signal = object_config_list[5]
+            dbc_file = object_config_list[7]
+
+            object_position = properties['Location'].split(", ")
+            object_size = properties['Size'].split(", ")
+            object_label = properties['Text']
+
+            controls_list.append([('ID',num),(object_type),('Node',node),('Message',message),('Signal',signal),('DBC',dbc_file)])
+            design_list.append([('Position',object_position),('Size',object_size),('Label',object_label)])
+
+            parent = control.getparent()
+            control.clear()                         # processed, free it and the controls before it
+            while control.getprevious() is not None:
+                del parent[0]
+
+        return controls_list,design_list
+
+    def generate_code_aof(self,panel_id,controls,design):      # [PageN] section of one panel
+        string = ""
+        string += "[Page%s]\n" % str(panel_id)
+        string += "SCROLLPOS=0|0\n"
+
+        # example: output[0][0][1] = 1st object, 1st tuple ('ID',num), value (num)
+        name = ""
+        grid = OccupancyGrid()                  # placed controls, overlapping ones are moved to the nearest free place
+        for i in range(0,len(controls)):
+            object_type = controls[i][1]
+
+            if (object_type == Ctrl.ButtonControl) or (object_type == Ctrl.CheckBoxControl):
+                if not (str(controls[i][2][1])=="" and str(controls[i][3][1])==""):     # empty message and signal ---> i.e. variable
+                    string += "BOOLCONTROL=Signalschlüssel:TX."
+                    for j in range (2,5):   # positions in control_list
+                        if (j < 4):
+                            #string += str(controls[i][j][1])+'.'
+                            name += str(controls[i][j][1])+'.'
+                        else:
+                            #string += str(controls[i][j][1])+';'
+                            name += str(controls[i][j][1])+';'
+
+                    string += name
+                    
+                    width = round(len(name)/5.5)      # width according to text in the button field
+                    
+                    x_pos = design[i][0][1][0]      # i-th tuple, 1st tuple, value, x-position
+                    y_pos = design[i][0][1][1]
+                    #width = design[i][1][1][0]
+                    height = design[i][1][1][1]
+
+                    h_space = 18
+                    v_space = 12
+                    move_left = 5
+                    x_pos = round(int(x_pos) / h_space) - move_left      # divider says how large space is between controls, substractor moves controls to the left
+                    y_pos = round(int(y_pos) / v_space)
+                    #width = int(width)
+                    height = int(height)
+                    #if width < 49:
+                    #    width = 49
+                    if height < 25:
+                        height = 25
+                    #width = round(width*3.5 / 49)
+                    height = round(height*1.5 / 25)          
+
+                    specific_aof_attributes_1 = "Shortname:1;ColorOn:255;ColorOff:8421504;ButtonStyle:7;TextAlignment:0;ButtonAlignment:2;"
+                    specific_aof_attributes_2 = "ButtonHeight:15;ButtonWidth:15;ButtonMode:1;IsHiActive:1;\n"   # hi/low button at the corner of a object 
+
+                    x_pos,y_pos = grid.place(x_pos,y_pos,width,height)
+
+                    string += "XPos:%s;YPos:%s;" % (x_pos,y_pos)
+                    string += "XSize:%s;YSize:%s;" % (width,height)
+                    string += specific_aof_attributes_1
+                    string += specific_aof_attributes_2
+                else:
+                    pass
+                name = ""
+
+
+        return string
+
+def convert_panel(panel_id,xvpFile):            # one panel, runs in a worker process
+    converter = XvpConverter()
+    controls_list,design_list = converter.read_xvp(xvpFile)
+    return converter.generate_code_aof(panel_id,controls_list,design_list)
+
+def page_key(panel_id,xvpFile):                 # the page depends on the XVP content, its position and the converter
+    sha = hashlib.sha1(AOF_VERSION + b'\0%d\0' % panel_id)
+    with open(xvpFile,'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20),b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def load_page(path):
+    try:
+        with open(path,encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None                             # not converted yet
+
+def save_page(path,page):
+    try:
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+        temp_path = path + '.%d.%d.tmp' % (os.getpid(),threading.get_ident())
+        with open(temp_path,'w',encoding='utf-8') as f:
+            f.write(page)
+        os.replace(temp_path,path)
+    except OSError as e:
+        print("WARNING! AOF page not cached: %s" % e)
+
+def cache_dir(aofFile):                        # pages of the panels, next to the AOF file
+    return os.path.join(os.path.dirname(os.path.abspath(aofFile)),'.aof_cache')
+
+def remove_stale_pages(cacheDir,paths):         # pages of earlier panel versions, the cache would only grow
+    keep = set(os.path.basename(path) for path in paths)
+    try:
+        names = os.listdir(cacheDir)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith('.page') and name not in keep:
+            try:
+                os.remove(os.path.join(cacheDir,name))
+            except OSError:
+                pass
+
+def convert_workspace(xvpFiles,aofFile='generatedWorkspace.aof',workers=None,cacheDir=None,progress=None):
+    # Every page is cached in .aof_cache/ next to the AOF file, keyed by the hash of its panel. Only
+    # changed panels are converted, in parallel, the pages are joined in the order of the files and
+    # written at once -- the AOF file is replaced only when every panel has been converted.
+    if cacheDir is None:
+        cacheDir = cache_dir(aofFile)
+    panel_ids = range(1,len(xvpFiles)+1)
+    paths = [os.path.join(cacheDir,page_key(panel_id,xvpFile) + '.page') for panel_id,xvpFile in zip(panel_ids,xvpFiles)]
+    pages = [load_page(path) for path in paths]
+    missing = [i for i,page in enumerate(pages) if page is None]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    parallel = len(missing) > 1 and workers > 1
+    with ProcessPoolExecutor(max_workers=min(workers,len(missing))) if parallel else contextlib.nullcontext() as executor:
+        if parallel:
+            converted = executor.map(convert_panel,[panel_ids[i] for i in missing],[xvpFiles[i] for i in missing])
+        else:
+            converted = (convert_panel(panel_ids[i],xvpFiles[i]) for i in missing)
+        emitted = 0
+        for done,(i,page) in enumerate(zip(missing,converted),1):
+            pages[i] = page
+            save_page(paths[i],page)
+            emitted += len(page)
+            if progress:                        # panels converted, bytes of AOF pages
+                progress('convert',done,emitted)
+
+    temp_path = aofFile + '.%d.%d.tmp' % (os.getpid(),threading.get_ident())
+    with open(temp_path,'w') as f:
+        f.write(aof_header)
+        f.writelines(pages)
+    os.replace(temp_path,aofFile)
+    remove_stale_pages(cacheDir,paths)
+    print("Transfer to AOF file successful (%d of %d panels converted)." % (len(missing),len(xvpFiles)))
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    convert_workspace(sys.argv[1:])
+    print("%d panels (%.1f ms)" % (len(sys.argv[1:]),(time.perf_counter()-start)*1000))